@@ -0,0 +1,449 @@
+# analytics.py
+
+"""Статистика числовых значений параметров по парку станков (numpy).
+
+Разобранные файлы сводятся в матрицу «ключ × станок» float64. Значения,
+которые читаются как число ('9000', '-0.001', '1e3'), хранятся как числа;
+нечисловые ('ABC', пустые) и отсутствующие у станка отмечены маской и равны
+NaN. По матрице векторно считаются min/max/среднее/медиана/ст. отклонение
+по каждому ключу, выбросы по z-оценке относительно парка и гистограммы.
+
+numpy — необязательная зависимость (pip install numpy): остальные утилиты
+работают без него, а функции этого модуля сообщают, что его нужно установить.
+
+Пример:
+    python analytics.py backups/ -o stats.csv --outliers outliers.csv \\
+        --histogram N2025A4 --histogram-output hist.csv
+"""
+
+import argparse
+import csv
+import re
+import sys
+import time
+import warnings
+from dataclasses import dataclass, field
+from itertools import compress, repeat
+from operator import is_
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import ColumnarParameters, KeyRangeError, PrmFile, pack_key, unpack_key
+from parser import ENGINES, parse_parameter_name
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_Z_THRESHOLD = 3.0
+DEFAULT_BINS = 10
+# С меньшим числом числовых значений z-оценка ключа не считается
+MIN_COUNT = 3
+
+# Число в записи ЧПУ — десятичное; '1_000', 'inf' и 'nan', которые принимает float(), — не числа
+_NUMBER = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+_KEY_HEADERS = ["Parameter", "Axis", "Tool", "Keep"]
+
+
+@dataclass
+class FleetMatrix:
+    """Матрица «ключ × станок»: строки — упакованные ключи по возрастанию."""
+
+    machines: List[str]
+    keys: "np.ndarray"  # uint64, упакованные ключи (models.pack_key)
+    values: "np.ndarray"  # float64, shape (ключи, станки); NaN там, где mask
+    mask: "np.ndarray"  # bool: True — параметра нет или значение не число
+    # Станки вне матрицы: имя → причина (ключ не упаковывается, см. build_matrix)
+    skipped: Dict[str, str] = field(default_factory=dict)
+
+    def row(self, name) -> int:
+        """
+        Номер строки параметра: имя ('N2025A4', '2025_A4') или упакованный ключ.
+        :raises KeyError: если параметра нет ни у одного станка
+        """
+        packed = name if isinstance(name, int) else pack_key(*parse_parameter_name(name))
+        row = int(np.searchsorted(self.keys, packed))
+        if row == len(self.keys) or int(self.keys[row]) != packed:
+            raise KeyError(name)
+        return row
+
+
+@dataclass
+class KeyStats:
+    """Статистика по каждому ключу матрицы (массивы той же длины, что keys)."""
+
+    count: "np.ndarray"  # число станков с числовым значением
+    min: "np.ndarray"
+    max: "np.ndarray"
+    mean: "np.ndarray"
+    median: "np.ndarray"
+    std: "np.ndarray"  # по генеральной совокупности (ddof=0); NaN, если count == 0
+
+
+@dataclass
+class Outlier:
+    key: int  # упакованный ключ
+    machine: str
+    value: float
+    z: float
+    mean: float
+    std: float
+
+
+def to_number(value: str) -> Optional[float]:
+    """Значение параметра как число; None — если это не число."""
+    value = value.strip()
+    return float(value) if _NUMBER.fullmatch(value) else None
+
+
+def build_matrix(machines: Dict[str, PrmFile]) -> FleetMatrix:
+    """
+    Сводит файлы {имя станка: PrmFile} в FleetMatrix. Быстрее всего — с
+    хранилищем "columnar": ключи и значения берутся из его колонок целиком.
+
+    Строки матрицы — упакованные ключи, поэтому станок с квалификатором
+    больше 254 (такой файл хранится в dict) в матрицу не входит и
+    попадает в FleetMatrix.skipped; остальные станки считаются как обычно.
+    """
+    _require_numpy()
+    names = []
+    skipped = {}
+    numbers: Dict[str, float] = {}  # общий для всех файлов: значения в парке повторяются
+    # Станки с одинаковым содержимым (по корню хэшей, если они уже посчитаны —
+    # например, загружены из кэша разбора) переводятся в числа один раз
+    by_root: Dict[bytes, tuple] = {}
+    columns = []
+    for name, prm in machines.items():
+        root = prm.content_digests.root if prm.content_digests is not None else None
+        column = by_root.get(root) if root is not None else None
+        if column is None:
+            try:
+                column = _column(prm.parameters, numbers)
+            except KeyRangeError as e:
+                skipped[name] = str(e)
+                continue
+            if root is not None:
+                by_root[root] = column
+        names.append(name)
+        columns.append(column)
+
+    # У станков одной модели набор ключей обычно одинаковый: объединяются
+    # и ищутся в общем списке только различающиеся наборы
+    layouts: Dict[bytes, "np.ndarray"] = {}
+    for column_keys, _ in columns:
+        layouts.setdefault(column_keys.tobytes(), column_keys)
+    if len(layouts) == 1:
+        keys = next(iter(layouts.values()))
+    elif layouts:
+        keys = np.unique(np.concatenate(list(layouts.values())))
+    else:
+        keys = np.empty(0, dtype=np.uint64)
+
+    values = np.full((len(keys), len(names)), np.nan)
+    positions = {}
+    for j, (column_keys, column_values) in enumerate(columns):
+        layout = column_keys.tobytes()
+        if layout not in positions:
+            positions[layout] = (
+                slice(None) if len(column_keys) == len(keys) else np.searchsorted(keys, column_keys)
+            )
+        values[positions[layout], j] = column_values
+    return FleetMatrix(
+        machines=names, keys=keys, values=values, mask=np.isnan(values), skipped=skipped
+    )
+
+
+def _column(parameters, numbers: Dict[str, float]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Упакованные ключи (по возрастанию) и числовые значения одного файла."""
+    if isinstance(parameters, ColumnarParameters):
+        *_, value_ids, sorted_keys, sorted_rows, strings = parameters.to_columns()
+        keys = np.frombuffer(sorted_keys, dtype=np.uint64)
+        rows = np.frombuffer(sorted_rows, dtype=np.uint32)
+        ids = np.frombuffer(value_ids, dtype=np.uint32)[rows]
+        return keys, _to_numbers(strings, numbers)[ids]
+
+    keys = np.array(
+        [pack_key(p.number, p.axis, p.tool, p.keep) for p in parameters.values()],
+        dtype=np.uint64,
+    )
+    values = _to_numbers([p.value for p in parameters.values()], numbers)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], values[order]
+
+
+def _to_numbers(strings: List[str], numbers: Dict[str, float]) -> "np.ndarray":
+    """Строки → float64 (NaN — не число); numbers — кэш уже разобранных строк."""
+    found = list(map(numbers.get, strings))
+    if None in found:
+        # Строки таблицы уникальны, поэтому каждая новая разбирается один раз
+        for value in compress(strings, map(is_, found, repeat(None))):
+            number = to_number(value)
+            numbers[value] = np.nan if number is None else number
+        found = list(map(numbers.__getitem__, strings))
+    return np.array(found, dtype=np.float64)
+
+
+def key_stats(matrix: FleetMatrix) -> KeyStats:
+    """Статистика по строкам матрицы; маскированные значения не учитываются."""
+    _require_numpy()
+    count = (~matrix.mask).sum(axis=1)
+    # NaN при сортировке уходят в конец строки: min, max и медиана берутся из
+    # отсортированной матрицы за один проход — заметно быстрее nanmedian
+    ordered = np.sort(matrix.values, axis=1)
+    rows = np.arange(len(count))
+    # min — первый столбец; у строк без чисел индексы указывают на NaN в начале строки
+    last = np.maximum(count, 1) - 1
+    with warnings.catch_warnings():
+        # Строки без единого числа дают NaN — это ожидаемо, предупреждения не нужны
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return KeyStats(
+            count=count,
+            min=ordered[:, 0] if ordered.shape[1] else np.full(len(count), np.nan),
+            max=ordered[rows, last],
+            mean=np.nanmean(matrix.values, axis=1),
+            median=(ordered[rows, last // 2] + ordered[rows, (last + 1) // 2]) / 2,
+            std=np.nanstd(matrix.values, axis=1),
+        )
+
+
+def find_outliers(
+    matrix: FleetMatrix,
+    threshold: float = DEFAULT_Z_THRESHOLD,
+    stats: KeyStats = None,
+    min_count: int = MIN_COUNT,
+) -> List[Outlier]:
+    """
+    Значения, у которых |z| = |x − среднее| / ст. отклонение по ключу не меньше
+    threshold. Ключи с менее чем min_count числовыми значениями или одинаковым
+    значением у всех станков пропускаются. Результат — по убыванию |z|.
+    """
+    _require_numpy()
+    stats = stats or key_stats(matrix)
+    valid = (stats.count >= min_count) & (stats.std > 0)
+    # |x − среднее| ≥ порог·σ без деления всей матрицы; NaN (маска) сравнение не проходят
+    limit = np.where(valid, threshold * stats.std, np.inf)
+    deviation = matrix.values - stats.mean[:, None]
+    rows, cols = np.nonzero(np.abs(deviation) >= limit[:, None])
+    z = deviation[rows, cols] / stats.std[rows]
+    order = np.argsort(-np.abs(z), kind="stable")
+    rows, cols, z = rows[order], cols[order], z[order]
+    # Поэлементное обращение к массивам numpy медленное — значения берутся списками
+    return [
+        Outlier(key, matrix.machines[col], value, score, mean, std)
+        for key, col, value, score, mean, std in zip(
+            matrix.keys[rows].tolist(),
+            cols.tolist(),
+            matrix.values[rows, cols].tolist(),
+            z.tolist(),
+            stats.mean[rows].tolist(),
+            stats.std[rows].tolist(),
+        )
+    ]
+
+
+def histogram(
+    matrix: FleetMatrix, name, bins: int = DEFAULT_BINS
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Гистограмма числовых значений параметра по станкам: (число станков, границы).
+    :raises KeyError: если параметра нет ни у одного станка
+    """
+    row = matrix.row(name)
+    return np.histogram(matrix.values[row][~matrix.mask[row]], bins=bins)
+
+
+def format_name(packed: int) -> str:
+    """Имя в записи ЧПУ: 'N2025A4', 'N1001T1K0'."""
+    number, axis, tool, keep = unpack_key(packed)
+    parts = [f"N{number}"]
+    if axis is not None:
+        parts.append(f"A{axis}")
+    if tool is not None:
+        parts.append(f"T{tool}")
+    if keep is not None:
+        parts.append(f"K{keep}")
+    return "".join(parts)
+
+
+def _key_columns(packed: int) -> list:
+    return ["" if part is None else part for part in unpack_key(packed)]
+
+
+def _fmt(number: float) -> str:
+    return "" if number != number else f"{number:.10g}"
+
+
+def write_stats_csv(matrix: FleetMatrix, stats: KeyStats, output_path: Path) -> None:
+    """Статистика по ключам, у которых хотя бы у одного станка значение — число."""
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            _KEY_HEADERS + ["Numeric", "Missing or text", "Min", "Max", "Mean", "Median", "Std"]
+        )
+        width = len(matrix.machines)
+        for row in np.nonzero(stats.count)[0]:
+            count = int(stats.count[row])
+            writer.writerow(
+                _key_columns(int(matrix.keys[row]))
+                + [count, width - count]
+                + [
+                    _fmt(float(column[row]))
+                    for column in (stats.min, stats.max, stats.mean, stats.median, stats.std)
+                ]
+            )
+
+
+def write_outliers_csv(outliers: List[Outlier], output_path: Path) -> None:
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(_KEY_HEADERS + ["Machine", "Value", "Z-score", "Fleet mean", "Fleet std"])
+        for o in outliers:
+            writer.writerow(
+                _key_columns(o.key)
+                + [o.machine, _fmt(o.value), f"{o.z:.2f}", _fmt(o.mean), _fmt(o.std)]
+            )
+
+
+def write_histograms_csv(
+    matrix: FleetMatrix, names: Iterable, output_path: Path, bins: int = DEFAULT_BINS
+) -> None:
+    """
+    Гистограммы параметров names, по строке на интервал.
+    :raises KeyError: если какого-то параметра нет ни у одного станка
+    """
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(_KEY_HEADERS + ["Bin start", "Bin end", "Machines"])
+        for name in names:
+            counts, edges = histogram(matrix, name, bins=bins)
+            key_columns = _key_columns(int(matrix.keys[matrix.row(name)]))
+            for count, start, end in zip(counts, edges, edges[1:]):
+                writer.writerow(key_columns + [_fmt(float(start)), _fmt(float(end)), int(count)])
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("для аналитики по парку нужен numpy (pip install numpy)")
+
+
+def main():
+    from batch import find_prm_files, machine_names
+    from cache import add_cache_arguments, cache_from_args
+    from interning import InternPool
+    from parser import load_prm_file
+
+    parser = argparse.ArgumentParser(
+        description="Статистика числовых параметров по парку станков: разброс, выбросы, гистограммы"
+    )
+    parser.add_argument("source", help="Папка с бэкапами станков или glob-шаблон")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("fleet_stats.csv"),
+        help="CSV со статистикой по ключам (по умолчанию: fleet_stats.csv)",
+    )
+    parser.add_argument("--outliers", type=Path, help="CSV с выбросами по z-оценке")
+    parser.add_argument(
+        "-z",
+        "--z-threshold",
+        type=float,
+        default=DEFAULT_Z_THRESHOLD,
+        help=f"Порог |z| для выбросов (по умолчанию: {DEFAULT_Z_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--histogram",
+        nargs="+",
+        default=[],
+        metavar="PARAM",
+        help="Параметры для гистограмм: N2025A4, 2025A4 или 2025_A4",
+    )
+    parser.add_argument(
+        "--histogram-output",
+        type=Path,
+        default=Path("histograms.csv"),
+        help="CSV с гистограммами (по умолчанию: histograms.csv)",
+    )
+    parser.add_argument(
+        "--bins",
+        type=int,
+        default=DEFAULT_BINS,
+        help=f"Число интервалов гистограммы (по умолчанию: {DEFAULT_BINS})",
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="regex", help="Движок парсера: regex или fast"
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    if args.bins < 1:
+        parser.error("--bins должно быть не меньше 1")
+
+    if np is None:
+        print("❌ Для аналитики нужен numpy: pip install numpy", file=sys.stderr)
+        sys.exit(1)
+
+    files = find_prm_files(args.source)
+    if not files:
+        print(f"❌ Файлы ALL.PRM не найдены: {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    prm_cache = cache_from_args(args)
+    load = prm_cache.load if prm_cache is not None else load_prm_file
+    machines = {}
+    failed = []
+    # Таблицы строк станков во многом совпадают — держим их в общем пуле
+    pool = InternPool()
+    print(f"🔄 Загрузка {len(files)} файлов...")
+    for name, path in zip(machine_names(files), files):
+        try:
+            machines[name] = load(path, engine=args.engine, store="columnar", pool=pool)
+        except ValueError as e:
+            failed.append((path, e))
+    print(f"ℹ️  Общий пул строк: {pool.summary()}")
+
+    try:
+        started = time.perf_counter()
+        matrix = build_matrix(machines)
+        stats = key_stats(matrix)
+        outliers = find_outliers(matrix, threshold=args.z_threshold, stats=stats)
+        elapsed = time.perf_counter() - started
+
+        write_stats_csv(matrix, stats, args.output)
+        print(f"📝 Статистика по ключам: {args.output}")
+        if args.outliers:
+            write_outliers_csv(outliers, args.outliers)
+            print(f"📝 Выбросы: {args.outliers}")
+        if args.histogram:
+            write_histograms_csv(matrix, args.histogram, args.histogram_output, bins=args.bins)
+            print(f"📝 Гистограммы: {args.histogram_output}")
+    except KeyError as e:
+        print(f"❌ Параметра {e.args[0]} нет ни у одного станка", file=sys.stderr)
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"❌ Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for o in outliers[:10]:
+        print(
+            f"  {format_name(o.key)} {o.machine}: {_fmt(o.value)} "
+            f"(z = {o.z:+.1f}, среднее по парку {_fmt(o.mean)})"
+        )
+    if len(outliers) > 10:
+        print(f"... и ещё {len(outliers) - 10} выбросов")
+    for path, e in failed:
+        print(f"❌ {path}: {e}", file=sys.stderr)
+    for name, reason in matrix.skipped.items():
+        print(f"❌ {name}: не включён в статистику — {reason}", file=sys.stderr)
+
+    numeric = int((stats.count > 0).sum())
+    print(
+        f"\n📊 Станков: {len(matrix.machines)}, ключей: {len(matrix.keys)} "
+        f"(с числовыми значениями: {numeric}), выбросов: {len(outliers)} ({elapsed:.2f} с)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# batch.py
+
+"""Пакетная обработка: парсинг и экспорт в Excel целой папки бэкапов ALL.PRM
+на пуле процессов. Справочник загружается один раз и передаётся воркерам
+при их запуске; ошибки по отдельным файлам собираются в итоговый отчёт
+и не прерывают обработку остальных."""
+
+import csv
+import glob
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Tuple
+
+from parser import ENGINES, load_prm_file
+
+
+# Состояние воркера: заполняется один раз в _init_worker
+_worker_descriptions: dict = {}
+
+
+def find_prm_files(source: str) -> List[Path]:
+    """
+    Возвращает список файлов ALL.PRM: все *.PRM (без учёта регистра) в папке
+    и её подпапках, либо файлы по glob-шаблону.
+    """
+    path = Path(source)
+    if path.is_dir():
+        files = [p for p in path.rglob("*") if p.is_file() and p.suffix.lower() == ".prm"]
+    else:
+        files = [Path(p) for p in glob.glob(source, recursive=True) if Path(p).is_file()]
+    return sorted(files)
+
+
+def machine_names(files: List[Path]) -> List[str]:
+    """
+    Имена станков без коллизий: бэкапы обычно называются одинаково (ALL.PRM),
+    поэтому в имя входит путь относительно общей родительской папки
+    (machine01/ALL.PRM → machine01_ALL).
+
+    Если имена всё же совпали (a_b/ALL.PRM и a/b_ALL.PRM, ALL.PRM и ALL.prm),
+    к повторам добавляется номер: a_b_ALL, a_b_ALL_2. Регистр при сравнении
+    не учитывается — отчёты пишутся и на файловые системы Windows.
+    """
+    if not files:
+        return []
+    parents = [str(p.resolve().parent) for p in files]
+    root = Path(os.path.commonpath(parents))
+    names = []
+    taken = set()
+    for p in files:
+        relative = p.resolve().relative_to(root).with_suffix("")
+        base = name = "_".join(relative.parts)
+        suffix = 1
+        while name.lower() in taken:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        taken.add(name.lower())
+        names.append(name)
+    return names
+
+
+def output_names(files: List[Path]) -> List[str]:
+    """Имена Excel-отчётов для пакетного экспорта."""
+    return [name + ".xlsx" for name in machine_names(files)]
+
+
+def _init_worker(descriptions: dict):
+    global _worker_descriptions
+    _worker_descriptions = descriptions
+    # openpyxl импортируется один раз на процесс, а не на каждый файл
+    import exporters.to_excel  # noqa: F401
+
+
+def _process_file(
+    input_path: Path, output_path: Path, engine: str, use_axis_names: bool, write_only: bool
+) -> int:
+    from exporters.to_excel import export_to_excel
+
+    prm = load_prm_file(input_path, engine=engine)
+    export_to_excel(
+        prm,
+        output_path,
+        descriptions=_worker_descriptions,
+        use_axis_names=use_axis_names,
+        write_only=write_only,
+    )
+    return len(prm.parameters)
+
+
+def run_batch(
+    files: List[Path],
+    output_dir: Path,
+    descriptions: dict = None,
+    workers: int = None,
+    engine: str = "regex",
+    use_axis_names: bool = False,
+    write_only: bool = False,
+) -> List[Tuple[Path, str, str]]:
+    """
+    Обрабатывает файлы на пуле процессов.
+
+    :return: список (входной файл, статус 'ok'/'error', путь к отчёту или текст ошибки)
+             в порядке входного списка
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(descriptions or {},)
+    ) as pool:
+        futures = {}
+        for input_path, name in zip(files, output_names(files)):
+            output_path = output_dir / name
+            future = pool.submit(
+                _process_file, input_path, output_path, engine, use_axis_names, write_only
+            )
+            futures[future] = (input_path, output_path)
+
+        for future in as_completed(futures):
+            input_path, output_path = futures[future]
+            try:
+                future.result()
+                results[input_path] = (input_path, "ok", str(output_path))
+            except Exception as e:
+                results[input_path] = (input_path, "error", str(e))
+
+    return [results[p] for p in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Пакетный экспорт в Excel папки бэкапов ALL.PRM от ЧПУ Mitsubishi M800"
+    )
+    parser.add_argument("source", help="Папка с бэкапами или glob-шаблон (например, 'backups/**/*.PRM')")
+    parser.add_argument(
+        "-o", "--output-dir", default="reports", help="Папка для Excel-отчётов (по умолчанию: reports)"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="Число процессов (по умолчанию: число ядер)"
+    )
+    parser.add_argument(
+        "--descriptions", type=Path, help="YAML-файл со справочником описаний параметров"
+    )
+    parser.add_argument(
+        "--axis-names", action="store_true", help="Использовать имена осей (X/Y/Z) вместо A1/A2/..."
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="regex", help="Движок парсера: regex или fast"
+    )
+    parser.add_argument(
+        "--write-only", action="store_true", help="Потоковый экспорт в Excel (write-only книга)"
+    )
+    parser.add_argument("--report", type=Path, help="CSV-файл для итогового отчёта по файлам")
+    args = parser.parse_args()
+
+    files = find_prm_files(args.source)
+    if not files:
+        print(f"❌ Файлы ALL.PRM не найдены: {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    # Загрузка справочника — один раз на весь пакет
+    descriptions = {}
+    descriptions_path = args.descriptions or Path("descriptions.yaml")
+    if descriptions_path.exists():
+        from utils import load_descriptions
+
+        try:
+            descriptions = load_descriptions(descriptions_path)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.descriptions is not None:
+        print(f"ℹ️  Файл справочника не найден: {descriptions_path}. Экспорт выполняется без описаний.")
+
+    print(f"🔄 Обработка {len(files)} файлов...")
+    results = run_batch(
+        files,
+        Path(args.output_dir),
+        descriptions=descriptions,
+        workers=args.workers,
+        engine=args.engine,
+        use_axis_names=args.axis_names,
+        write_only=args.write_only,
+    )
+
+    failed = [r for r in results if r[1] == "error"]
+    for input_path, _, message in failed:
+        print(f"❌ {input_path}: {message}", file=sys.stderr)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["File", "Status", "Result"])
+            for input_path, status, message in results:
+                writer.writerow([str(input_path), status, message])
+        print(f"📝 Итоговый отчёт сохранён: {args.report}")
+
+    print(f"\n✅ Успешно: {len(results) - len(failed)}, ❌ с ошибками: {len(failed)}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
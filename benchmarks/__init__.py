@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+
+"""Бенчмарки: генератор синтетических ALL.PRM (generate), прогон замеров
+с выводом в JSON (run) и сравнение результатов двух прогонов (compare)."""
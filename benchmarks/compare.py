@@ -0,0 +1,94 @@
+# benchmarks/compare.py
+
+"""Сравнение двух JSON-результатов benchmarks.run (например, до и после коммита).
+
+    python -m benchmarks.compare base.json new.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def load_results(path: Path) -> Tuple[dict, Dict[Tuple[str, Optional[int]], dict]]:
+    """Возвращает (meta, {(имя замера, размер): результат})."""
+    try:
+        report = json.loads(path.read_text(encoding="utf-8"))
+        return report.get("meta", {}), {(r["name"], r["size"]): r for r in report["results"]}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Не удалось прочитать результаты {path}: {e}")
+
+
+def compare(base: dict, new: dict, threshold: float = 10.0) -> List[dict]:
+    """
+    Строки сравнения по общим замерам; regression=True, если новый результат
+    медленнее базового больше чем на threshold процентов.
+    """
+    rows = []
+    for key in base:
+        if key not in new:
+            continue
+        old_seconds = base[key]["seconds"]
+        new_seconds = new[key]["seconds"]
+        change = (new_seconds / old_seconds - 1) * 100 if old_seconds else 0.0
+        rows.append(
+            {
+                "name": key[0],
+                "size": key[1],
+                "base_seconds": old_seconds,
+                "new_seconds": new_seconds,
+                "change_percent": change,
+                "base_peak_bytes": base[key].get("peak_bytes"),
+                "new_peak_bytes": new[key].get("peak_bytes"),
+                "regression": change > threshold,
+            }
+        )
+    return rows
+
+
+def _megabytes(value: Optional[int]) -> str:
+    return "—" if value is None else f"{value / (1024 * 1024):.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков двух прогонов")
+    parser.add_argument("base", type=Path, help="JSON базового прогона")
+    parser.add_argument("new", type=Path, help="JSON нового прогона")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Замедление в процентах, считающееся регрессией (по умолчанию: 10)",
+    )
+    args = parser.parse_args()
+
+    try:
+        base_meta, base = load_results(args.base)
+        new_meta, new = load_results(args.new)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"База: {base_meta.get('commit') or args.base}, новый: {new_meta.get('commit') or args.new}\n")
+    print(f"{'Замер':<32} {'Размер':>8} {'База, мс':>10} {'Новый, мс':>10} {'Δ, %':>8} {'Память, МБ':>16}")
+    rows = compare(base, new, args.threshold)
+    for row in rows:
+        size = "" if row["size"] is None else str(row["size"])
+        mark = " ❌" if row["regression"] else ""
+        memory = f"{_megabytes(row['base_peak_bytes'])} → {_megabytes(row['new_peak_bytes'])}"
+        print(
+            f"{row['name']:<32} {size:>8} {row['base_seconds'] * 1000:>10.1f} "
+            f"{row['new_seconds'] * 1000:>10.1f} {row['change_percent']:>+8.1f} {memory:>16}{mark}"
+        )
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n❌ Регрессий: {len(regressions)} (порог {args.threshold}%)")
+        sys.exit(1)
+    print(f"\n✅ Регрессий нет (порог {args.threshold}%)")
+
+
+if __name__ == "__main__":
+    main()
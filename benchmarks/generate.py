@@ -0,0 +1,165 @@
+# benchmarks/generate.py
+
+"""Детерминированный генератор синтетических ALL.PRM.
+
+Файл повторяет структуру бэкапа M800: '%', заголовок (дата, модель ЧПУ,
+серийные номера), PARA101(), затем строки параметров по возрастанию номера —
+общие, по осям (A), по инструментам (T), keep (K) и комбинированные (T/A/K),
+часть значений пустая. Одинаковые seed и размер дают побайтно одинаковый файл.
+
+Пример:
+    python -m benchmarks.generate ALL.PRM 100000 --changes 500
+"""
+
+import argparse
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+
+HEADER = [";2024/01/02 03:04:05", ";M800VW", ";SERIAL0001", ";SERIAL0002"]
+
+_AXES = 8
+_TOOLS = 4
+_KEEPS = 3
+
+# Доли блоков параметров: общий, по осям, по инструментам, keep, T/A/K
+_KINDS = (("plain", 0.55), ("axis", 0.25), ("tool", 0.1), ("keep", 0.07), ("combined", 0.03))
+
+_TEXT_VALUES = ("", "", "ABC", "X", "M800", "1.5", "-0.001", "P1", "G28 X0")
+
+
+def generate_lines(size: int, seed: int = 0) -> List[str]:
+    """
+    Строки файла (без перевода строки) ровно с size параметрами;
+    все ключи (number, axis, tool, keep) уникальны.
+    """
+    rnd = random.Random(seed)
+    lines = ["%"] + HEADER + ["PARA101()"]
+    number = 1
+    count = 0
+    while count < size:
+        kind = _choose_kind(rnd)
+        if kind == "plain":
+            block = [f"N{number}P{_value(rnd)}"]
+        elif kind == "axis":
+            block = [f"N{number}A{a}P{_value(rnd)}" for a in range(1, _AXES + 1)]
+        elif kind == "tool":
+            block = [f"N{number}T{t}P{_value(rnd)}" for t in range(1, _TOOLS + 1)]
+        elif kind == "keep":
+            block = [f"N{number}K{k}P{_value(rnd)}" for k in range(1, _KEEPS + 1)]
+        else:
+            block = [
+                f"N{number}T{t}A{a}K1P{_value(rnd)}" for t in range(1, 3) for a in range(1, 3)
+            ]
+        block = block[: size - count]
+        lines.extend(block)
+        count += len(block)
+        number += rnd.randint(1, 3)
+    # Перед завершающим '%' у бэкапов всегда есть пустая строка
+    lines.extend(["", "%"])
+    return lines
+
+
+def generate_prm(size: int, seed: int = 0, newline: str = "\r\n") -> str:
+    """Текст ALL.PRM с size параметрами (перевод строки как у ЧПУ — CRLF)."""
+    return newline.join(generate_lines(size, seed)) + newline
+
+
+def apply_changes(
+    lines: List[str], modified: int, added: int = 0, removed: int = 0, seed: int = 1
+) -> Tuple[List[str], dict]:
+    """
+    Контролируемый набор изменений для бенчмарков diff: modified параметров
+    получают другое значение, removed — удаляются, added — новые ключи
+    (номера выше существующих) вставляются в случайные места тела файла.
+
+    :return: (новые строки, {'modified': ..., 'added': ..., 'removed': ...})
+    """
+    rnd = random.Random(seed)
+    body = [i for i, line in enumerate(lines) if line.startswith("N")]
+    if modified + removed > len(body):
+        raise ValueError(f"Изменений больше, чем параметров в файле: {modified + removed} > {len(body)}")
+
+    chosen = rnd.sample(body, modified + removed)
+    to_modify = chosen[:modified]
+    to_remove = set(chosen[modified:])
+
+    result = list(lines)
+    for i in to_modify:
+        head, _, value = result[i].rpartition("P")
+        result[i] = f"{head}P{value}1"  # заведомо другое значение
+
+    max_number = _max_number(lines, body)
+    inserts = {}
+    for k in range(added):
+        position = rnd.choice(body)
+        inserts.setdefault(position, []).append(f"N{max_number + 1 + k}P{_value(rnd)}")
+
+    output = []
+    for i, line in enumerate(result):
+        if i in to_remove:
+            continue
+        output.append(line)
+        output.extend(inserts.get(i, ()))
+    return output, {"modified": modified, "added": added, "removed": removed}
+
+
+def _max_number(lines: List[str], body: List[int]) -> int:
+    highest = 0
+    for i in body:
+        digits = ""
+        for ch in lines[i][1:]:
+            if not ch.isdigit():
+                break
+            digits += ch
+        highest = max(highest, int(digits))
+    return highest
+
+
+def _choose_kind(rnd: random.Random) -> str:
+    roll = rnd.random()
+    for kind, share in _KINDS:
+        if roll < share:
+            return kind
+        roll -= share
+    return _KINDS[-1][0]
+
+
+def _value(rnd: random.Random) -> str:
+    roll = rnd.random()
+    if roll < 0.6:
+        return str(rnd.randint(0, 9999))
+    if roll < 0.75:
+        return "0"
+    return rnd.choice(_TEXT_VALUES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетических ALL.PRM для бенчмарков")
+    parser.add_argument("output", type=Path, help="Путь к создаваемому файлу")
+    parser.add_argument("size", type=int, help="Число параметров (например, 1000 … 1000000)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed генератора (по умолчанию: 0)")
+    parser.add_argument(
+        "--changes",
+        type=int,
+        help="Дополнительно создать изменённую копию (<имя>.changed.PRM) с таким числом правок",
+    )
+    args = parser.parse_args()
+
+    lines = generate_lines(args.size, args.seed)
+    args.output.write_bytes(("\r\n".join(lines) + "\r\n").encode("utf-8"))
+    print(f"✅ {args.output}: {args.size} параметров")
+
+    if args.changes:
+        share = args.changes // 10
+        changed, counts = apply_changes(
+            lines, modified=args.changes - 2 * share, added=share, removed=share, seed=args.seed + 1
+        )
+        changed_path = args.output.with_suffix(".changed" + args.output.suffix)
+        changed_path.write_bytes(("\r\n".join(changed) + "\r\n").encode("utf-8"))
+        print(f"✅ {changed_path}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+# benchmarks/run.py
+
+"""Прогон бенчмарков: парсинг, загрузка справочника, diff и все форматы экспорта.
+
+Файлы генерируются benchmarks.generate во временной папке (одинаковые
+для одинаковых размеров и seed), поэтому результаты разных коммитов
+сопоставимы. Для каждого замера сохраняется лучшее и среднее время из
+--repeat запусков и пиковая память (tracemalloc, отдельный запуск).
+
+Запуск из корня репозитория:
+    python -m benchmarks.run --sizes 1000,10000,100000 -o results.json
+    python -m benchmarks.compare base.json results.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from benchmarks.generate import apply_changes, generate_lines
+
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DESCRIPTIONS = REPO_ROOT / "descriptions.yaml"
+
+# Цель для быстрого режима CLI (--quick) на файле из STARTUP_SIZE параметров:
+# запуск интерпретатора, импорты и разбор. Превышение отмечается в отчёте
+STARTUP_TARGET_SECONDS = 0.25
+STARTUP_SIZE = 1000
+
+# Обычная (не write-only) книга openpyxl на миллионе строк пишется минуты
+DEFAULT_MAX_XLSX = 200000
+
+
+def measure(func: Callable[[], object], repeat: int = 3, memory: bool = True) -> dict:
+    """Время (лучшее/среднее из repeat запусков) и пиковая память отдельного запуска."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+
+    result = {"seconds": min(runs), "mean_seconds": sum(runs) / len(runs), "runs": runs}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(
+    sizes=DEFAULT_SIZES,
+    repeat: int = 3,
+    seed: int = 0,
+    changes: int = 1000,
+    descriptions_path: Optional[Path] = DEFAULT_DESCRIPTIONS,
+    only: Optional[List[str]] = None,
+    max_xlsx: int = DEFAULT_MAX_XLSX,
+    memory: bool = True,
+    progress: Callable[[dict], None] = None,
+) -> dict:
+    """
+    Выполняет все замеры и возвращает {'meta': ..., 'results': [...]}.
+
+    :param only: префиксы имён замеров ('parse', 'export.params.csv', ...)
+    :param changes: число правок во второй версии файла для diff
+    """
+    from cache import ParseCache
+    from comparator import compare_prm_files, summarize_diff
+    from exporters import EXPORTERS, export_parameters
+    from exporters.to_excel import export_to_excel
+    from parser import ENGINES, PARSER_VERSION, STORES, load_prm_file
+    from utils import load_descriptions
+
+    results = []
+
+    def record(
+        name: str,
+        size: Optional[int],
+        func: Callable[[], object],
+        target: Optional[float] = None,
+        trace_memory: bool = True,
+    ) -> None:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            return
+        entry = {"name": name, "size": size}
+        entry.update(measure(func, repeat=repeat, memory=memory and trace_memory))
+        if target is not None:
+            entry["target_seconds"] = target
+        results.append(entry)
+        if progress:
+            progress(entry)
+
+    with tempfile.TemporaryDirectory(prefix="prm-bench-") as tmp:
+        tmp = Path(tmp)
+
+        # Справочник от размера файла не зависит
+        descriptions = {}
+        if descriptions_path is not None and descriptions_path.exists():
+            snapshot_dir = tmp / "snapshot"
+            record("descriptions.yaml", None, lambda: load_descriptions(descriptions_path, cache_dir=None))
+            load_descriptions(descriptions_path, cache_dir=snapshot_dir)
+            record(
+                "descriptions.snapshot",
+                None,
+                lambda: load_descriptions(descriptions_path, cache_dir=snapshot_dir),
+            )
+            descriptions = load_descriptions(descriptions_path, cache_dir=None)
+
+        # Запуск CLI отдельным процессом: интерпретатор + импорты + разбор небольшого файла.
+        # tracemalloc текущего процесса дочерний не видит, поэтому без замера памяти
+        startup_old = tmp / "startup.PRM"
+        startup_new = tmp / "startup.changed.PRM"
+        startup_lines = generate_lines(STARTUP_SIZE, seed)
+        startup_old.write_bytes(("\r\n".join(startup_lines) + "\r\n").encode("utf-8"))
+        startup_changed, _ = apply_changes(startup_lines, modified=10, seed=seed + 1)
+        startup_new.write_bytes(("\r\n".join(startup_changed) + "\r\n").encode("utf-8"))
+        for name, command, target in (
+            ("startup.python", ["-c", "pass"], None),
+            ("startup.import.main", ["-c", "import main"], None),
+            ("startup.import.diff", ["-c", "import diff"], None),
+            (
+                "startup.main.quick",
+                ["main.py", str(startup_old), "--quick", "--no-cache", "--engine", "fast"],
+                STARTUP_TARGET_SECONDS,
+            ),
+            (
+                "startup.diff.quick",
+                ["diff.py", str(startup_old), str(startup_new), "--quick", "--no-cache", "--engine", "fast"],
+                STARTUP_TARGET_SECONDS,
+            ),
+        ):
+            record(
+                name,
+                STARTUP_SIZE if target else None,
+                lambda c=command: _run_python(c),
+                target=target,
+                trace_memory=False,
+            )
+
+        for size in sizes:
+            lines = generate_lines(size, seed)
+            count = min(changes, size // 2)
+            share = count // 10
+            changed, expected = apply_changes(
+                lines, modified=count - 2 * share, added=share, removed=share, seed=seed + 1
+            )
+            old_path = tmp / f"{size}.PRM"
+            new_path = tmp / f"{size}.changed.PRM"
+            old_path.write_bytes(("\r\n".join(lines) + "\r\n").encode("utf-8"))
+            new_path.write_bytes(("\r\n".join(changed) + "\r\n").encode("utf-8"))
+            del lines, changed
+
+            for engine in ENGINES:
+                for store in STORES:
+                    record(
+                        f"parse.{engine}.{store}",
+                        size,
+                        lambda e=engine, s=store: load_prm_file(old_path, engine=e, store=s),
+                    )
+
+            # Оба движка обязаны давать одинаковый результат — иначе сравнивать их время бессмысленно
+            reference = load_prm_file(old_path, engine="regex")
+            fast = load_prm_file(old_path, engine="fast")
+            if reference != fast:
+                raise RuntimeError(f"Движки regex и fast разошлись на файле из {size} параметров")
+            del reference, fast
+
+            cache = ParseCache(tmp / "cache")
+            cache.load(old_path, engine="fast", store="columnar")
+            for store in STORES:
+                record(f"parse.cache.{store}", size, lambda s=store: cache.load(old_path, store=s))
+
+            for store in STORES:
+                old_prm = load_prm_file(old_path, engine="fast", store=store)
+                new_prm = load_prm_file(new_path, engine="fast", store=store)
+                # Заодно проверяем корректность: diff должен найти ровно внесённые правки
+                counts = summarize_diff(old_prm, new_prm)
+                found = {"modified": counts["Modified"], "added": counts["Added"], "removed": counts["Removed"]}
+                if found != expected:
+                    raise RuntimeError(f"diff ({store}) нашёл {found}, внесено {expected}")
+                record(f"diff.{store}", size, lambda a=old_prm, b=new_prm: summarize_diff(a, b))
+
+            prm = load_prm_file(old_path, engine="fast")
+            old_prm = prm
+            new_prm = load_prm_file(new_path, engine="fast")
+            out = tmp / "out"
+            for fmt in EXPORTERS:
+                if fmt == "xlsx":
+                    if size > max_xlsx:
+                        continue
+                    record(
+                        "export.params.xlsx",
+                        size,
+                        lambda: export_to_excel(prm, out.with_suffix(".xlsx"), descriptions=descriptions),
+                    )
+                    record(
+                        "export.params.xlsx.write_only",
+                        size,
+                        lambda: export_to_excel(
+                            prm, out.with_suffix(".xlsx"), descriptions=descriptions, write_only=True
+                        ),
+                    )
+                else:
+                    record(
+                        f"export.params.{fmt}",
+                        size,
+                        lambda f=fmt: export_parameters(
+                            prm, out.with_suffix("." + f), fmt=f, descriptions=descriptions
+                        ),
+                    )
+                record(
+                    f"export.diff.{fmt}",
+                    size,
+                    lambda f=fmt: compare_prm_files(
+                        old_prm, new_prm, out.with_suffix(".diff." + f), descriptions=descriptions, fmt=f
+                    ),
+                )
+
+    meta = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parser_version": PARSER_VERSION,
+        "repeat": repeat,
+        "seed": seed,
+        "changes": changes,
+    }
+    return {"meta": meta, "results": results}
+
+
+def _run_python(arguments: List[str]) -> None:
+    subprocess.run(
+        [sys.executable, *arguments], cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_entry(entry: dict) -> str:
+    size = "" if entry["size"] is None else f"{entry['size']:>8}"
+    line = f"{entry['name']:<32} {size:>8} {entry['seconds'] * 1000:>10.1f} мс"
+    if "peak_bytes" in entry:
+        line += f" {entry['peak_bytes'] / (1024 * 1024):>9.1f} МБ"
+    target = entry.get("target_seconds")
+    if target is not None:
+        mark = "✅" if entry["seconds"] <= target else "❌"
+        line += f"  {mark} цель {target * 1000:.0f} мс"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки парсера, diff и экспорта ALL.PRM")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Размеры файлов через запятую (по умолчанию: 1000,10000,100000; до 1000000)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Число запусков каждого замера")
+    parser.add_argument("--seed", type=int, default=0, help="Seed генератора файлов")
+    parser.add_argument("--changes", type=int, default=1000, help="Число правок для diff")
+    parser.add_argument(
+        "--only", help="Только замеры с этими префиксами через запятую (например, parse,diff)"
+    )
+    parser.add_argument(
+        "--max-xlsx",
+        type=int,
+        default=DEFAULT_MAX_XLSX,
+        help=f"Максимальный размер для экспорта параметров в xlsx (по умолчанию: {DEFAULT_MAX_XLSX})",
+    )
+    parser.add_argument(
+        "--descriptions", type=Path, default=DEFAULT_DESCRIPTIONS, help="YAML-справочник для замеров"
+    )
+    parser.add_argument("--no-memory", action="store_true", help="Не измерять пиковую память")
+    parser.add_argument("-o", "--output", type=Path, help="JSON-файл с результатами")
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(",") if size]
+    except ValueError:
+        print(f"❌ Некорректный список размеров: {args.sizes}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'Замер':<32} {'Размер':>8} {'Время':>13} {'Память':>12}")
+    report = run_benchmarks(
+        sizes=sizes,
+        repeat=args.repeat,
+        seed=args.seed,
+        changes=args.changes,
+        descriptions_path=args.descriptions,
+        only=args.only.split(",") if args.only else None,
+        max_xlsx=args.max_xlsx,
+        memory=not args.no_memory,
+        progress=lambda entry: print(format_entry(entry), flush=True),
+    )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n✅ Результаты сохранены: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
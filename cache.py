@@ -0,0 +1,217 @@
+# cache.py
+
+"""Кэш разбора ALL.PRM на диске.
+
+Ключ — SHA-256 содержимого файла и версия парсера (PARSER_VERSION), поэтому
+переименование или копирование бэкапа кэш не сбрасывает, а любое изменение
+содержимого — сбрасывает. Значение — колонки ColumnarParameters и хэши
+содержимого (digests.py) в формате marshal: загрузка сводится к чтению файла
+и frombytes(), без разбора строк, а хэши для сравнения уже готовы.
+
+Размер кэша ограничен: при превышении удаляются записи, к которым дольше всего
+не обращались (время обращения — mtime файла записи, обновляется при попадании).
+"""
+
+import marshal
+import os
+from pathlib import Path
+from typing import Optional
+
+import profiling
+from models import ColumnarParameters, Header, PrmFile
+from parser import PARSER_VERSION, load_prm_file
+from utils import DEFAULT_CACHE_DIR
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Заголовок записи: PRM2 — строки заголовка, колонки ColumnarParameters и
+# хэши содержимого (digests.py). Записи прежнего формата PRMC, без хэшей,
+# не распознаются и просто перепарсиваются.
+_MAGIC = b"PRM2"
+_SUFFIX = ".prmc"
+
+
+class ParseCache:
+    """
+    Кэш разбора в папке directory размером не более max_bytes.
+
+    Пример:
+        cache = ParseCache(Path("~/.cache/prm").expanduser())
+        prm = cache.load("ALL.PRM")  # при повторном запуске — без парсинга
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def load(
+        self, path, engine: str = "regex", store: str = "dict", workers: int = 1, pool=None
+    ) -> PrmFile:
+        """
+        Возвращает PrmFile из кэша или парсит файл и сохраняет результат.
+        При workers > 1 промах разбирается параллельно (parallel_parser).
+        pool — interning.InternPool, как у parse_prm_file.
+        """
+        with profiling.span("parse.cache"):
+            entry = self._entry_path(_file_digest(path))
+            prm = self._read(entry, str(path), store)
+        if prm is not None:
+            self.hits += 1
+            profiling.count("cache_hits")
+            return prm if pool is None else pool.intern_prm(prm)
+
+        self.misses += 1
+        profiling.count("cache_misses")
+        if workers > 1:
+            from parallel_parser import load_prm_file_parallel
+
+            prm = load_prm_file_parallel(path, workers=workers, store=store, digests=True)
+        else:
+            prm = load_prm_file(path, engine=engine, store=store, digests=True)
+        self._write(entry, prm)
+        return prm if pool is None else pool.intern_prm(prm)
+
+    def clear(self) -> int:
+        """Удаляет все записи кэша; возвращает число удалённых файлов."""
+        removed = 0
+        for entry in self._entries():
+            try:
+                entry.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    # --- Внутреннее ---
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.directory / f"{digest}-v{PARSER_VERSION}-m{marshal.version}{_SUFFIX}"
+
+    def _entries(self):
+        if not self.directory.is_dir():
+            return []
+        return [p for p in self.directory.iterdir() if p.suffix == _SUFFIX]
+
+    def _read(self, entry: Path, source_path: str, store: str) -> Optional[PrmFile]:
+        try:
+            raw = entry.read_bytes()
+        except OSError:
+            return None
+        if not raw.startswith(_MAGIC):
+            return None
+        from digests import ContentDigests
+
+        try:
+            header_lines, columns, digests = marshal.loads(raw[len(_MAGIC):])
+            parameters = ColumnarParameters.from_columns(columns)
+            content_digests = ContentDigests.from_tuple(digests)
+        except (EOFError, ValueError, TypeError):
+            # Повреждённая запись — просто перепарсим файл
+            return None
+
+        # Отметка «недавно использовано» для LRU
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+        if store == "dict":
+            parameters = parameters.to_dict()
+        return PrmFile(
+            header=Header(raw_lines=header_lines),
+            parameters=parameters,
+            source_path=source_path,
+            content_digests=content_digests,
+        )
+
+    def _write(self, entry: Path, prm: PrmFile) -> None:
+        if prm.content_digests is None:
+            # Ключи вне упакованного представления (parser.attach_digests):
+            # в колонки кэша такой файл не записать — он просто разбирается каждый раз
+            return
+        parameters = prm.parameters
+        if not isinstance(parameters, ColumnarParameters):
+            parameters = ColumnarParameters.from_parameters(parameters.values())
+        payload = _MAGIC + marshal.dumps(
+            (list(prm.header.raw_lines), parameters.to_columns(), prm.content_digests.to_tuple())
+        )
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(payload)
+            os.replace(tmp, entry)
+        except OSError:
+            # Кэш — оптимизация: ошибка записи не должна ломать разбор
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+def _file_digest(path) -> str:
+    import hashlib
+
+    # Чтение блоками: память не зависит от размера файла
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def add_cache_arguments(parser) -> None:
+    """Добавляет в argparse-парсер CLI флаги кэша разбора."""
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Папка кэша разбора (по умолчанию: {DEFAULT_CACHE_DIR}, или $PRM_CACHE_DIR)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Максимальный размер кэша в МБ (по умолчанию: 512)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора")
+    parser.add_argument(
+        "--clear-cache", action="store_true", help="Очистить кэш разбора перед запуском"
+    )
+
+
+def cache_from_args(args) -> Optional[ParseCache]:
+    """Создаёт ParseCache по флагам add_cache_arguments (None — кэш отключён)."""
+    cache = ParseCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+    if args.clear_cache:
+        cache.clear()
+    if args.no_cache:
+        return None
+    return cache
+
+
+def snapshot_dir_from_args(args) -> Optional[Path]:
+    """Папка для снимка справочника (utils.load_descriptions); None при --no-cache."""
+    return None if args.no_cache else args.cache_dir
@@ -0,0 +1,456 @@
+# collect.py
+
+"""Сбор ALL.PRM со станков по FTP: много контроллеров одновременно.
+
+Список станков — CSV с колонками name, host и (необязательно) port, path,
+user, password. Загрузка идёт на asyncio с ограничением числа одновременных
+соединений; у каждой попытки свой тайм-аут, неудачные попытки повторяются
+с растущей паузой. Полученные байты разбираются прямо из памяти (BytesIO)
+на пуле процессов, без временных файлов, а сохраняются на диск или
+в хранилище снимков только по запросу.
+
+Клиент FTP минимальный — ровно то, что нужно для выгрузки одного файла:
+USER/PASS, TYPE I, PASV, RETR. Функцию загрузки можно подменить
+(collect(..., fetch=...)), а адрес и порт берутся из списка, поэтому
+сборщик проверяется на локальном тестовом FTP-сервере (tests/test_collect.py).
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import re
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+
+from models import PrmFile
+from parser import ENGINES, parse_prm_file
+
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_DELAY = 1.0
+DEFAULT_REMOTE_PATH = "ALL.PRM"
+
+_PASV_RE = re.compile(rb"(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)")
+
+
+@dataclass
+class Target:
+    """Станок, с которого забирается бэкап."""
+
+    name: str
+    host: str
+    port: int = 21
+    path: str = DEFAULT_REMOTE_PATH
+    user: str = "anonymous"
+    password: str = ""
+
+
+@dataclass
+class CollectResult:
+    """Итог сбора с одного станка."""
+
+    target: Target
+    status: str  # "ok" или "error"
+    prm: Optional[PrmFile] = None
+    data: Optional[bytes] = None
+    attempts: int = 0
+    seconds: float = 0.0
+    message: str = ""
+
+
+def load_targets(
+    path: Path, remote_path: str = DEFAULT_REMOTE_PATH, user: str = "anonymous", password: str = ""
+) -> List[Target]:
+    """
+    Читает список станков из CSV (колонки name, host, port, path, user, password;
+    обязательны только name и host). Пустые значения заменяются значениями
+    по умолчанию из аргументов.
+    """
+    targets = []
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or not {"name", "host"} <= set(reader.fieldnames):
+            raise ValueError(f"В списке станков {path} нужны колонки name и host")
+        for line_number, row in enumerate(reader, start=2):
+            name = (row.get("name") or "").strip()
+            host = (row.get("host") or "").strip()
+            if not name or not host:
+                raise ValueError(f"{path}, строка {line_number}: не указаны name или host")
+            port = (row.get("port") or "").strip()
+            try:
+                port = int(port) if port else 21
+            except ValueError:
+                raise ValueError(f"{path}, строка {line_number}: некорректный порт '{port}'")
+            targets.append(
+                Target(
+                    name=name,
+                    host=host,
+                    port=port,
+                    path=(row.get("path") or "").strip() or remote_path,
+                    user=(row.get("user") or "").strip() or user,
+                    password=row.get("password") or password,
+                )
+            )
+
+    names = [t.name for t in targets]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Повторяющиеся имена станков в {path}: {', '.join(duplicates)}")
+    return targets
+
+
+# --- FTP ---
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> tuple:
+    """Читает ответ сервера (с учётом многострочных ответов 'NNN-...')."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("FTP-сервер закрыл соединение")
+    code = line[:3]
+    if len(code) != 3 or not code.isdigit():
+        # Не FTP (или испорченный ответ) — сетевая ошибка этого станка, а не всего сбора
+        raise ConnectionError(f"Некорректный ответ FTP-сервера: {line[:80].decode('latin-1').strip()!r}")
+    if line[3:4] == b"-":
+        while True:
+            next_line = await reader.readline()
+            if not next_line:
+                raise ConnectionError("FTP-сервер закрыл соединение")
+            if next_line[:3] == code and next_line[3:4] == b" ":
+                break
+    return int(code), line.decode("latin-1").strip()
+
+
+async def _command(reader, writer, command: str, expected: tuple) -> str:
+    writer.write(command.encode("latin-1") + b"\r\n")
+    await writer.drain()
+    code, text = await _read_reply(reader)
+    if code not in expected:
+        shown = "PASS ***" if command.startswith("PASS") else command
+        raise ConnectionError(f"{shown}: {text}")
+    return text
+
+
+async def fetch_ftp(target: Target) -> bytes:
+    """
+    Скачивает target.path с FTP-сервера станка в память (пассивный режим).
+    Адрес из ответа PASV игнорируется — канал данных открывается к тому же
+    хосту, что и управляющий (контроллеры за NAT часто сообщают внутренний адрес).
+    """
+    reader, writer = await asyncio.open_connection(target.host, target.port)
+    try:
+        code, text = await _read_reply(reader)
+        if code != 220:
+            raise ConnectionError(text)
+        text = await _command(reader, writer, f"USER {target.user}", (230, 331))
+        if text.startswith("331"):
+            await _command(reader, writer, f"PASS {target.password}", (230, 202))
+        await _command(reader, writer, "TYPE I", (200,))
+
+        text = await _command(reader, writer, "PASV", (227,))
+        match = _PASV_RE.search(text.encode("latin-1"))
+        if match is None:
+            raise ConnectionError(f"Не удалось разобрать ответ PASV: {text}")
+        data_port = int(match.group(5)) * 256 + int(match.group(6))
+
+        data_reader, data_writer = await asyncio.open_connection(target.host, data_port)
+        try:
+            await _command(reader, writer, f"RETR {target.path}", (125, 150))
+            data = await data_reader.read()
+        finally:
+            await _close(data_writer)
+        code, text = await _read_reply(reader)
+        if code not in (226, 250):
+            raise ConnectionError(text)
+
+        try:
+            writer.write(b"QUIT\r\n")
+            await writer.drain()
+        except OSError:
+            pass
+        return data
+    finally:
+        await _close(writer)
+
+
+async def _close(writer: asyncio.StreamWriter) -> None:
+    # Без wait_closed() транспорт закрывается позже и на Python 3.11+ даёт
+    # предупреждения «unclosed transport»; ошибки при закрытии не важны
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+# --- Сбор ---
+
+
+def _parse(target: Target, data: bytes, engine: str) -> PrmFile:
+    if engine == "fast":
+        stream = io.BytesIO(data)
+    else:
+        stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+    # Колоночное хранилище — результат дешевле передавать из процесса-воркера
+    return parse_prm_file(
+        stream,
+        source_path=f"ftp://{target.host}:{target.port}/{target.path}",
+        engine=engine,
+        store="columnar",
+    )
+
+
+async def collect_one(
+    target: Target,
+    semaphore: asyncio.Semaphore,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+    engine: str = "fast",
+    fetch: Callable[[Target], Awaitable[bytes]] = fetch_ftp,
+    executor: Optional[Executor] = None,
+) -> CollectResult:
+    """
+    Забирает и разбирает бэкап одного станка. Сетевые ошибки и тайм-ауты
+    повторяются (retries раз, пауза retry_delay удваивается); ошибка разбора
+    не повторяется — тот же файл придёт снова.
+
+    :param executor: пул для разбора (None — пул потоков цикла событий)
+    """
+    started = time.perf_counter()
+    message = ""
+    for attempt in range(1, retries + 2):
+        if attempt > 1:
+            await asyncio.sleep(retry_delay * 2 ** (attempt - 2))
+        async with semaphore:
+            try:
+                data = await asyncio.wait_for(fetch(target), timeout)
+            except asyncio.TimeoutError:
+                message = f"тайм-аут {timeout} с"
+                continue
+            except OSError as e:
+                message = str(e) or type(e).__name__
+                continue
+            except ValueError as e:
+                # Например, путь или логин не кодируются в latin-1: повтор не поможет
+                return CollectResult(
+                    target,
+                    "error",
+                    attempts=attempt,
+                    seconds=time.perf_counter() - started,
+                    message=str(e),
+                )
+
+        try:
+            # Разбор — в пуле процессов: в этом же процессе он занимал бы GIL
+            # и задерживал остальные загрузки вплоть до ложных тайм-аутов
+            prm = await asyncio.get_running_loop().run_in_executor(
+                executor, _parse, target, data, engine
+            )
+        except ValueError as e:
+            return CollectResult(
+                target,
+                "error",
+                data=data,
+                attempts=attempt,
+                seconds=time.perf_counter() - started,
+                message=str(e),
+            )
+        return CollectResult(
+            target, "ok", prm=prm, data=data, attempts=attempt, seconds=time.perf_counter() - started
+        )
+
+    return CollectResult(
+        target, "error", attempts=retries + 1, seconds=time.perf_counter() - started, message=message
+    )
+
+
+async def collect(
+    targets: List[Target],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+    engine: str = "fast",
+    fetch: Callable[[Target], Awaitable[bytes]] = fetch_ftp,
+    on_result: Callable[[CollectResult], None] = None,
+    workers: Optional[int] = None,
+) -> List[CollectResult]:
+    """
+    Собирает бэкапы со всех станков, не больше concurrency соединений
+    одновременно. Загрузки идут в цикле событий, разбор — на пуле из
+    workers процессов (по умолчанию: число ядер). Результаты — в порядке
+    списка targets; on_result вызывается по мере готовности.
+    """
+    if concurrency < 1:
+        raise ValueError("Число одновременных соединений должно быть не меньше 1")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        async def run(target: Target) -> CollectResult:
+            result = await collect_one(
+                target, semaphore, timeout, retries, retry_delay, engine, fetch, executor
+            )
+            if on_result:
+                on_result(result)
+            return result
+
+        return await asyncio.gather(*(run(target) for target in targets))
+
+
+# --- CLI ---
+
+
+def _print_result(result: CollectResult) -> None:
+    name = result.target.name
+    if result.status != "ok":
+        print(f"❌ {name}: {result.message} (попыток: {result.attempts})", file=sys.stderr, flush=True)
+        return
+    print(
+        f"✅ {name}: {len(result.prm.parameters)} параметров, "
+        f"{result.prm.header.datetime or 'дата не указана'} ({result.seconds:.2f} с)",
+        flush=True,
+    )
+
+
+def _ingest(results: List[CollectResult], db_path: Path, collected_at: str) -> None:
+    from snapshots import SnapshotStore
+
+    with SnapshotStore(db_path) as store:
+        for result in results:
+            if result.status != "ok":
+                continue
+            taken_at = None if result.prm.header.datetime else collected_at
+            try:
+                snapshot = store.ingest(result.target.name, result.prm, taken_at=taken_at)
+            except ValueError as e:
+                print(f"ℹ️  {result.target.name}: снимок не добавлен — {e}", file=sys.stderr)
+                continue
+            print(f"🕓 {result.target.name}: снимок от {snapshot.taken_at}, изменено {snapshot.changed_count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Параллельный сбор ALL.PRM со станков по FTP"
+    )
+    parser.add_argument(
+        "targets", type=Path, help="CSV со списком станков: name,host[,port,path,user,password]"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", type=Path, help="Сохранить бэкапы в папку (<станок>/ALL.PRM)"
+    )
+    parser.add_argument(
+        "--snapshots", type=Path, help="Добавить собранные бэкапы в хранилище снимков SQLite"
+    )
+    parser.add_argument("--report", type=Path, help="CSV-файл для итогового отчёта по станкам")
+    parser.add_argument(
+        "-j",
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Одновременных соединений (по умолчанию: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Процессов для разбора (по умолчанию: число ядер)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Тайм-аут одной попытки в секундах (по умолчанию: {DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"Повторов после неудачной попытки (по умолчанию: {DEFAULT_RETRIES})",
+    )
+    parser.add_argument(
+        "--path",
+        default=DEFAULT_REMOTE_PATH,
+        help=f"Путь к файлу на станке, если не указан в списке (по умолчанию: {DEFAULT_REMOTE_PATH})",
+    )
+    parser.add_argument("--user", default="anonymous", help="Логин FTP по умолчанию")
+    parser.add_argument("--password", default="", help="Пароль FTP по умолчанию")
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="fast", help="Движок парсера (по умолчанию: fast)"
+    )
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        parser.error("--concurrency должно быть не меньше 1")
+    if args.retries < 0:
+        parser.error("--retries не может быть отрицательным")
+
+    try:
+        targets = load_targets(args.targets, args.path, args.user, args.password)
+    except (OSError, ValueError) as e:
+        print(f"❌ Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not targets:
+        print(f"❌ Список станков пуст: {args.targets}", file=sys.stderr)
+        sys.exit(1)
+
+    collected_at = datetime.now().isoformat(timespec="seconds")
+    print(f"🔄 Сбор с {len(targets)} станков (одновременно до {args.concurrency})...", flush=True)
+    started = time.perf_counter()
+    results = asyncio.run(
+        collect(
+            targets,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            retries=args.retries,
+            engine=args.engine,
+            on_result=_print_result,
+            workers=args.workers,
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    if args.output_dir:
+        for result in results:
+            if result.status != "ok":
+                continue
+            machine_dir = args.output_dir / result.target.name
+            machine_dir.mkdir(parents=True, exist_ok=True)
+            (machine_dir / Path(result.target.path).name).write_bytes(result.data)
+        print(f"💾 Бэкапы сохранены в {args.output_dir}")
+
+    if args.snapshots:
+        _ingest(results, args.snapshots, collected_at)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Machine", "Host", "Status", "Attempts", "Seconds", "Parameters", "Result"])
+            for result in results:
+                writer.writerow(
+                    [
+                        result.target.name,
+                        f"{result.target.host}:{result.target.port}",
+                        result.status,
+                        result.attempts,
+                        f"{result.seconds:.2f}",
+                        len(result.prm.parameters) if result.prm else "",
+                        result.message or (result.prm.header.datetime or ""),
+                    ]
+                )
+        print(f"📝 Итоговый отчёт сохранён: {args.report}")
+
+    failed = [r for r in results if r.status != "ok"]
+    print(f"\n✅ Успешно: {len(results) - len(failed)}, ❌ с ошибками: {len(failed)} ({elapsed:.1f} с)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
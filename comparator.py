@@ -1,9 +1,130 @@
 # comparator.py
 
-from models import PrmFile, Parameter
+from collections import Counter
+from dataclasses import dataclass
+from models import ColumnarParameters, PrmFile, Parameter
 from pathlib import Path
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill
+from typing import Iterator, List, Optional
+import profiling
+
+
+ADDED = "Added"
+REMOVED = "Removed"
+MODIFIED = "Modified"
+
+
+@dataclass
+class DiffRecord:
+    """Одно различие между двумя файлами."""
+
+    change: str  # ADDED / REMOVED / MODIFIED
+    old: Optional[Parameter]  # None для ADDED
+    new: Optional[Parameter]  # None для REMOVED
+
+    @property
+    def param(self) -> Parameter:
+        """Параметр, описывающий ключ (новый, если есть)."""
+        return self.new if self.new is not None else self.old
+
+
+def iter_diff(old_prm: PrmFile, new_prm: PrmFile) -> Iterator[DiffRecord]:
+    """
+    Сравнивает два файла и выдаёт различия в числовом порядке ключей
+    (number, axis, tool, keep) — слиянием двух заранее отсортированных списков.
+    Ничего не пишет и не импортирует openpyxl: подходит для проверок в цикле
+    (any(iter_diff(a, b)), подсчёт изменений и т.п.).
+
+    Если у обоих файлов уже есть хэши содержимого (кэш разбора, PrmFile.digests),
+    одинаковые файлы отсекаются сравнением корней, а сравниваются только номера
+    с различающимися хэшами блоков. Сами хэши здесь не считаются: для разового
+    сравнения это дороже, чем слияние целиком.
+    """
+    with profiling.span("diff.prepare"):
+        numbers = None
+        if old_prm.content_digests is not None and new_prm.content_digests is not None:
+            from digests import changed_numbers
+
+            numbers = changed_numbers(old_prm.content_digests, new_prm.content_digests)
+            profiling.count("diff.changed_numbers", len(numbers))
+            if not numbers:
+                return
+        old_keys, old_values, old_param = _sorted_view(old_prm.parameters, old_prm, new_prm, numbers)
+        new_keys, new_values, new_param = _sorted_view(new_prm.parameters, old_prm, new_prm, numbers)
+
+    i = j = 0
+    n_old = len(old_keys)
+    n_new = len(new_keys)
+    while i < n_old and j < n_new:
+        old_key = old_keys[i]
+        new_key = new_keys[j]
+        if old_key == new_key:
+            if old_values[i] != new_values[j]:
+                yield DiffRecord(MODIFIED, old_param(i), new_param(j))
+            i += 1
+            j += 1
+        elif old_key < new_key:
+            yield DiffRecord(REMOVED, old_param(i), None)
+            i += 1
+        else:
+            yield DiffRecord(ADDED, None, new_param(j))
+            j += 1
+
+    for i in range(i, n_old):
+        yield DiffRecord(REMOVED, old_param(i), None)
+    for j in range(j, n_new):
+        yield DiffRecord(ADDED, None, new_param(j))
+
+
+def summarize_diff(old_prm: PrmFile, new_prm: PrmFile) -> Counter:
+    """Число различий по типам: Counter({'Modified': 3, 'Added': 1})."""
+    return Counter(record.change for record in iter_diff(old_prm, new_prm))
+
+
+def _sorted_view(
+    parameters, old_prm: PrmFile, new_prm: PrmFile, numbers: Optional[List[int]] = None
+):
+    """
+    Возвращает (ключи, значения, фабрика параметра по позиции) в числовом порядке.
+
+    Если оба файла в ColumnarParameters — ключами служат готовые упакованные
+    ключи, а Parameter создаётся только для найденных различий. Иначе ключи —
+    кортежи (number, axis, tool, keep) с -1 вместо None.
+
+    :param numbers: только параметры с этими номерами (по возрастанию); None — все
+    """
+    both_columnar = isinstance(old_prm.parameters, ColumnarParameters) and isinstance(
+        new_prm.parameters, ColumnarParameters
+    )
+    if both_columnar:
+        if numbers is None:
+            pairs = list(parameters.iter_sorted())
+        else:
+            # Номер — старшие биты упакованного ключа: его ключи идут одним отрезком
+            pairs = []
+            for number in numbers:
+                pairs.extend(parameters.iter_sorted_range(number << 24, (number + 1) << 24))
+        rows = [row for _, row in pairs]
+        keys = [packed for packed, _ in pairs]
+        values = parameters.values_at(rows)
+        return keys, values, lambda i: parameters.parameter(rows[i])
+
+    params = parameters.values()
+    if numbers is not None:
+        wanted = set(numbers)
+        params = [p for p in params if p.number in wanted]
+    params = sorted(params, key=_tuple_key)
+    keys = [_tuple_key(p) for p in params]
+    values = [p.value for p in params]
+    return keys, values, params.__getitem__
+
+
+def _tuple_key(p: Parameter):
+    return (
+        p.number,
+        -1 if p.axis is None else p.axis,
+        -1 if p.tool is None else p.tool,
+        -1 if p.keep is None else p.keep,
+    )
 
 
 def compare_prm_files(
@@ -14,97 +135,38 @@ def compare_prm_files(
     use_axis_names: bool = False,
     file1_name: str = "OLD",
     file2_name: str = "NEW",
+    fmt: str = None,
 ):
-    old_params = old_prm.parameters
-    new_params = new_prm.parameters
+    """
+    Сравнивает два файла и сохраняет отчёт о различиях.
+    Формат — fmt или расширение output_path (xlsx, csv, jsonl, sqlite);
+    по умолчанию xlsx.
+    """
+    from exporters import export_diff, get_axis_names
 
     # Алиасы осей (если нужно)
-    axis_names_map = _get_axis_names(new_prm) if use_axis_names else {}
-
-    all_keys = set(old_params.keys()) | set(new_params.keys())
-    diff_rows = []
-
-    for key in sorted(all_keys):
-        old_param = old_params.get(key)
-        new_param = new_params.get(key)
-
-        if old_param is None:
-            # Added
-            diff_rows.append(_make_row(new_param, None, "Added", descriptions, axis_names_map))
-        elif new_param is None:
-            # Removed
-            diff_rows.append(_make_row(old_param, None, "Removed", descriptions, axis_names_map))
-        elif old_param.value != new_param.value:
-            # Modified
-            diff_rows.append(
-                _make_row(new_param, old_param.value, "Modified", descriptions, axis_names_map)
-            )
-
-    # Экспорт в Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Diff"
-
-    headers = [
-        "Parameter",
-        "Axis",
-        "Tool",
-        "Keep",
-        f"Value ({file1_name})",
-        f"Value ({file2_name})",
-        "Changed",
-        "Description",
-    ]
-    ws.append(headers)
-
-    # Стили
-    green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-
-    for row_data in diff_rows:
-        row = ws.append(row_data)
-        last_row = ws.max_row
-        change_type = row_data[6]  # Changed
-        if change_type == "Added":
-            for cell in ws[last_row]:
-                cell.fill = green_fill
-        elif change_type == "Removed":
-            for cell in ws[last_row]:
-                cell.fill = red_fill
-
-    # Закрепить шапку
-    ws.freeze_panes = "A2"
-
-    wb.save(output_path)
-
-
-def _get_axis_names(prm: PrmFile) -> dict:
-    axis_names = {}
-    for axis_num in range(1, 10):
-        key = f"1013_A{axis_num}"
-        if key in prm.parameters:
-            alias = prm.parameters[key].value
-            if alias:
-                axis_names[axis_num] = alias
-            else:
-                axis_names[axis_num] = f"A{axis_num}"
-        else:
-            axis_names[axis_num] = f"A{axis_num}"
-    return axis_names
-
-
-def _make_row(
-    param: Parameter, old_value: str, change_type: str, descriptions: dict, axis_names_map: dict
-):
-    axis_display = axis_names_map.get(param.axis, param.axis) if param.axis is not None else ""
-    desc = descriptions.get(param.number, {}).get("description", "") if descriptions else ""
-    return [
-        param.number,
-        axis_display,
-        param.tool if param.tool is not None else "",
-        param.keep if param.keep is not None else "",
-        old_value if old_value is not None else "",
-        param.value,
-        change_type,
-        desc,
-    ]
+    axis_names_map = get_axis_names(new_prm) if use_axis_names else {}
+
+    records = iter_diff(old_prm, new_prm)
+    if profiling.enabled():
+        records = _count_changes(records)
+
+    export_diff(
+        records,
+        output_path,
+        fmt=fmt,
+        descriptions=descriptions,
+        axis_names_map=axis_names_map,
+        file1_name=file1_name,
+        file2_name=file2_name,
+    )
+
+
+def _count_changes(records: Iterator[DiffRecord]) -> Iterator[DiffRecord]:
+    # Счётчики профиля по типам изменений; подключается только при включённом профилировании
+    counts = Counter()
+    for record in records:
+        counts[record.change] += 1
+        yield record
+    for change in (ADDED, REMOVED, MODIFIED):
+        profiling.count(f"diff.{change.lower()}", counts[change])
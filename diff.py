@@ -4,9 +4,12 @@ import sys
 import argparse
 from pathlib import Path
 
-from parser import parse_prm_file
+from parser import ENGINES, load_prm_file
 from utils import load_descriptions
-from comparator import compare_prm_files
+from comparator import ADDED, MODIFIED, REMOVED, compare_prm_files, summarize_diff
+from exporters import EXPORTERS as EXPORT_FORMATS
+from cache import add_cache_arguments, cache_from_args, snapshot_dir_from_args
+from profiling import add_profile_arguments, finish_from_args, start_from_args
 
 
 def main():
@@ -19,7 +22,12 @@ def main():
         "-o",
         "--output",
         default="diff.xlsx",
-        help="Путь для сохранения Excel-отчёта (по умолчанию: diff.xlsx)",
+        help="Путь для сохранения отчёта: .xlsx, .csv, .jsonl или .sqlite (по умолчанию: diff.xlsx)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        help="Формат отчёта (по умолчанию — по расширению файла, иначе xlsx)",
     )
     parser.add_argument(
         "--descriptions", type=Path, help="YAML-файл со справочником описаний параметров"
@@ -27,23 +35,38 @@ def main():
     parser.add_argument(
         "--axis-names", action="store_true", help="Использовать имена осей (X/Y/Z) вместо A1/A2/..."
     )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="regex", help="Движок парсера: regex или fast"
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Быстрая проверка: только число изменений по типам, без справочника и отчёта (-o игнорируется)",
+    )
+    add_cache_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    profile = start_from_args(args)
 
     try:
+        if args.quick:
+            _quick_check(args)
+            finish_from_args(profile, args)
+            return
+
         # Загрузка справочника
         descriptions = {}
         if args.descriptions:
             if not args.descriptions.exists():
                 print(f"ℹ️  Файл справочника не найден: {args.descriptions}", file=sys.stderr)
             else:
-                descriptions = load_descriptions(args.descriptions)
+                descriptions = load_descriptions(args.descriptions, cache_dir=snapshot_dir_from_args(args))
 
         # Парсинг
-        with open(args.old_file, "r", encoding="utf-8") as f:
-            old_prm = parse_prm_file(f, source_path=args.old_file)
-
-        with open(args.new_file, "r", encoding="utf-8") as f:
-            new_prm = parse_prm_file(f, source_path=args.new_file)
+        prm_cache = cache_from_args(args)
+        load = prm_cache.load if prm_cache is not None else load_prm_file
+        old_prm = load(args.old_file, engine=args.engine)
+        new_prm = load(args.new_file, engine=args.engine)
 
         # Имена файлов для заголовков
         file1_name = Path(args.old_file).stem
@@ -59,14 +82,33 @@ def main():
             use_axis_names=args.axis_names,
             file1_name=file1_name,
             file2_name=file2_name,
+            fmt=args.format,
         )
 
         print(f"✅ Отчёт о различиях сохранён: {output_path}")
+        finish_from_args(profile, args)
 
     except Exception as e:
         print(f"❌ Ошибка: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def _quick_check(args) -> None:
+    """Разбор обоих файлов и итог по типам изменений — без openpyxl и yaml."""
+    prm_cache = cache_from_args(args)
+    load = prm_cache.load if prm_cache is not None else load_prm_file
+    # Колоночное хранилище: diff сравнивает упакованные ключи, без объектов Parameter
+    old_prm = load(args.old_file, engine=args.engine, store="columnar")
+    new_prm = load(args.new_file, engine=args.engine, store="columnar")
+    counts = summarize_diff(old_prm, new_prm)
+    if not counts:
+        print("✅ Различий нет")
+        return
+    print(
+        f"📊 Различий: {sum(counts.values())} (изменено: {counts[MODIFIED]}, "
+        f"добавлено: {counts[ADDED]}, удалено: {counts[REMOVED]})"
+    )
+
+
 if __name__ == "__main__":
     main()
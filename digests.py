@@ -0,0 +1,124 @@
+# digests.py
+
+"""Дерево хэшей содержимого ALL.PRM (в духе дерева Меркла).
+
+Листья — блоки: все параметры одного номера в одном разделе
+(general / axis / tool / keep), в числовом порядке ключей. Хэш раздела
+считается по хэшам его блоков, корень — по хэшам разделов. Так:
+
+- одинаковые файлы распознаются сравнением корней, за O(1);
+- diff спускается только в номера, у которых различаются хэши блоков;
+- в парке станков одинаковые конфигурации схлопываются по корню.
+
+Хэшируется только содержимое параметров: заголовок (дата бэкапа) и порядок
+строк в файле на хэши не влияют.
+"""
+
+import hashlib
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from models import ColumnarParameters, pack_key
+
+
+GENERAL = "general"
+AXIS = "axis"
+TOOL = "tool"
+KEEP = "keep"
+SECTIONS = (GENERAL, AXIS, TOOL, KEEP)
+
+DIGEST_SIZE = 16
+
+
+@dataclass
+class ContentDigests:
+    """Хэши содержимого: корень, разделы и блоки (раздел, номер параметра)."""
+
+    root: bytes
+    sections: Dict[str, bytes]
+    blocks: Dict[Tuple[str, int], bytes]
+
+    def to_tuple(self) -> tuple:
+        """Представление из встроенных типов — для marshal в кэше разбора."""
+        return self.root, self.sections, self.blocks
+
+    @classmethod
+    def from_tuple(cls, data: tuple) -> "ContentDigests":
+        root, sections, blocks = data
+        return cls(root, sections, blocks)
+
+
+def section_of(packed: int) -> str:
+    """Раздел упакованного ключа: ось важнее инструмента, инструмент — keep."""
+    if packed & 0xFF0000:
+        return AXIS
+    if packed & 0xFF00:
+        return TOOL
+    if packed & 0xFF:
+        return KEEP
+    return GENERAL
+
+
+def _hash(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+def _sorted_entries(parameters) -> Tuple[array, List[str]]:
+    """Упакованные ключи (array 'Q') и значения в числовом порядке ключей."""
+    if isinstance(parameters, ColumnarParameters):
+        pairs = list(parameters.iter_sorted())
+        keys = array("Q", [packed for packed, _ in pairs])
+        return keys, parameters.values_at([row for _, row in pairs])
+    entries = sorted(
+        (pack_key(p.number, p.axis, p.tool, p.keep), p.value) for p in parameters.values()
+    )
+    return array("Q", [packed for packed, _ in entries]), [value for _, value in entries]
+
+
+def compute_digests(parameters) -> ContentDigests:
+    """Считает хэши по параметрам (dict или ColumnarParameters)."""
+    keys, values = _sorted_entries(parameters)
+
+    # Внутри номера ключи идут по разделам подряд (general, keep, tool, axis),
+    # поэтому блок — непрерывный отрезок отсортированных ключей. Лист блока —
+    # байты его ключей и значения через NUL (в текстовом файле NUL не встречается)
+    blocks: Dict[Tuple[str, int], bytes] = {}
+    start = 0
+    current = None
+    for i, packed in enumerate(keys):
+        block = (section_of(packed), packed >> 24)
+        if block != current:
+            if i:
+                blocks[current] = _hash_block(keys, values, start, i)
+            current = block
+            start = i
+    if keys:
+        blocks[current] = _hash_block(keys, values, start, len(keys))
+
+    section_parts: Dict[str, List[bytes]] = {name: [] for name in SECTIONS}
+    for (section, number), digest in blocks.items():
+        section_parts[section].append(number.to_bytes(4, "little") + digest)
+    sections = {name: _hash(b"".join(parts)) for name, parts in section_parts.items()}
+    root = _hash(b"".join(name.encode("ascii") + sections[name] for name in SECTIONS))
+    return ContentDigests(root, sections, blocks)
+
+
+def _hash_block(keys: array, values: List[str], start: int, end: int) -> bytes:
+    return _hash(keys[start:end].tobytes() + "\0".join(values[start:end]).encode("utf-8"))
+
+
+def changed_numbers(old: ContentDigests, new: ContentDigests) -> List[int]:
+    """
+    Номера параметров, в которых файлы различаются (по возрастанию).
+    Разделы с одинаковыми хэшами не просматриваются вовсе.
+    """
+    if old.root == new.root:
+        return []
+    differing_sections = {name for name in SECTIONS if old.sections[name] != new.sections[name]}
+    numbers = set()
+    for blocks, other in ((old.blocks, new.blocks), (new.blocks, old.blocks)):
+        for block, digest in blocks.items():
+            if block[0] in differing_sections and other.get(block) != digest:
+                numbers.add(block[1])
+    return sorted(numbers)
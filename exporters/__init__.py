@@ -0,0 +1,114 @@
+# exporters/__init__.py
+
+"""Реестр форматов вывода.
+
+Каждый модуль-приёмник реализует три функции и пишет строки по мере поступления,
+не собирая таблицу целиком в памяти:
+
+    write_parameters(header_lines, columns, rows, output_path)
+    write_diff(columns, rows, output_path)
+    write_violations(columns, rows, output_path)
+
+где columns — список пар (поле, заголовок) из exporters.rows, rows — итератор строк.
+Модули импортируются лениво: openpyxl загружается, только если выбран xlsx.
+"""
+
+import importlib
+from pathlib import Path
+
+import profiling
+from exporters.rows import (
+    PARAMETER_COLUMNS,
+    VIOLATION_COLUMNS,
+    diff_columns,
+    get_axis_names,
+    iter_diff_rows,
+    iter_parameter_rows,
+    iter_violation_rows,
+)
+
+
+EXPORTERS = {
+    "xlsx": "exporters.to_excel",
+    "csv": "exporters.to_csv",
+    "jsonl": "exporters.to_jsonl",
+    "sqlite": "exporters.to_sqlite",
+}
+
+EXTENSIONS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".db": "sqlite",
+}
+
+
+def resolve_format(output_path: Path, fmt: str = None) -> str:
+    """Формат из явного fmt или из расширения файла; по умолчанию — xlsx."""
+    if fmt is not None:
+        if fmt not in EXPORTERS:
+            raise ValueError(f"Неизвестный формат вывода: {fmt}. Допустимые: {', '.join(EXPORTERS)}")
+        return fmt
+    return EXTENSIONS.get(Path(output_path).suffix.lower(), "xlsx")
+
+
+def get_exporter(fmt: str):
+    """Модуль-приёмник для формата."""
+    return importlib.import_module(EXPORTERS[resolve_format("", fmt)])
+
+
+def export_parameters(
+    prm,
+    output_path: Path,
+    fmt: str = None,
+    descriptions: dict = None,
+    use_axis_names: bool = False,
+):
+    """Выгрузка всех параметров файла в выбранный формат."""
+    fmt = resolve_format(output_path, fmt)
+    exporter = get_exporter(fmt)
+    axis_names_map = get_axis_names(prm) if use_axis_names else {}
+    rows = _counted(iter_parameter_rows(prm.parameters.values(), descriptions, axis_names_map))
+    with profiling.span(f"export.{fmt}"):
+        exporter.write_parameters(prm.header.raw_lines, PARAMETER_COLUMNS, rows, output_path)
+    _count_rows(rows)
+
+
+def export_diff(
+    records,
+    output_path: Path,
+    fmt: str = None,
+    descriptions: dict = None,
+    axis_names_map: dict = None,
+    file1_name: str = "OLD",
+    file2_name: str = "NEW",
+):
+    """Выгрузка потока comparator.iter_diff() в выбранный формат."""
+    fmt = resolve_format(output_path, fmt)
+    exporter = get_exporter(fmt)
+    rows = _counted(iter_diff_rows(records, descriptions, axis_names_map))
+    with profiling.span(f"export.diff.{fmt}"):
+        exporter.write_diff(diff_columns(file1_name, file2_name), rows, output_path)
+    _count_rows(rows)
+
+
+def export_violations(results, output_path: Path, fmt: str = None, descriptions: dict = None):
+    """Выгрузка нарушений правил: results — пары (станок, validate.ValidationResult)."""
+    fmt = resolve_format(output_path, fmt)
+    exporter = get_exporter(fmt)
+    rows = _counted(iter_violation_rows(results, descriptions))
+    with profiling.span(f"export.violations.{fmt}"):
+        exporter.write_violations(VIOLATION_COLUMNS, rows, output_path)
+    _count_rows(rows)
+
+
+def _counted(rows):
+    # Строки считаются только при включённом профилировании
+    return profiling.CountingIterator(rows) if profiling.enabled() else rows
+
+
+def _count_rows(rows) -> None:
+    if isinstance(rows, profiling.CountingIterator):
+        profiling.count("rows_written", rows.count)
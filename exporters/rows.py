@@ -0,0 +1,143 @@
+# exporters/rows.py
+
+"""Строки отчётов, общие для всех форматов вывода (xlsx, csv, jsonl, sqlite).
+
+Колонки описываются парами (поле, заголовок): заголовки идут в xlsx/csv,
+имена полей — в jsonl/sqlite.
+"""
+
+from typing import Iterable, Iterator, List, Tuple
+
+from models import Parameter, PrmFile
+
+
+PARAMETER_COLUMNS: List[Tuple[str, str]] = [
+    ("parameter", "Parameter"),
+    ("axis", "Axis"),
+    ("tool", "Tool"),
+    ("keep", "Keep"),
+    ("value", "Value"),
+    ("group", "Group"),
+    ("subgroup", "Subgroup"),
+    ("shortname", "Short Name"),
+    ("description", "Description"),
+]
+
+
+def diff_columns(file1_name: str = "OLD", file2_name: str = "NEW") -> List[Tuple[str, str]]:
+    return [
+        ("parameter", "Parameter"),
+        ("axis", "Axis"),
+        ("tool", "Tool"),
+        ("keep", "Keep"),
+        ("old_value", f"Value ({file1_name})"),
+        ("new_value", f"Value ({file2_name})"),
+        ("change", "Changed"),
+        ("description", "Description"),
+    ]
+
+
+VIOLATION_COLUMNS: List[Tuple[str, str]] = [
+    ("machine", "Machine"),
+    ("parameter", "Parameter"),
+    ("axis", "Axis"),
+    ("tool", "Tool"),
+    ("keep", "Keep"),
+    ("value", "Value"),
+    ("rule", "Rule"),
+    ("message", "Message"),
+    ("description", "Description"),
+]
+
+
+def get_axis_names(prm: PrmFile) -> dict:
+    """
+    Возвращает словарь: {1: 'X', 2: 'Y', ...}
+    На основе параметра 1013Ax из файла ALL.PRM.
+    Если значение пустое или отсутствует — возвращается оригинальный номер оси.
+    """
+    axis_names = {}
+    for axis_num in range(1, 10):  # A1..A9
+        key = f"1013_A{axis_num}"
+        if key in prm.parameters:
+            alias = prm.parameters[key].value
+            if alias:  # если не пусто
+                axis_names[axis_num] = alias
+            else:
+                axis_names[axis_num] = f"A{axis_num}"
+        else:
+            axis_names[axis_num] = f"A{axis_num}"
+    return axis_names
+
+
+def iter_parameter_rows(
+    params: Iterable[Parameter], descriptions: dict = None, axis_names_map: dict = None
+) -> Iterator[list]:
+    """Строки в порядке PARAMETER_COLUMNS; каждая строится один раз."""
+    descriptions = descriptions or {}
+    axis_names_map = axis_names_map or {}
+    empty = {}
+    for p in params:
+        desc = descriptions.get(p.number, empty)
+        yield [
+            p.number,
+            "" if p.axis is None else axis_names_map.get(p.axis, str(p.axis)),
+            p.tool if p.tool is not None else "",
+            p.keep if p.keep is not None else "",
+            p.value,
+            desc.get("group", ""),
+            desc.get("subgroup", ""),
+            desc.get("shortname", ""),
+            desc.get("description", ""),
+        ]
+
+
+def iter_diff_rows(records, descriptions: dict = None, axis_names_map: dict = None) -> Iterator[list]:
+    """Строки в порядке diff_columns() из потока comparator.iter_diff()."""
+    axis_names_map = axis_names_map or {}
+    for record in records:
+        if record.old is not None and record.new is not None:
+            yield diff_row(record.new, record.old.value, record.change, descriptions, axis_names_map)
+        else:
+            # Added — новый параметр, Removed — старый; колонка старого значения пуста
+            yield diff_row(record.param, None, record.change, descriptions, axis_names_map)
+
+
+def diff_row(
+    param: Parameter, old_value: str, change_type: str, descriptions: dict, axis_names_map: dict
+) -> list:
+    axis_display = axis_names_map.get(param.axis, param.axis) if param.axis is not None else ""
+    desc = descriptions.get(param.number, {}).get("description", "") if descriptions else ""
+    return [
+        param.number,
+        axis_display,
+        param.tool if param.tool is not None else "",
+        param.keep if param.keep is not None else "",
+        old_value if old_value is not None else "",
+        param.value,
+        change_type,
+        desc,
+    ]
+
+
+def iter_violation_rows(results, descriptions: dict = None) -> Iterator[list]:
+    """
+    Строки в порядке VIOLATION_COLUMNS.
+    results — пары (станок, validate.ValidationResult); имена осей — свои у каждого станка.
+    """
+    descriptions = descriptions or {}
+    empty = {}
+    for machine, result in results:
+        axis_names_map = result.axis_names
+        for v in result.violations:
+            yield [
+                machine,
+                v.number,
+                "" if v.axis is None else axis_names_map.get(v.axis, str(v.axis)),
+                v.tool if v.tool is not None else "",
+                v.keep if v.keep is not None else "",
+                v.value if v.value is not None else "",
+                v.rule,
+                v.message,
+                descriptions.get(v.number, empty).get("description", ""),
+            ]
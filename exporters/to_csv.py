@@ -0,0 +1,28 @@
+# exporters/to_csv.py
+
+import csv
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+
+def write_parameters(
+    header_lines: List[str], columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path
+):
+    # Метаданные заголовка в CSV не пишутся: одна таблица — один файл
+    _write(columns, rows, output_path)
+
+
+def write_diff(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    _write(columns, rows, output_path)
+
+
+def write_violations(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    _write(columns, rows, output_path)
+
+
+def _write(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    # utf-8-sig — чтобы Excel корректно открывал кириллицу
+    with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([title for _, title in columns])
+        writer.writerows(rows)
@@ -1,111 +1,168 @@
 # exporters/to_excel.py
 
 from pathlib import Path
+from typing import Iterable, List, Tuple
 from openpyxl import Workbook
+from openpyxl.styles import PatternFill
 from models import PrmFile
+import profiling
+from exporters.rows import (
+    PARAMETER_COLUMNS,
+    get_axis_names as _get_axis_names,
+    iter_parameter_rows,
+)
 
 
-def _get_axis_names(prm: PrmFile) -> dict:
+def export_to_excel(
+    prm: PrmFile,
+    output_path: Path,
+    descriptions: dict = None,
+    use_axis_names: bool = False,
+    write_only: bool = False,
+):
     """
-    Возвращает словарь: {1: 'X', 2: 'Y', ...}
-    На основе параметра 1013Ax из файла ALL.PRM.
-    Если значение пустое или отсутствует — возвращается оригинальный номер оси.
+    Экспортирует параметры в Excel: лист заголовка, все параметры и листы
+    по категориям (General/Axis/Tool/Keep).
+
+    :param write_only: потоковая запись через write-only книгу openpyxl —
+                       память не растёт с размером файла, параметры
+                       раскладываются по листам за один проход
     """
-    axis_names = {}
-    for axis_num in range(1, 10):  # A1..A9
-        key = f"1013_A{axis_num}"
-        if key in prm.parameters:
-            alias = prm.parameters[key].value
-            if alias:  # если не пусто
-                axis_names[axis_num] = alias
-            else:
-                axis_names[axis_num] = f"A{axis_num}"
+    with profiling.span("export.xlsx"):
+        if write_only:
+            _export_write_only(prm, output_path, descriptions, use_axis_names)
         else:
-            axis_names[axis_num] = f"A{axis_num}"
-    return axis_names
+            _export_workbook(prm, output_path, descriptions, use_axis_names)
+    profiling.count("rows_written", len(prm.parameters))
 
 
-def export_to_excel(
-    prm: PrmFile, output_path: Path, descriptions: dict = None, use_axis_names: bool = False
+def _export_workbook(prm: PrmFile, output_path: Path, descriptions: dict, use_axis_names: bool):
+    axis_names_map = _get_axis_names(prm) if use_axis_names else {}
+    rows = iter_parameter_rows(prm.parameters.values(), descriptions, axis_names_map)
+    _write_parameter_sheets(Workbook(), prm.header.raw_lines, PARAMETER_COLUMNS, rows, output_path)
+
+
+def _export_write_only(
+    prm: PrmFile, output_path: Path, descriptions: dict, use_axis_names: bool
 ):
-    wb = Workbook()
+    axis_names_map = _get_axis_names(prm) if use_axis_names else {}
+    rows = iter_parameter_rows(prm.parameters.values(), descriptions, axis_names_map)
+    write_parameters(prm.header.raw_lines, PARAMETER_COLUMNS, rows, output_path)
+
+
+def write_parameters(
+    header_lines: List[str], columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path
+):
+    """
+    То же содержимое, что и в обычном режиме export_to_excel (листы строит
+    одна функция), но строки пишутся сразу на диск (write-only книга).
+    """
+    _write_parameter_sheets(Workbook(write_only=True), header_lines, columns, rows, output_path)
+
+
+def _write_parameter_sheets(
+    wb: Workbook,
+    header_lines: List[str],
+    columns: List[Tuple[str, str]],
+    rows: Iterable[list],
+    output_path: Path,
+):
+    """
+    Лист заголовка, все параметры и листы по категориям (General/Axis/Tool/Keep);
+    каждая строка попадает во все подходящие листы за один проход. Категория
+    определяется по колонкам Axis/Tool/Keep: пустая строка — квалификатора нет.
+    """
+    # У обычной книги есть пустой лист по умолчанию, у write-only — нет
+    for ws in list(wb.worksheets):
+        wb.remove(ws)
+    headers = [title for _, title in columns]
 
     # Лист 1: Метаданные
-    ws_header = wb.active
-    ws_header.title = "Header"
+    ws_header = wb.create_sheet(title="Header")
     ws_header.append(["Field", "Value"])
-    for i, line in enumerate(prm.header.raw_lines, start=1):
+    for i, line in enumerate(header_lines, start=1):
         ws_header.append([f"Line {i}", line.lstrip(";")])
 
-    # Получаем название осей, если нужно
-    axis_names_map = _get_axis_names(prm) if use_axis_names else {}
-
-    # Вспомогательная функция для отображения оси
-    def format_axis(axis):
-        if axis is None:
-            return ""
-        return axis_names_map.get(axis, str(axis))  # если нет — просто число
-
-    # Лист 2: Все параметры
-    ws_all = wb.create_sheet(title="Parameters.All")
-    headers = [
-        "Parameter",
-        "Axis",
-        "Tool",
-        "Keep",
-        "Value",
-        "Group",
-        "Subgroup",
-        "Short Name",
-        "Description",
-    ]
-    ws_all.append(headers)
-
-    for key in prm.parameters.keys():
-        p = prm.parameters[key]
-        desc = descriptions.get(p.number, {}) if descriptions else {}
-        ws_all.append(
-            [
-                p.number,
-                format_axis(p.axis),
-                p.tool if p.tool is not None else "",
-                p.keep if p.keep is not None else "",
-                p.value,
-                desc.get("group", ""),
-                desc.get("subgroup", ""),
-                desc.get("shortname", ""),
-                desc.get("description", ""),
-            ]
-        )
-    ws_all.freeze_panes = "A2"
-
-    # --- Дополнительно: листы по категориям ---
-    def _add_sheet(ws_name: str, condition):
-        ws = wb.create_sheet(title=ws_name)
-        ws.append(headers)
-        for key in prm.parameters.keys():
-            p = prm.parameters[key]
-            if not condition(p):
-                continue
-            desc = descriptions.get(p.number, {}) if descriptions else {}
-            ws.append(
-                [
-                    p.number,
-                    format_axis(p.axis),
-                    p.tool if p.tool is not None else "",
-                    p.keep if p.keep is not None else "",
-                    p.value,
-                    desc.get("group", ""),
-                    desc.get("subgroup", ""),
-                    desc.get("shortname", ""),
-                    desc.get("description", ""),
-                ]
-            )
+    sheets = {}
+    for title in (
+        "Parameters.All",
+        "Parameters.General",
+        "Parameters.Axis",
+        "Parameters.Tool",
+        "Parameters.Keep",
+    ):
+        ws = wb.create_sheet(title=title)
+        # В write-only режиме закрепление задаётся до первой строки
         ws.freeze_panes = "A2"
+        ws.append(headers)
+        sheets[title] = ws
+
+    ws_all = sheets["Parameters.All"]
+    ws_general = sheets["Parameters.General"]
+    ws_axis = sheets["Parameters.Axis"]
+    ws_tool = sheets["Parameters.Tool"]
+    ws_keep = sheets["Parameters.Keep"]
+
+    for row in rows:
+        ws_all.append(row)
+        axis, tool, keep = row[1], row[2], row[3]
+        if axis == "" and tool == "" and keep == "":
+            ws_general.append(row)
+            continue
+        if axis != "":
+            ws_axis.append(row)
+        if tool != "":
+            ws_tool.append(row)
+        if keep != "":
+            ws_keep.append(row)
+
+    with profiling.span("xlsx.save"):
+        wb.save(output_path)
+
+
+def write_diff(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    """Лист Diff: добавленные строки — зелёные, удалённые — красные."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Diff"
+
+    headers = [title for _, title in columns]
+    ws.append(headers)
+    change_column = [field for field, _ in columns].index("change")
+
+    # Стили
+    green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+
+    # Номер строки считаем сами: ws.max_row на каждой строке — квадратичная сложность
+    for row_number, row_data in enumerate(rows, start=2):
+        ws.append(row_data)
+        change_type = row_data[change_column]
+        if change_type == "Added":
+            fill = green_fill
+        elif change_type == "Removed":
+            fill = red_fill
+        else:
+            continue
+        for column in range(1, len(headers) + 1):
+            ws.cell(row=row_number, column=column).fill = fill
+
+    # Закрепить шапку
+    ws.freeze_panes = "A2"
+
+    with profiling.span("xlsx.save"):
+        wb.save(output_path)
+
 
-    _add_sheet("Parameters.General", lambda p: p.axis is None and p.tool is None and p.keep is None)
-    _add_sheet("Parameters.Axis", lambda p: p.axis is not None)
-    _add_sheet("Parameters.Tool", lambda p: p.tool is not None)
-    _add_sheet("Parameters.Keep", lambda p: p.keep is not None)
+def write_violations(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    """Лист Violations; строки пишутся сразу на диск (write-only книга)."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Violations")
+    # В write-only режиме закрепление задаётся до первой строки
+    ws.freeze_panes = "A2"
+    ws.append([title for _, title in columns])
+    for row in rows:
+        ws.append(row)
 
-    wb.save(output_path)
+    with profiling.span("xlsx.save"):
+        wb.save(output_path)
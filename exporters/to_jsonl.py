@@ -0,0 +1,35 @@
+# exporters/to_jsonl.py
+
+import json
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+
+def write_parameters(
+    header_lines: List[str], columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path
+):
+    with open(output_path, "w", encoding="utf-8") as f:
+        # Первая запись — метаданные заголовка, далее по одной записи на параметр
+        header = {"type": "header", "lines": [line.lstrip(";") for line in header_lines]}
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        _write_rows(f, columns, rows, "parameter")
+
+
+def write_diff(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    with open(output_path, "w", encoding="utf-8") as f:
+        _write_rows(f, columns, rows, "diff")
+
+
+def write_violations(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    with open(output_path, "w", encoding="utf-8") as f:
+        _write_rows(f, columns, rows, "violation")
+
+
+def _write_rows(f, columns: List[Tuple[str, str]], rows: Iterable[list], record_type: str):
+    fields = [field for field, _ in columns]
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    for row in rows:
+        record = {"type": record_type}
+        record.update(zip(fields, row))
+        f.write(dumps(record))
+        f.write("\n")
@@ -0,0 +1,70 @@
+# exporters/to_sqlite.py
+
+"""Выгрузка в SQLite. Таблицы пересоздаются при каждой выгрузке; строки
+вставляются через executemany прямо из потока, одной транзакцией: если
+выгрузка прервалась, файл остаётся таким, каким был до неё."""
+
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+
+def write_parameters(
+    header_lines: List[str], columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path
+):
+    with _transaction(output_path) as conn:
+        _replace_table(conn, "header", [("line", "Line"), ("value", "Value")])
+        conn.executemany(
+            "INSERT INTO header VALUES (?, ?)",
+            ((i, line.lstrip(";")) for i, line in enumerate(header_lines, start=1)),
+        )
+        _insert(conn, "parameters", columns, rows)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_parameters_number ON parameters(parameter)")
+
+
+def write_diff(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    with _transaction(output_path) as conn:
+        _insert(conn, "diff", columns, rows)
+
+
+def write_violations(columns: List[Tuple[str, str]], rows: Iterable[list], output_path: Path):
+    with _transaction(output_path) as conn:
+        _insert(conn, "violations", columns, rows)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_machine ON violations(machine)")
+
+
+@contextmanager
+def _transaction(output_path: Path) -> Iterator[sqlite3.Connection]:
+    """
+    Соединение с одной явной транзакцией на всю выгрузку, включая DROP/CREATE
+    (неявная транзакция модуля sqlite3 начинается только перед INSERT).
+    При ошибке изменения откатываются, а созданный выгрузкой файл удаляется.
+    """
+    output_path = Path(output_path)
+    created = not output_path.exists()
+    conn = sqlite3.connect(str(output_path), isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.close()
+        if created:
+            output_path.unlink(missing_ok=True)
+        raise
+    conn.close()
+
+
+def _replace_table(conn: sqlite3.Connection, table: str, columns: List[Tuple[str, str]]):
+    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    column_list = ", ".join('"' + field + '"' for field, _ in columns)
+    conn.execute(f'CREATE TABLE "{table}" ({column_list})')
+
+
+def _insert(conn: sqlite3.Connection, table: str, columns: List[Tuple[str, str]], rows: Iterable[list]):
+    _replace_table(conn, table, columns)
+    placeholders = ", ".join("?" for _ in columns)
+    conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', rows)
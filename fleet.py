@@ -0,0 +1,203 @@
+# fleet.py
+
+"""Сравнение парка станков с эталоном: один эталонный ALL.PRM против многих.
+
+Все файлы сливаются за один проход в матрицу «ключ × станок»; по каждому
+ключу, где хотя бы один станок отличается от эталона, сохраняются значения
+всех станков и их распределение.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from comparator import _tuple_key
+from models import Parameter, PrmFile
+
+
+@dataclass
+class FleetRow:
+    """Один ключ, по которому хотя бы один станок отличается от эталона."""
+
+    param: Parameter  # номер и квалификаторы ключа (значение — из эталона, если есть)
+    baseline_value: Optional[str]  # None — параметра нет в эталоне
+    values: List[Optional[str]]  # по станкам, в порядке FleetReport.machines; None — нет параметра
+    differing: List[str]  # имена отличающихся станков
+    distribution: Counter = field(default_factory=Counter)  # значение → число станков
+
+
+@dataclass
+class FleetReport:
+    machines: List[str]
+    rows: List[FleetRow]
+    baseline_name: str = "BASELINE"
+
+    def deviations_by_machine(self) -> Dict[str, int]:
+        """Число отличающихся ключей по каждому станку."""
+        counts = dict.fromkeys(self.machines, 0)
+        for row in self.rows:
+            for name in row.differing:
+                counts[name] += 1
+        return counts
+
+
+def compare_fleet(
+    baseline: PrmFile, machines: Dict[str, PrmFile], baseline_name: str = "BASELINE"
+) -> FleetReport:
+    """
+    Сравнивает каждый станок с эталоном.
+
+    :param baseline: эталонный файл
+    :param machines: {имя станка: PrmFile}
+    :return: FleetReport — только ключи с отличиями, в числовом порядке
+             (number, axis, tool, keep)
+    """
+    names = list(machines)
+
+    # Станки с одинаковым содержимым (по корню хэшей, если они уже посчитаны —
+    # например, загружены из кэша разбора) разбираются один раз: у них общая колонка
+    columns: List[int] = []
+    unique: List[str] = []
+    by_root: Dict[bytes, int] = {}
+    for name in names:
+        digests = machines[name].content_digests
+        column = by_root.get(digests.root) if digests is not None else None
+        if column is None:
+            column = len(unique)
+            unique.append(name)
+            if digests is not None:
+                by_root[digests.root] = column
+        columns.append(column)
+    width = len(unique)
+
+    # Матрица: ключ → [значение по каждой уникальной конфигурации]; один проход по каждой
+    matrix: Dict[str, List[Optional[str]]] = {}
+    params: Dict[str, Parameter] = {}
+    for column, name in enumerate(unique):
+        for key, param in machines[name].parameters.items():
+            row = matrix.get(key)
+            if row is None:
+                row = matrix[key] = [None] * width
+                params[key] = param
+            row[column] = param.value
+
+    baseline_params = baseline.parameters
+    missing_everywhere = [None] * width
+    for key, param in baseline_params.items():
+        params[key] = param
+        if key not in matrix:
+            matrix[key] = missing_everywhere
+
+    rows = []
+    for key in sorted(matrix, key=lambda k: _tuple_key(params[k])):
+        unique_values = matrix[key]
+        base = baseline_params.get(key)
+        baseline_value = base.value if base is not None else None
+        if all(value == baseline_value for value in unique_values):
+            continue
+        values = [unique_values[column] for column in columns]
+        differing = [names[i] for i, value in enumerate(values) if value != baseline_value]
+        rows.append(
+            FleetRow(
+                param=params[key],
+                baseline_value=baseline_value,
+                values=values,
+                differing=differing,
+                distribution=Counter(values),
+            )
+        )
+
+    return FleetReport(machines=names, rows=rows, baseline_name=baseline_name)
+
+
+def format_distribution(distribution: Counter) -> str:
+    """'9000 ×150; 8000 ×49; <нет> ×1' — по убыванию числа станков."""
+    parts = []
+    for value, count in distribution.most_common():
+        shown = "<нет>" if value is None else (value if value != "" else "<пусто>")
+        parts.append(f"{shown} ×{count}")
+    return "; ".join(parts)
+
+
+def export_fleet_report(
+    report: FleetReport,
+    output_path: Path,
+    descriptions: dict = None,
+    axis_names_map: dict = None,
+):
+    """
+    Сохраняет отчёт в одну Excel-книгу: сводка по ключам, матрица значений
+    (отличия от эталона подсвечены) и число отличий по станкам.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import PatternFill
+
+    descriptions = descriptions or {}
+    axis_names_map = axis_names_map or {}
+    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+
+    def key_columns(p: Parameter):
+        return [
+            p.number,
+            axis_names_map.get(p.axis, p.axis) if p.axis is not None else "",
+            p.tool if p.tool is not None else "",
+            p.keep if p.keep is not None else "",
+        ]
+
+    wb = Workbook(write_only=True)
+
+    # Лист 1: сводка по ключам
+    ws_summary = wb.create_sheet(title="Summary")
+    ws_summary.freeze_panes = "A2"
+    ws_summary.append(
+        [
+            "Parameter",
+            "Axis",
+            "Tool",
+            "Keep",
+            f"Value ({report.baseline_name})",
+            "Differing",
+            "Machines",
+            "Distribution",
+            "Description",
+        ]
+    )
+    for row in report.rows:
+        p = row.param
+        ws_summary.append(
+            key_columns(p)
+            + [
+                row.baseline_value if row.baseline_value is not None else "",
+                len(row.differing),
+                ", ".join(row.differing),
+                format_distribution(row.distribution),
+                descriptions.get(p.number, {}).get("description", ""),
+            ]
+        )
+
+    # Лист 2: матрица ключ × станок
+    ws_matrix = wb.create_sheet(title="Matrix")
+    ws_matrix.freeze_panes = "F2"
+    ws_matrix.append(["Parameter", "Axis", "Tool", "Keep", report.baseline_name] + report.machines)
+    for row in report.rows:
+        cells = key_columns(row.param)
+        cells.append(row.baseline_value if row.baseline_value is not None else "")
+        for value in row.values:
+            if value == row.baseline_value:
+                cells.append(value if value is not None else "")
+                continue
+            cell = WriteOnlyCell(ws_matrix, value=value if value is not None else "")
+            cell.fill = red_fill
+            cells.append(cell)
+        ws_matrix.append(cells)
+
+    # Лист 3: число отличий по станкам
+    ws_machines = wb.create_sheet(title="Machines")
+    ws_machines.freeze_panes = "A2"
+    ws_machines.append(["Machine", "Differing parameters"])
+    for name, count in report.deviations_by_machine().items():
+        ws_machines.append([name, count])
+
+    wb.save(output_path)
@@ -0,0 +1,99 @@
+# fleet_diff.py
+
+import sys
+import argparse
+from pathlib import Path
+
+from batch import find_prm_files, machine_names
+from parser import ENGINES, load_prm_file
+from fleet import compare_fleet, export_fleet_report
+from interning import InternPool
+from cache import add_cache_arguments, cache_from_args, snapshot_dir_from_args
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Сравнение парка станков с эталонным файлом ALL.PRM (один отчёт на всех)"
+    )
+    parser.add_argument("baseline", help="Путь к эталонному файлу ALL.PRM")
+    parser.add_argument("source", help="Папка с бэкапами станков или glob-шаблон")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="fleet.xlsx",
+        help="Путь для сохранения Excel-отчёта (по умолчанию: fleet.xlsx)",
+    )
+    parser.add_argument(
+        "--descriptions", type=Path, help="YAML-файл со справочником описаний параметров"
+    )
+    parser.add_argument(
+        "--axis-names",
+        action="store_true",
+        help="Использовать имена осей эталона (X/Y/Z) вместо A1/A2/...",
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="regex", help="Движок парсера: regex или fast"
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    files = [p for p in find_prm_files(args.source) if p.resolve() != baseline_path.resolve()]
+    if not files:
+        print(f"❌ Файлы ALL.PRM не найдены: {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        # Загрузка справочника
+        descriptions = {}
+        if args.descriptions:
+            if not args.descriptions.exists():
+                print(f"ℹ️  Файл справочника не найден: {args.descriptions}", file=sys.stderr)
+            else:
+                from utils import load_descriptions
+
+                descriptions = load_descriptions(args.descriptions, cache_dir=snapshot_dir_from_args(args))
+
+        prm_cache = cache_from_args(args)
+        load = prm_cache.load if prm_cache is not None else load_prm_file
+        # Весь парк держится в памяти: одинаковые строки станков — в общем пуле
+        pool = InternPool()
+        baseline = load(baseline_path, engine=args.engine, pool=pool)
+
+        # Парсинг станков; файлы с ошибками пропускаются, но попадают в сводку
+        machines = {}
+        failed = []
+        for name, path in zip(machine_names(files), files):
+            try:
+                machines[name] = load(path, engine=args.engine, pool=pool)
+            except ValueError as e:
+                failed.append((path, e))
+
+        report = compare_fleet(baseline, machines, baseline_name=baseline_path.stem)
+
+        axis_names_map = {}
+        if args.axis_names:
+            from exporters.rows import get_axis_names
+
+            axis_names_map = get_axis_names(baseline)
+
+        output_path = Path(args.output)
+        export_fleet_report(
+            report, output_path, descriptions=descriptions, axis_names_map=axis_names_map
+        )
+
+        deviating = sum(1 for count in report.deviations_by_machine().values() if count)
+        print(f"📊 Станков: {len(machines)}, отличаются от эталона: {deviating}")
+        print(f"📊 Параметров с отличиями: {len(report.rows)}")
+        print(f"ℹ️  Общий пул строк: {pool.summary()}")
+        for path, e in failed:
+            print(f"❌ {path}: {e}", file=sys.stderr)
+        print(f"✅ Отчёт по парку сохранён: {output_path}")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
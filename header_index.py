@@ -0,0 +1,184 @@
+# header_index.py
+
+"""Каталог архива бэкапов по заголовкам ALL.PRM.
+
+Из каждого файла читается только заголовок (parser.scan_header — до строки
+PARA101()), параметры не разбираются. Файлы читаются на пуле потоков: работа
+упирается в открытие файлов и диск или сеть, а не в процессор. Результат —
+индекс (путь, дата, модель ЧПУ, серийные номера) в CSV или SQLite,
+отсортированный по дате; в SQLite дата и модель проиндексированы.
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from batch import find_prm_files
+from parser import scan_header
+from snapshots import parse_timestamp
+
+
+DEFAULT_WORKERS = 16
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+@dataclass
+class HeaderEntry:
+    """Строка индекса: заголовок одного файла или ошибка его чтения."""
+
+    path: str
+    datetime: Optional[str] = None  # как в заголовке
+    taken_at: Optional[str] = None  # ISO 8601 — для сортировки; None, если дата не распознана
+    cnc_model: Optional[str] = None
+    serials: List[str] = field(default_factory=list)
+    error: str = ""
+
+
+def scan_entry(path: Path) -> HeaderEntry:
+    """Заголовок одного файла; ошибки чтения и формата попадают в entry.error."""
+    try:
+        header = scan_header(path)
+    except (OSError, ValueError, UnicodeDecodeError) as e:
+        return HeaderEntry(str(path), error=str(e))
+
+    taken_at = None
+    if header.datetime:
+        try:
+            taken_at = parse_timestamp(header.datetime)
+        except ValueError:
+            pass
+    return HeaderEntry(str(path), header.datetime, taken_at, header.cnc_model, header.serials)
+
+
+def build_index(files: Iterable[Path], workers: int = DEFAULT_WORKERS) -> List[HeaderEntry]:
+    """
+    Читает заголовки на пуле из workers потоков. Результат отсортирован
+    по дате (файлы без даты — в конце), затем по пути.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = list(pool.map(scan_entry, files))
+    entries.sort(key=lambda e: (e.taken_at is None, e.taken_at or "", e.path))
+    return entries
+
+
+def write_csv(entries: List[HeaderEntry], output_path: Path) -> None:
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Path", "Datetime", "Taken At", "CNC Model", "Serials", "Error"])
+        for e in entries:
+            writer.writerow(
+                [
+                    e.path,
+                    e.datetime or "",
+                    e.taken_at or "",
+                    e.cnc_model or "",
+                    "; ".join(e.serials),
+                    e.error,
+                ]
+            )
+
+
+def write_sqlite(entries: List[HeaderEntry], output_path: Path) -> None:
+    """Таблица headers (пересоздаётся) с индексами по дате и модели."""
+    conn = sqlite3.connect(output_path)
+    try:
+        with conn:
+            conn.executescript(
+                """
+                DROP TABLE IF EXISTS headers;
+                CREATE TABLE headers (
+                    path TEXT PRIMARY KEY,
+                    datetime TEXT,
+                    taken_at TEXT,
+                    cnc_model TEXT,
+                    serials TEXT,
+                    error TEXT
+                );
+                """
+            )
+            conn.executemany(
+                "INSERT INTO headers VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        e.path,
+                        e.datetime,
+                        e.taken_at,
+                        e.cnc_model,
+                        "; ".join(e.serials),
+                        e.error or None,
+                    )
+                    for e in entries
+                ),
+            )
+            conn.execute("CREATE INDEX headers_taken_at ON headers(taken_at)")
+            conn.execute("CREATE INDEX headers_model ON headers(cnc_model, taken_at)")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Индекс архива бэкапов ALL.PRM по заголовкам: дата, модель ЧПУ, серийные номера"
+    )
+    parser.add_argument(
+        "source", help="Папка архива или glob-шаблон (например, 'archive/**/*.PRM')"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("index.csv"),
+        help="Файл индекса: .csv или .sqlite/.db (по умолчанию: index.csv)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Число потоков чтения (по умолчанию: {DEFAULT_WORKERS})",
+    )
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers должно быть не меньше 1")
+
+    started = time.perf_counter()
+    files = find_prm_files(args.source)
+    if not files:
+        print(f"❌ Файлы ALL.PRM не найдены: {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"🔄 Чтение заголовков {len(files)} файлов...")
+    entries = build_index(files, workers=args.workers)
+
+    try:
+        if args.output.suffix.lower() in SQLITE_SUFFIXES:
+            write_sqlite(entries, args.output)
+        else:
+            write_csv(entries, args.output)
+    except (OSError, sqlite3.Error) as e:
+        print(f"❌ Не удалось сохранить индекс: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    failed = [e for e in entries if e.error]
+    for e in failed[:10]:
+        print(f"❌ {e.path}: {e.error}", file=sys.stderr)
+    if len(failed) > 10:
+        print(f"... и ещё {len(failed) - 10} файлов с ошибками", file=sys.stderr)
+
+    print(f"📝 Индекс сохранён: {args.output}")
+    print(
+        f"\n✅ Файлов: {len(entries) - len(failed)}, ❌ с ошибками: {len(failed)} "
+        f"({time.perf_counter() - started:.1f} с)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# interning.py
+
+"""Общий пул строк для многих разобранных файлов в памяти.
+
+У станков парка (и у ночных снимков одного станка) почти все значения
+параметров, ключи и строки заголовка совпадают, но каждый разбор создаёт
+свои копии строк. InternPool заменяет их одним экземпляром на весь пул:
+
+    pool = InternPool()
+    machines = {name: load_prm_file(path, store="columnar", pool=pool) for ...}
+    print(pool.summary())
+
+В отличие от sys.intern(), пул можно выбросить вместе с файлами, и он
+считает, сколько памяти сэкономлено: для каждой замены — размер
+выброшенной копии (sys.getsizeof). Таблицу строк ColumnarParameters пул
+делает общей с другими файлами; в хранилище dict общими становятся ключи
+и значения объектов Parameter.
+"""
+
+import sys
+from itertools import compress
+from operator import is_not
+from typing import Dict, Iterable, List
+
+import profiling
+from models import ColumnarParameters, PrmFile
+
+
+class InternPool:
+    """Таблица «строка → единственный экземпляр» со статистикой экономии."""
+
+    def __init__(self):
+        self._strings: Dict[str, str] = {}
+        self.lookups = 0  # строк прошло через пул
+        self.hits = 0  # из них заменено уже имеющимся экземпляром
+        self.saved_bytes = 0  # размер выброшенных копий
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def intern(self, value: str) -> str:
+        """Экземпляр строки из пула (value добавляется, если такой ещё нет)."""
+        return self.intern_all([value])[0]
+
+    def intern_all(self, values: Iterable[str]) -> List[str]:
+        """То же для списка строк — одним проходом, без вызова intern() на каждую."""
+        values = values if isinstance(values, list) else list(values)
+        setdefault = self._strings.setdefault
+        interned = list(map(setdefault, values, values))
+        # Копии — строки, вместо которых вернулся другой объект
+        copies = list(compress(values, map(is_not, values, interned)))
+        self.lookups += len(values)
+        self.hits += len(copies)
+        self.saved_bytes += sum(map(sys.getsizeof, copies))
+        return interned
+
+    def intern_prm(self, prm: PrmFile) -> PrmFile:
+        """Переводит строки заголовка, ключи и значения файла на экземпляры пула (на месте)."""
+        hits, saved = self.hits, self.saved_bytes
+        with profiling.span("parse.intern"):
+            prm.header.raw_lines = self.intern_all(prm.header.raw_lines)
+            parameters = prm.parameters
+            if isinstance(parameters, ColumnarParameters):
+                parameters.intern_strings(self.intern_all)
+            else:
+                params = list(parameters.values())
+                keys = self.intern_all(list(parameters))
+                for param, value in zip(params, self.intern_all([p.value for p in params])):
+                    param.value = value
+                prm.parameters = dict(zip(keys, params))
+        profiling.count("intern_hits", self.hits - hits)
+        profiling.count("intern_saved_bytes", self.saved_bytes - saved)
+        return prm
+
+    def clear(self) -> None:
+        """Очищает таблицу; строки, на которые ссылаются файлы, остаются живы."""
+        self._strings.clear()
+
+    def summary(self) -> str:
+        return (
+            f"строк в пуле: {len(self._strings)}, повторов заменено: {self.hits} "
+            f"из {self.lookups}, сэкономлено ≈ {self.saved_bytes / (1024 * 1024):.1f} МБ"
+        )
@@ -4,9 +4,12 @@ import sys
 import argparse
 from pathlib import Path
 
-from parser import parse_prm_file
+from parser import ENGINES, load_prm_file
 from models import PrmFile
 from utils import load_descriptions
+from exporters import EXPORTERS as EXPORT_FORMATS
+from cache import add_cache_arguments, cache_from_args, snapshot_dir_from_args
+from profiling import add_profile_arguments, finish_from_args, start_from_args
 
 
 def main():
@@ -17,7 +20,16 @@ def main():
         default="ALL.PRM",
         help="Путь к файлу ALL.PRM (по умолчанию: ALL.PRM)",
     )
-    parser.add_argument("-o", "--output", help="Путь для экспорта в Excel (например, output.xlsx)")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Путь для экспорта: .xlsx, .csv, .jsonl или .sqlite (например, output.xlsx)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        help="Формат экспорта (по умолчанию — по расширению файла, иначе xlsx)",
+    )
     parser.add_argument(
         "--descriptions", type=Path, help="Путь к YAML-файлу со справочником описаний параметров"
     )
@@ -26,41 +38,58 @@ def main():
         action="store_true",
         help="Использовать имена осей из параметра 1013 (X/Y/Z и т.д.) вместо A1/A2/...",
     )
+    parser.add_argument(
+        "--write-only",
+        action="store_true",
+        help="Потоковый экспорт в Excel (write-only книга): меньше памяти на больших файлах",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="regex",
+        help="Движок парсера: regex (по умолчанию) или fast — разбор байтов без regex",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="Разбирать большой файл (от 4 МБ) на N процессах быстрым движком (по умолчанию: 1)",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Быстрая проверка: только заголовок и число параметров по категориям, "
+        "без справочника и экспорта",
+    )
+    add_cache_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    if args.quick and args.output:
+        parser.error("--quick нельзя совмещать с экспортом (-o)")
+    if args.workers < 1:
+        parser.error("--workers должно быть не меньше 1")
+    profile = start_from_args(args)
 
     input_path = Path(args.input_file)
     if not input_path.exists():
         print(f"❌ Файл не найден: {input_path}", file=sys.stderr)
         sys.exit(1)
 
-    # Загрузка справочника
-    descriptions_path = args.descriptions or Path("descriptions.yaml")
-    descriptions = {}
-    if args.descriptions is not None:
-        # Пользователь явно указал путь — сообщаем, если файл не найден
-        if not descriptions_path.exists():
-            print(
-                f"ℹ️  Файл справочника не найден: {descriptions_path}. Экспорт выполняется без описаний."
-            )
-        else:
-            try:
-                descriptions = load_descriptions(descriptions_path)
-            except ValueError as e:
-                print(f"❌ {e}", file=sys.stderr)
-                sys.exit(1)
-    else:
-        # Используем descriptions.yaml по умолчанию — молча, если его нет
-        if descriptions_path.exists():
-            try:
-                descriptions = load_descriptions(descriptions_path)
-            except ValueError as e:
-                print(f"❌ {e}", file=sys.stderr)
-                sys.exit(1)
+    # Загрузка справочника (в режиме --quick не нужна — yaml не импортируется)
+    descriptions = {} if args.quick else _load_descriptions(args)
 
     # Парсинг
     try:
-        with open(input_path, "r", encoding="utf-8") as f:
-            prm: PrmFile = parse_prm_file(f, source_path=str(input_path))
+        prm_cache = cache_from_args(args)
+        if prm_cache is not None:
+            prm: PrmFile = prm_cache.load(input_path, engine=args.engine, workers=args.workers)
+        elif args.workers > 1:
+            from parallel_parser import load_prm_file_parallel
+
+            prm = load_prm_file_parallel(input_path, workers=args.workers)
+        else:
+            prm = load_prm_file(input_path, engine=args.engine)
     except ValueError as e:
         print(f"❌ Ошибка парсинга: {e}", file=sys.stderr)
         sys.exit(1)
@@ -76,6 +105,13 @@ def main():
     for line in prm.header.raw_lines:
         print(f";{line.lstrip(';')}")
 
+    if args.quick:
+        general, axis, tool, keep = _count_categories(prm.parameters.values())
+        print(f"\n📊 Параметров: {total} (общих: {general}, по осям: {axis}, "
+              f"по инструментам: {tool}, keep: {keep})")
+        finish_from_args(profile, args)
+        return
+
     # Вывод первых 10 параметров с описанием
     print(f"\n--- Параметры (всего: {total}) ---")
     for i, (key, param) in enumerate(list(prm.parameters.items())[:10], start=1):
@@ -93,20 +129,81 @@ def main():
     if total > 10:
         print(f"... и ещё {total - 10} параметров")
 
-    # Экспорт в Excel, если указан флаг
+    # Экспорт (Excel, CSV, JSONL или SQLite), если указан флаг
     if args.output:
-        try:
-            from exporters.to_excel import export_to_excel
+        from exporters import export_parameters, resolve_format
 
-            export_to_excel(
-                prm, Path(args.output), descriptions=descriptions, use_axis_names=args.axis_names
-            )
-            print(f"\n✅ Экспорт в Excel завершён: {args.output}")
+        output_path = Path(args.output)
+        try:
+            fmt = resolve_format(output_path, args.format)
+            if fmt == "xlsx":
+                from exporters.to_excel import export_to_excel
+
+                export_to_excel(
+                    prm,
+                    output_path,
+                    descriptions=descriptions,
+                    use_axis_names=args.axis_names,
+                    write_only=args.write_only,
+                )
+                print(f"\n✅ Экспорт в Excel завершён: {args.output}")
+            else:
+                export_parameters(
+                    prm,
+                    output_path,
+                    fmt=fmt,
+                    descriptions=descriptions,
+                    use_axis_names=args.axis_names,
+                )
+                print(f"\n✅ Экспорт ({fmt}) завершён: {args.output}")
         except ImportError as e:
             print(f"❌ Ошибка импорта: {e}. Убедитесь, что установлен openpyxl.", file=sys.stderr)
             sys.exit(1)
 
     print("\n✅ Парсинг завершён успешно.")
+    finish_from_args(profile, args)
+
+
+def _load_descriptions(args) -> dict:
+    descriptions_path = args.descriptions or Path("descriptions.yaml")
+    descriptions = {}
+    if args.descriptions is not None:
+        # Пользователь явно указал путь — сообщаем, если файл не найден
+        if not descriptions_path.exists():
+            print(
+                f"ℹ️  Файл справочника не найден: {descriptions_path}. Экспорт выполняется без описаний."
+            )
+        else:
+            try:
+                descriptions = load_descriptions(descriptions_path, cache_dir=snapshot_dir_from_args(args))
+            except ValueError as e:
+                print(f"❌ {e}", file=sys.stderr)
+                sys.exit(1)
+    else:
+        # Используем descriptions.yaml по умолчанию — молча, если его нет
+        if descriptions_path.exists():
+            try:
+                descriptions = load_descriptions(descriptions_path, cache_dir=snapshot_dir_from_args(args))
+            except ValueError as e:
+                print(f"❌ {e}", file=sys.stderr)
+                sys.exit(1)
+    return descriptions
+
+
+def _count_categories(params):
+    """Число параметров (общих, по осям, по инструментам, keep) — как листы Excel-отчёта."""
+    general = axis = tool = keep = 0
+    for p in params:
+        if p.axis is None and p.tool is None and p.keep is None:
+            general += 1
+            continue
+        if p.axis is not None:
+            axis += 1
+        if p.tool is not None:
+            tool += 1
+        if p.keep is not None:
+            keep += 1
+    return general, axis, tool, keep
 
 
 if __name__ == "__main__":
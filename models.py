@@ -1,9 +1,12 @@
 # models.py
 
-"""Здесь определены структуры данных: Header, Parameter и PrmFile."""
+"""Здесь определены структуры данных: Header, Parameter, ColumnarParameters и PrmFile."""
 
-from dataclasses import dataclass
-from typing import Optional, Dict, List, Union
+from array import array
+from bisect import bisect_left
+from collections.abc import ItemsView, Mapping, ValuesView
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional, Dict, List, Tuple, Union
 
 
 @dataclass
@@ -58,10 +61,337 @@ class Parameter:
         return "_".join(parts)
 
 
+# Упакованный ключ: number << 24 | axis << 16 | tool << 8 | keep,
+# где отсутствующий квалификатор кодируется нулём, а присутствующий — значением + 1.
+# Сортировка упакованных ключей даёт числовой порядок (number, axis, tool, keep).
+# Пределы: квалификаторы 0..254, номер 0..2^32-1.
+_QUALIFIER_LIMIT = 0xFF - 1
+_NUMBER_LIMIT = 0xFFFFFFFF
+
+
+class KeyRangeError(ValueError):
+    """Ключ не помещается в упакованное представление (см. pack_key)."""
+
+
+def pack_key(number: int, axis: Optional[int], tool: Optional[int], keep: Optional[int]) -> int:
+    """
+    Упаковывает (number, axis, tool, keep) в одно целое.
+    :raises KeyRangeError: если квалификатор больше 254 или номер не помещается в 32 бита
+    """
+    codes = []
+    for qualifier in (axis, tool, keep):
+        if qualifier is None:
+            codes.append(0)
+        elif 0 <= qualifier <= _QUALIFIER_LIMIT:
+            codes.append(qualifier + 1)
+        else:
+            raise KeyRangeError(
+                f"Квалификатор {qualifier} параметра {number} вне допустимого диапазона"
+            )
+    if not 0 <= number <= _NUMBER_LIMIT:
+        raise KeyRangeError(f"Номер параметра {number} вне допустимого диапазона")
+    return (number << 24) | (codes[0] << 16) | (codes[1] << 8) | codes[2]
+
+
+def unpack_key(packed: int) -> Tuple[int, Optional[int], Optional[int], Optional[int]]:
+    """Обратная операция к pack_key: → (number, axis, tool, keep)."""
+    axis = (packed >> 16) & 0xFF
+    tool = (packed >> 8) & 0xFF
+    keep = packed & 0xFF
+    return (
+        packed >> 24,
+        axis - 1 if axis else None,
+        tool - 1 if tool else None,
+        keep - 1 if keep else None,
+    )
+
+
+def parse_key(key: str) -> int:
+    """
+    Переводит строковый ключ вида '2025_A4' в упакованный. Принимается только
+    запись, которую даёт Parameter.key(): '2025_T1_A4' (не тот порядок) и
+    '2025_A04' (ведущие нули) — не ключи, как и в хранилище dict.
+    :raises KeyError: если строка не является ключом параметра
+    """
+    number, *qualifiers = key.split("_")
+    fields = {}
+    try:
+        for part in qualifiers:
+            letter = part[:1]
+            if letter not in ("A", "T", "K") or letter in fields:
+                raise KeyError(key)
+            fields[letter] = int(part[1:])
+        param = Parameter(int(number), "", fields.get("A"), fields.get("T"), fields.get("K"))
+        if param.key() != key:
+            raise KeyError(key)
+        return pack_key(param.number, param.axis, param.tool, param.keep)
+    except ValueError:
+        raise KeyError(key) from None
+
+
+class ColumnarParameters(Mapping):
+    """
+    Компактное хранилище параметров «по колонкам» — замена Dict[str, Parameter]
+    для случаев, когда в памяти держатся тысячи файлов.
+
+    Номера и квалификаторы лежат в array-колонках, значения — в общей таблице
+    строк (одинаковые значения хранятся один раз). Объекты Parameter создаются
+    только при обращении. Снаружи это read-only Mapping со строковыми ключами
+    ('2025_A4'), поэтому comparator.py и экспорт работают без изменений.
+
+    Порядок обхода — порядок добавления; повторное добавление того же ключа
+    перезаписывает значение на прежнем месте (как у dict).
+    После freeze() словарь-индекс заменяется отсортированными массивами.
+
+    Ключи хранятся упакованными (pack_key): квалификаторы T/A/K — до 254,
+    номер — до 2^32-1. add() с ключом вне этих пределов поднимает
+    KeyRangeError; parse_prm_file(store="columnar") такой файл хранит в dict.
+    """
+
+    def __init__(self):
+        self._numbers = array("I")
+        self._axes = array("B")  # 0 — нет оси, иначе axis + 1
+        self._tools = array("B")
+        self._keeps = array("B")
+        self._values = array("I")  # индекс в self._strings
+        self._strings: List[str] = []
+        self._string_ids: Optional[Dict[str, int]] = {}
+        self._index: Optional[Dict[int, int]] = {}  # упакованный ключ → номер строки
+        self._sorted_keys = array("Q")
+        self._sorted_rows = array("I")
+
+    @classmethod
+    def from_parameters(cls, params: "Iterable[Parameter]") -> "ColumnarParameters":
+        """Собирает замороженное хранилище из потока параметров."""
+        store = cls()
+        for param in params:
+            store.add(param.number, param.value, param.axis, param.tool, param.keep)
+        return store.freeze()
+
+    def add(
+        self,
+        number: int,
+        value: str,
+        axis: Optional[int] = None,
+        tool: Optional[int] = None,
+        keep: Optional[int] = None,
+    ) -> None:
+        if self._index is None:
+            raise TypeError("ColumnarParameters уже заморожен и доступен только для чтения")
+
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+
+        packed = pack_key(number, axis, tool, keep)
+        row = self._index.get(packed)
+        if row is not None:
+            self._values[row] = string_id
+            return
+
+        self._index[packed] = len(self._numbers)
+        self._numbers.append(number)
+        self._axes.append((packed >> 16) & 0xFF)
+        self._tools.append((packed >> 8) & 0xFF)
+        self._keeps.append(packed & 0xFF)
+        self._values.append(string_id)
+
+    def freeze(self) -> "ColumnarParameters":
+        """Завершает заполнение: индекс-словарь заменяется отсортированными массивами."""
+        if self._index is not None:
+            index = self._index
+            self._sorted_keys = array("Q", sorted(index))
+            self._sorted_rows = array("I", (index[packed] for packed in self._sorted_keys))
+            self._index = None
+            self._string_ids = None
+        return self
+
+    # --- Сериализация (кэш разбора) ---
+
+    def to_columns(self) -> tuple:
+        """Колонки в виде bytes + таблица строк; хранилище должно быть заморожено."""
+        self.freeze()
+        return (
+            self._numbers.tobytes(),
+            self._axes.tobytes(),
+            self._tools.tobytes(),
+            self._keeps.tobytes(),
+            self._values.tobytes(),
+            self._sorted_keys.tobytes(),
+            self._sorted_rows.tobytes(),
+            list(self._strings),
+        )
+
+    @classmethod
+    def from_columns(cls, columns: tuple) -> "ColumnarParameters":
+        """Обратная операция к to_columns(): возвращает замороженное хранилище."""
+        numbers, axes, tools, keeps, values, sorted_keys, sorted_rows, strings = columns
+        store = cls()
+        store._numbers.frombytes(numbers)
+        store._axes.frombytes(axes)
+        store._tools.frombytes(tools)
+        store._keeps.frombytes(keeps)
+        store._values.frombytes(values)
+        store._sorted_keys.frombytes(sorted_keys)
+        store._sorted_rows.frombytes(sorted_rows)
+        store._strings = strings
+        store._index = None
+        store._string_ids = None
+        return store
+
+    def to_dict(self) -> Dict[str, Parameter]:
+        """Обычный Dict[str, Parameter] в том же порядке (быстрее, чем dict(items()))."""
+        strings = self._strings
+        suffixes = {}
+        result = {}
+        for number, axis, tool, keep, value in zip(
+            self._numbers, self._axes, self._tools, self._keeps, self._values
+        ):
+            if not (axis or tool or keep):
+                result[str(number)] = Parameter(number, strings[value])
+                continue
+            param = Parameter(
+                number,
+                strings[value],
+                axis - 1 if axis else None,
+                tool - 1 if tool else None,
+                keep - 1 if keep else None,
+            )
+            codes = (axis, tool, keep)
+            suffix = suffixes.get(codes)
+            if suffix is None:
+                suffix = suffixes[codes] = param.key()[len(str(number)):]
+            result[str(number) + suffix] = param
+        return result
+
+    def intern_strings(self, intern_all: "Callable[[List[str]], List[str]]") -> None:
+        """Заменяет таблицу строк результатом intern_all (см. interning.InternPool)."""
+        self._strings = intern_all(self._strings)
+        if self._string_ids is not None:
+            self._string_ids = {value: i for i, value in enumerate(self._strings)}
+
+    # --- Доступ по упакованному ключу ---
+
+    def row_of(self, packed: int) -> Optional[int]:
+        if self._index is not None:
+            return self._index.get(packed)
+        i = bisect_left(self._sorted_keys, packed)
+        if i < len(self._sorted_keys) and self._sorted_keys[i] == packed:
+            return self._sorted_rows[i]
+        return None
+
+    def packed_key(self, row: int) -> int:
+        return (
+            (self._numbers[row] << 24)
+            | (self._axes[row] << 16)
+            | (self._tools[row] << 8)
+            | self._keeps[row]
+        )
+
+    def parameter(self, row: int) -> Parameter:
+        axis = self._axes[row]
+        tool = self._tools[row]
+        keep = self._keeps[row]
+        return Parameter(
+            self._numbers[row],
+            self._strings[self._values[row]],
+            axis - 1 if axis else None,
+            tool - 1 if tool else None,
+            keep - 1 if keep else None,
+        )
+
+    def values_at(self, rows) -> List[str]:
+        """Значения для списка номеров строк (без создания Parameter)."""
+        strings = self._strings
+        values = self._values
+        return [strings[values[row]] for row in rows]
+
+    def get_packed(self, packed: int, default=None):
+        row = self.row_of(packed)
+        return default if row is None else self.parameter(row)
+
+    def iter_sorted(self) -> Iterator[Tuple[int, int]]:
+        """Пары (упакованный ключ, номер строки) в числовом порядке ключей."""
+        if self._index is not None:
+            return iter(sorted(self._index.items()))
+        return zip(self._sorted_keys, self._sorted_rows)
+
+    def iter_sorted_range(self, low: int, high: int) -> Iterator[Tuple[int, int]]:
+        """То же, что iter_sorted(), но только для ключей low <= ключ < high."""
+        if self._index is not None:
+            return iter(sorted(item for item in self._index.items() if low <= item[0] < high))
+        start = bisect_left(self._sorted_keys, low)
+        end = bisect_left(self._sorted_keys, high, start)
+        return zip(self._sorted_keys[start:end], self._sorted_rows[start:end])
+
+    # --- Mapping ---
+
+    def __getitem__(self, key: str) -> Parameter:
+        row = self.row_of(parse_key(key))
+        if row is None:
+            raise KeyError(key)
+        return self.parameter(row)
+
+    def __contains__(self, key) -> bool:
+        try:
+            return self.row_of(parse_key(key)) is not None
+        except (KeyError, AttributeError):
+            return False
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self._numbers)):
+            yield self.parameter(row).key()
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def values(self) -> ValuesView:
+        return _ColumnarValuesView(self)
+
+    def items(self) -> ItemsView:
+        return _ColumnarItemsView(self)
+
+    def __repr__(self) -> str:
+        return f"<ColumnarParameters: {len(self)} параметров, {len(self._strings)} разных значений>"
+
+
+class _ColumnarValuesView(ValuesView):
+    # Обход по колонкам напрямую, без разбора строковых ключей
+    def __iter__(self):
+        mapping = self._mapping
+        for row in range(len(mapping)):
+            yield mapping.parameter(row)
+
+
+class _ColumnarItemsView(ItemsView):
+    def __iter__(self):
+        mapping = self._mapping
+        for row in range(len(mapping)):
+            param = mapping.parameter(row)
+            yield param.key(), param
+
+
 @dataclass
 class PrmFile:
     """Полное представление файла ALL.PRM."""
 
     header: Header
-    parameters: Dict[str, Parameter]  # ключ — результат .key()
+    # ключ — результат .key(); dict или ColumnarParameters
+    parameters: "Mapping[str, Parameter]"
     source_path: Optional[str] = None
+    # Хэши содержимого (digests.ContentDigests): из кэша разбора или при первом обращении к .digests
+    content_digests: Optional[object] = field(default=None, repr=False, compare=False)
+
+    @property
+    def digests(self):
+        """
+        Хэши содержимого — корень, разделы и блоки (см. digests.py).
+        Считаются один раз; после изменения parameters сбросьте content_digests = None.
+        :raises KeyRangeError: если ключ файла не помещается в упакованный (см. pack_key)
+        """
+        if self.content_digests is None:
+            from digests import compute_digests
+
+            self.content_digests = compute_digests(self.parameters)
+        return self.content_digests
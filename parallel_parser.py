@@ -0,0 +1,287 @@
+# parallel_parser.py
+
+"""Параллельный разбор одного большого ALL.PRM (сводные архивы на сотни МБ).
+
+Файл отображается в память (mmap). Заголовок и две последние строки
+разбираются в основном процессе, а тело делится на куски по границам строк
+и разбирается на пуле процессов тем же быстрым движком, что и
+parse_prm_file(engine="fast"). Воркер сам открывает файл и читает свой
+отрезок, поэтому между процессами передаются только смещения и компактные
+результаты: колонки ключей и номеров значений в bytes и таблица строк куска.
+
+Куски сливаются по порядку с той же семантикой, что и у последовательного
+разбора: ключ остаётся на месте первого появления, а значение берётся
+из последнего дубля. Результат совпадает с parse_prm_file(engine="fast"),
+включая тексты ошибок. Ключи передаются упакованными; если в файле есть
+квалификатор, не помещающийся в упакованный ключ, файл разбирается
+последовательно и, как там, хранится в dict при любом store.
+"""
+
+import io
+import mmap
+import os
+from array import array
+from itertools import islice
+from operator import eq
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import profiling
+from models import (
+    _NUMBER_LIMIT,
+    ColumnarParameters,
+    Header,
+    KeyRangeError,
+    PrmFile,
+    pack_key,
+    unpack_key,
+)
+from parser import (
+    STORES,
+    _iter_lines_fast,
+    _parse_line_fast,
+    _read_header_fast,
+    attach_digests,
+    parse_prm_file,
+)
+
+
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+# Меньше этого размера пул процессов не окупается — файл разбирается последовательно
+MIN_PARALLEL_BYTES = 4 * 1024 * 1024
+
+
+class _KeyRangeError(KeyRangeError):
+    """KeyRangeError из воркера: по нему основной процесс переходит к последовательному разбору."""
+
+
+def load_prm_file_parallel(
+    path,
+    workers: Optional[int] = None,
+    store: str = "dict",
+    digests: bool = False,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    pool=None,
+) -> PrmFile:
+    """
+    Разбирает файл на workers процессах (по умолчанию — по числу ядер).
+
+    :param store: "dict" или "columnar", как у parse_prm_file
+    :param digests: сразу посчитать хэши содержимого (PrmFile.digests)
+    :param chunk_bytes: наибольший размер куска тела файла
+    :param pool: interning.InternPool, как у parse_prm_file
+    :raises ValueError: при нарушении формата
+    """
+    if store not in STORES:
+        raise ValueError(f"Неизвестный тип хранилища: {store}. Допустимые: {', '.join(STORES)}")
+    workers = workers or os.cpu_count() or 1
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        layout = None
+        if workers > 1 and size >= MIN_PARALLEL_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                layout = _layout(mm, chunk_bytes, workers)
+        if layout is None:
+            f.seek(0)
+            return parse_prm_file(
+                f, source_path=str(path), engine="fast", store=store, digests=digests, pool=pool
+            )
+    header, ranges, tail = layout
+
+    with profiling.span("parse"):
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges) or 1)) as executor:
+                futures = [
+                    executor.submit(_parse_chunk, str(path), start, stop) for start, stop in ranges
+                ]
+                # Результаты забираются по порядку кусков: ошибка в начале файла
+                # поднимается раньше, чем в конце, как при последовательном разборе
+                chunks = [future.result() for future in futures]
+                chunks.append(_parse_tail(tail))
+        except _KeyRangeError:
+            # Такой ключ допустим только в dict — разбираем как обычно
+            # (для "columnar" parse_prm_file тоже вернёт dict)
+            with open(path, "rb") as f:
+                return parse_prm_file(
+                    f,
+                    source_path=str(path),
+                    engine="fast",
+                    store=store,
+                    digests=digests,
+                    pool=pool,
+                )
+        parameters = _merge(chunks)
+        profiling.count("parse.chunks", len(ranges))
+        profiling.count("parameters", len(parameters))
+        if store == "dict":
+            parameters = parameters.to_dict()
+
+    prm = PrmFile(header=header, parameters=parameters, source_path=str(path))
+    if pool is not None:
+        pool.intern_prm(prm)
+    if digests:
+        attach_digests(prm)
+    return prm
+
+
+def _layout(mm, chunk_bytes: int, workers: int) -> Optional[Tuple[Header, list, bytes]]:
+    """
+    Заголовок, отрезки тела для воркеров и хвост (две последние строки файла).
+    None — файл нестандартный (например, одиночные '\\r' в строке PARA101()),
+    его надёжнее разобрать последовательно.
+    """
+    raw_lines = []
+
+    def read_raw():
+        for raw in iter(mm.readline, b""):
+            raw_lines.append(raw)
+            yield raw
+
+    header = _read_header_fast(_iter_lines_fast(read_raw()))
+    last = raw_lines[-1]
+    if last.rstrip(b"\r\n") != b"PARA101()" or len(last) - len(b"PARA101()") > 2:
+        return None
+    body_start = mm.tell()
+
+    # Хвост — две последние строки по '\n': в последовательном разборе они
+    # не разбираются как параметры, а последняя должна быть '%'
+    size = len(mm)
+    end = size - 1 if size and mm[size - 1:size] == b"\n" else size
+    last_start = mm.rfind(b"\n", body_start, end) + 1
+    if last_start == 0:
+        return None
+    tail_start = mm.rfind(b"\n", body_start, last_start - 1) + 1 or body_start
+
+    chunk = max(min(chunk_bytes, -(-(tail_start - body_start) // workers)), 1)
+    ranges = []
+    start = body_start
+    while start < tail_start:
+        stop = mm.find(b"\n", min(start + chunk, tail_start) - 1, tail_start) + 1 or tail_start
+        ranges.append((start, stop))
+        start = stop
+    return header, ranges, mm[tail_start:]
+
+
+def _parse_lines(lines) -> tuple:
+    """
+    Строки 'N...' куска → колонки ColumnarParameters в bytes и таблица строк:
+    (ключи 'Q', номера 'I', оси, инструменты, keep 'B', значения 'I', строки).
+    Дубли внутри куска сразу схлопываются: место — первого, значение — последнего.
+    """
+    keys = array("Q")
+    values = array("I")
+    strings: List[str] = []
+    string_ids = {}
+    rows = {}
+    for line in lines:
+        if line[:1] != b"N":
+            continue
+        packed, value = _parse_packed(line)
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(strings)
+            strings.append(value)
+        row = rows.get(packed)
+        if row is None:
+            rows[packed] = len(keys)
+            keys.append(packed)
+            values.append(string_id)
+        else:
+            values[row] = string_id
+    return (
+        keys.tobytes(),
+        array("I", [packed >> 24 for packed in keys]).tobytes(),
+        bytes([(packed >> 16) & 0xFF for packed in keys]),
+        bytes([(packed >> 8) & 0xFF for packed in keys]),
+        bytes([packed & 0xFF for packed in keys]),
+        values.tobytes(),
+        strings,
+    )
+
+
+def _parse_packed(line: bytes) -> Tuple[int, str]:
+    """То же, что parser._parse_line_fast, но сразу → (упакованный ключ, значение)."""
+    head, sep, value = line.partition(b"P")
+    digits = head[1:]
+    if sep and digits.isdigit():
+        number = int(digits)
+        if number <= _NUMBER_LIMIT:
+            return number << 24, value.decode("utf-8")
+    _, param = _parse_line_fast(line)
+    try:
+        packed = pack_key(param.number, param.axis, param.tool, param.keep)
+    except KeyRangeError as e:
+        raise _KeyRangeError(str(e)) from None
+    return packed, param.value
+
+
+def _parse_chunk(path: str, start: int, stop: int) -> tuple:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:stop]
+    # Отрезок выровнен по '\n', поэтому BytesIO режет его на те же строки, что и файл
+    return _parse_lines(_iter_lines_fast(io.BytesIO(data)))
+
+
+def _parse_tail(tail: bytes) -> tuple:
+    lines = list(_iter_lines_fast(io.BytesIO(tail)))
+    # Последние две строки последовательный разбор не трогает
+    parsed = _parse_lines(lines[:-2])
+    if lines[-1] != b"%":
+        raise ValueError("Файл должен заканчиваться '%'")
+    return parsed
+
+
+def _merge(chunks: list) -> ColumnarParameters:
+    """
+    Сливает куски по порядку: место — первого появления ключа, значение — последнего.
+    Обычно ключи кусков не пересекаются, и колонки просто склеиваются; дубли
+    между кусками видны как соседние равные ключи после сортировки.
+    """
+    keys = array("Q")
+    columns = [array("I"), array("B"), array("B"), array("B")]
+    values = array("I")
+    strings: List[str] = []
+    string_ids = {}
+    for chunk_keys, numbers, axes, tools, keeps, chunk_values, chunk_strings in chunks:
+        keys.frombytes(chunk_keys)
+        for column, data in zip(columns, (numbers, axes, tools, keeps)):
+            column.frombytes(data)
+        remap = []
+        for value in chunk_strings:
+            string_id = string_ids.get(value)
+            if string_id is None:
+                string_id = string_ids[value] = len(strings)
+                strings.append(value)
+            remap.append(string_id)
+        local = array("I")
+        local.frombytes(chunk_values)
+        values.extend(array("I", map(remap.__getitem__, local)))
+
+    sorted_rows = array("I", sorted(range(len(keys)), key=keys.__getitem__))
+    sorted_keys = array("Q", map(keys.__getitem__, sorted_rows))
+    if any(map(eq, sorted_keys, islice(sorted_keys, 1, None))):
+        return _merge_duplicates(keys, values, strings)
+
+    numbers, axes, tools, keeps = columns
+    return ColumnarParameters.from_columns(
+        (
+            numbers.tobytes(),
+            axes.tobytes(),
+            tools.tobytes(),
+            keeps.tobytes(),
+            values.tobytes(),
+            sorted_keys.tobytes(),
+            sorted_rows.tobytes(),
+            strings,
+        )
+    )
+
+
+def _merge_duplicates(keys: array, values: array, strings: List[str]) -> ColumnarParameters:
+    # Редкий случай: один ключ в нескольких кусках — сливаем построчно
+    store = ColumnarParameters()
+    for packed, string_id in zip(keys, values):
+        number, axis, tool, keep = unpack_key(packed)
+        store.add(number, strings[string_id], axis, tool, keep)
+    return store.freeze()
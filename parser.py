@@ -4,12 +4,27 @@
 - Проверяет начало и конец на %;
 - Извлекает заголовок;
 - Пропускает PARA101().
-- Парсит параметры с помощью регулярного выражения.
+- Парсит параметры с помощью регулярного выражения
+  (или, для engine="fast", прямым разбором байтов без regex).
+
+Файл читается потоково: в памяти одновременно держатся только заголовок
+и две последние прочитанные строки, поэтому пиковое потребление памяти
+не зависит от размера файла.
 """
 
 import re
-from typing import List, TextIO
-from models import Header, Parameter, PrmFile
+from collections import deque
+from typing import BinaryIO, Iterable, Iterator, Optional, TextIO, Tuple, Union
+from models import (
+    ColumnarParameters,
+    Header,
+    KeyRangeError,
+    Parameter,
+    PrmFile,
+    parse_key,
+    unpack_key,
+)
+import profiling
 
 
 # Регулярное выражение для разбора строк параметров
@@ -26,70 +41,385 @@ PARAM_REGEX = re.compile(
     r"P(?P<value>.*)$"
 )
 
+# Версия семантики разбора: увеличивается при любом изменении результата парсинга,
+# чтобы кэш разбора (cache.py) не отдавал устаревшие данные
+PARSER_VERSION = 1
+
+ENGINES = ("regex", "fast")
+STORES = ("dict", "columnar")
 
-def parse_prm_file(file: TextIO, source_path: str = None) -> PrmFile:
+
+def parse_prm_file(
+    file: Union[TextIO, BinaryIO],
+    source_path: str = None,
+    engine: str = "regex",
+    store: str = "dict",
+    digests: bool = False,
+    pool=None,
+) -> PrmFile:
     """
     Парсит файл ALL.PRM из текстового потока.
 
-    :param file: текстовый файл (или StringIO и т.п.)
+    :param file: текстовый файл (или StringIO и т.п.);
+                 для engine="fast" — двоичный поток (open(path, "rb"), BytesIO)
     :param source_path: опционально — путь к файлу для отладки
+    :param engine: "regex" (по умолчанию) или "fast" — разбор байтов без regex
+    :param store: "dict" (по умолчанию) или "columnar" — компактное хранилище
+                  ColumnarParameters для удержания многих файлов в памяти
+    :param digests: сразу посчитать хэши содержимого (PrmFile.digests)
+    :param pool: interning.InternPool — общие с другими файлами строки
+                 заголовка, ключей и значений
     :return: объект PrmFile
     :raises ValueError: при нарушении формата
     """
-    lines = [line.rstrip("\r\n") for line in file]
+    if store not in STORES:
+        raise ValueError(f"Неизвестный тип хранилища: {store}. Допустимые: {', '.join(STORES)}")
+    if engine not in ENGINES:
+        raise ValueError(f"Неизвестный движок парсера: {engine}. Допустимые: {', '.join(ENGINES)}")
+
+    with profiling.span("parse"):
+        # Счётчики строк — только при включённом профилировании, обёрткой итераторов
+        counted = profiling.enabled()
+
+        if engine == "fast":
+            lines = _iter_lines_fast(file)
+            if counted:
+                lines = profiling.CountingIterator(lines)
+            header = _read_header_fast(lines)
+            body = _iter_body_fast(lines)
+            if counted:
+                body = profiling.CountingIterator(body)
+            if store == "dict":
+                # В теории дублей быть не должно, но на всякий случай — перезаписываем
+                parameters = dict(body)
+            else:
+                # Объекты Parameter живут только до записи в колонки
+                parameters = _columnar_or_dict(param for _, param in body)
+        else:
+            lines = _iter_lines(file)
+            if counted:
+                lines = profiling.CountingIterator(lines)
+            header = _read_header(lines)
+            body = _iter_body(lines)
+            if counted:
+                body = profiling.CountingIterator(body)
+            if store == "columnar":
+                parameters = _columnar_or_dict(body)
+            else:
+                parameters = {}
+                for param in body:
+                    # В теории дублей быть не должно, но на всякий случай — перезаписываем
+                    parameters[param.key()] = param
+
+        if counted:
+            _count_lines(lines.count, len(header.raw_lines), body.count, len(parameters))
+
+    prm = PrmFile(header=header, parameters=parameters, source_path=source_path)
+    if pool is not None:
+        pool.intern_prm(prm)
+    if digests:
+        attach_digests(prm)
+    return prm
+
+
+def _columnar_or_dict(params: Iterator[Parameter]):
+    """
+    ColumnarParameters из потока параметров; если ключ не помещается в упакованный
+    (квалификатор больше 254, см. models.pack_key) — обычный dict с тем же содержимым.
+    """
+    store = ColumnarParameters()
+    for param in params:
+        try:
+            store.add(param.number, param.value, param.axis, param.tool, param.keep)
+        except KeyRangeError:
+            # Уже добавленное переносится с сохранением порядка и семантики дублей
+            parameters = store.to_dict()
+            parameters[param.key()] = param
+            for param in params:
+                parameters[param.key()] = param
+            return parameters
+    return store.freeze()
+
+
+def attach_digests(prm: PrmFile) -> None:
+    """
+    Считает хэши содержимого (PrmFile.content_digests). Для файла с ключами
+    вне упакованного представления хэшей нет: content_digests остаётся None,
+    и сравнение идёт без них.
+    """
+    from digests import compute_digests
+
+    with profiling.span("parse.digests"):
+        try:
+            prm.content_digests = compute_digests(prm.parameters)
+        except KeyRangeError:
+            prm.content_digests = None
 
-    # 1. Проверка начала и конца
-    if not lines or lines[0] != "%":
+
+def _count_lines(lines_read: int, header_lines: int, parsed: int, stored: int) -> None:
+    # Служебные строки: '%', заголовок и PARA101() в начале, пустая строка и '%' в конце
+    body_lines = lines_read - header_lines - 2
+    profiling.count("lines_read", lines_read)
+    profiling.count("lines_skipped", body_lines - 2 - parsed)
+    profiling.count("parameters", stored)
+    profiling.count("duplicates_overwritten", parsed - stored)
+
+
+def load_prm_file(
+    path, engine: str = "regex", store: str = "dict", digests: bool = False, pool=None
+) -> PrmFile:
+    """
+    Открывает файл в режиме, нужном движку (текст для "regex", байты для "fast"),
+    и парсит его.
+    """
+    if engine == "fast":
+        with open(path, "rb") as f:
+            return parse_prm_file(
+                f, source_path=str(path), engine=engine, store=store, digests=digests, pool=pool
+            )
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_prm_file(
+            f, source_path=str(path), engine=engine, store=store, digests=digests, pool=pool
+        )
+
+
+def parse_parameter_name(name: str) -> Tuple[int, Optional[int], Optional[int], Optional[int]]:
+    """
+    Имя параметра в записи ЧПУ ('N2025A4', '2025A4', 'N1001T1') или ключ
+    ('2025_A4') → (number, axis, tool, keep).
+    :raises ValueError: если имя не распознано
+    """
+    name = name.strip()
+    if "_" in name or name.isdigit():
+        try:
+            return unpack_key(parse_key(name))
+        except KeyError:
+            raise ValueError(f"Некорректное имя параметра: {name}") from None
+    if not name.startswith("N"):
+        name = "N" + name
+    match = PARAM_REGEX.match(name + "P")
+    if not match:
+        raise ValueError(f"Некорректное имя параметра: {name}")
+    param = _parse_line(name + "P")
+    return param.number, param.axis, param.tool, param.keep
+
+
+def scan_header(path) -> Header:
+    """
+    Читает только заголовок файла — до строки PARA101() — и закрывает файл,
+    не разбирая параметры. Для каталогизации архивов бэкапов по дате и модели.
+    :raises ValueError: если начало файла не соответствует формату
+    """
+    with open(path, "rb") as f:
+        return _read_header_fast(_iter_lines_fast(f))
+
+
+def iter_parameters(file: Union[TextIO, BinaryIO], engine: str = "regex") -> Iterator[Parameter]:
+    """
+    Потоково разбирает файл ALL.PRM и выдаёт параметры по одному.
+
+    Заголовок, строка PARA101() и завершающий '%' проверяются по ходу чтения,
+    поэтому ошибка формата в конце файла обнаруживается только после того,
+    как все предшествующие параметры уже выданы.
+
+    :param file: текстовый файл (или любой итерируемый источник строк);
+                 для engine="fast" — двоичный поток
+    :param engine: "regex" (по умолчанию) или "fast"
+    :raises ValueError: при нарушении формата
+    """
+    if engine == "fast":
+        lines = _iter_lines_fast(file)
+        _read_header_fast(lines)
+        for _, param in _iter_body_fast(lines):
+            yield param
+        return
+    if engine != "regex":
+        raise ValueError(f"Неизвестный движок парсера: {engine}. Допустимые: {', '.join(ENGINES)}")
+
+    lines = _iter_lines(file)
+    _read_header(lines)
+    yield from _iter_body(lines)
+
+
+def _iter_lines(file: Iterable[str]) -> Iterator[str]:
+    for line in file:
+        yield line.rstrip("\r\n")
+
+
+def _read_header(lines: Iterator[str]) -> Header:
+    """Проверяет '%' в начале, собирает строки ';' и ожидает PARA101()."""
+    # 1. Проверка начала
+    first = next(lines, None)
+    if first != "%":
         raise ValueError("Файл должен начинаться с '%'")
-    if len(lines) < 2:
-        raise ValueError("Файл должен содержать как минимум две строки: тело и пустую строку в конце")
-    if lines[-1] != "%":
-        raise ValueError("Файл должен заканчиваться '%'")
 
     # 2. Извлечение заголовка (строки со ';')
     header_lines = []
-    i = 1
-    while i < len(lines) and lines[i].startswith(";"):
-        header_lines.append(lines[i])
-        i += 1
-
-    header = Header(raw_lines=header_lines)
+    line = next(lines, None)
+    if line is None:
+        raise ValueError("Файл должен содержать как минимум две строки: тело и пустую строку в конце")
+    while line is not None and line.startswith(";"):
+        header_lines.append(line)
+        line = next(lines, None)
 
     # 3. Ожидаем PARA101()
-    if i >= len(lines) or lines[i] != "PARA101()":
+    if line != "PARA101()":
         raise ValueError("Ожидалась строка 'PARA101()' после заголовка")
-    i += 1
-
-    # 4. Парсинг параметров
-    parameters = {}
-    while i < len(lines) - 2:  # пропускаем последние две строки: '%' и пустая
-        line = lines[i]
-        if not line:
-            i += 1
+
+    return Header(raw_lines=header_lines)
+
+
+def _iter_body(lines: Iterator[str]) -> Iterator[Parameter]:
+    """
+    Парсит строки параметров после PARA101().
+
+    Последние две строки файла ('%' и пустая) в разбор не попадают, поэтому
+    строка отдаётся на разбор только после того, как прочитаны ещё две.
+    """
+    pending = deque()
+    last = "PARA101()"
+    for last in lines:
+        pending.append(last)
+        if len(pending) < 3:
             continue
+        line = pending.popleft()
 
-        # Пропускаем нераспознанные строки (например, комментарии)
+        # Пропускаем пустые и нераспознанные строки (например, комментарии)
         if not line.startswith("N"):
-            i += 1
             continue
 
-        match = PARAM_REGEX.match(line)
-        if not match:
-            raise ValueError(f"Невозможно распарсить строку параметра: {line}")
+        yield _parse_line(line)
+
+    # 4. Проверка конца
+    if last != "%":
+        raise ValueError("Файл должен заканчиваться '%'")
+
+
+def _parse_line(line: str) -> Parameter:
+    match = PARAM_REGEX.match(line)
+    if not match:
+        raise ValueError(f"Невозможно распарсить строку параметра: {line}")
+
+    number = int(match.group("number"))
+    tool = int(match.group("tool")) if match.group("tool") else None
+    axis = int(match.group("axis")) if match.group("axis") else None
+    keep = int(match.group("keep")) if match.group("keep") else None
+    value = match.group("value")  # может быть пустой строкой
+
+    return Parameter(number=number, value=value, axis=axis, tool=tool, keep=keep)
+
+
+# --- Быстрый движок: разбор байтов без регулярных выражений ---
+#
+# Результат должен совпадать с regex-движком байт в байт, поэтому:
+# - строки режутся так же, как в текстовом режиме с universal newlines
+#   ('\n', '\r\n' и одиночный '\r');
+# - декодируется только значение (и строки заголовка);
+# - всё, что быстрый разбор не узнал (например, не-ASCII цифры), уходит
+#   в regex-разбор, он же формирует текст ошибки.
 
-        number = int(match.group("number"))
-        tool = int(match.group("tool")) if match.group("tool") else None
-        axis = int(match.group("axis")) if match.group("axis") else None
-        keep = int(match.group("keep")) if match.group("keep") else None
-        value = match.group("value")  # может быть пустой строкой
 
-        param = Parameter(number=number, value=value, axis=axis, tool=tool, keep=keep)
-        key = param.key()
-        if key in parameters:
-            # В теории такого быть не должно, но на случай дублей — перезапишем
-            pass
-        parameters[key] = param
+def _iter_lines_fast(file: Iterable[bytes]) -> Iterator[bytes]:
+    for raw in file:
+        line = raw.rstrip(b"\r\n")
+        if len(raw) - len(line) > 2 or b"\r" in line:
+            # Одиночные '\r' внутри строки — редкий случай, режем как текстовый режим
+            yield from raw.splitlines()
+        else:
+            yield line
 
-        i += 1
 
-    return PrmFile(header=header, parameters=parameters, source_path=source_path)
+def _read_header_fast(lines: Iterator[bytes]) -> Header:
+    first = next(lines, None)
+    if first != b"%":
+        raise ValueError("Файл должен начинаться с '%'")
+
+    header_lines = []
+    line = next(lines, None)
+    if line is None:
+        raise ValueError("Файл должен содержать как минимум две строки: тело и пустую строку в конце")
+    while line is not None and line.startswith(b";"):
+        header_lines.append(line.decode("utf-8"))
+        line = next(lines, None)
+
+    if line != b"PARA101()":
+        raise ValueError("Ожидалась строка 'PARA101()' после заголовка")
+
+    return Header(raw_lines=header_lines)
+
+
+def _iter_body_fast(lines: Iterator[bytes]) -> Iterator[Tuple[str, Parameter]]:
+    """
+    То же, что _iter_body, но выдаёт пары (ключ, параметр).
+
+    Две последние строки придерживаются в older/newer; пустая строка
+    в качестве начального значения безопасна — она всё равно пропускается.
+    """
+    older = newer = b""
+    for line in lines:
+        if older[:1] == b"N":
+            yield _parse_line_fast(older)
+        older, newer = newer, line
+
+    if newer != b"%":
+        raise ValueError("Файл должен заканчиваться '%'")
+
+
+def _parse_line_fast(line: bytes) -> Tuple[str, Parameter]:
+    head, sep, value = line.partition(b"P")
+    digits = head[1:]
+    if sep:
+        if digits.isdigit():
+            # Самый частый случай: N123P456
+            number = int(digits)
+            return str(number), Parameter(number, value.decode("utf-8"))
+
+        fields = _split_head_fast(digits)
+        if fields is not None:
+            number, qualifiers = fields
+            suffix = _KEY_SUFFIXES.get(qualifiers)
+            if suffix is None:
+                suffix = _KEY_SUFFIXES[qualifiers] = _key_suffix(*qualifiers)
+            tool, axis, keep = qualifiers
+            return str(number) + suffix, Parameter(number, value.decode("utf-8"), axis, tool, keep)
+
+    param = _parse_line(line.decode("utf-8"))
+    return param.key(), param
+
+
+# Кэш суффиксов ключа ("_A4", "_T1" и т.п.): различных сочетаний T/A/K немного
+_KEY_SUFFIXES = {}
+
+
+def _key_suffix(tool, axis, keep) -> str:
+    return Parameter(0, "", axis, tool, keep).key()[1:]
+
+
+def _split_head_fast(head: bytes):
+    """
+    Разбирает '123T1A2K3' → (123, (1, 2, 3)). Квалификаторы снимаются справа
+    налево (K, A, T), что даёт тот же порядок, что и в PARAM_REGEX.
+    Возвращает None, если строка не подходит под формат.
+    """
+    tool = axis = keep = None
+    rest, sep, digits = head.rpartition(b"K")
+    if sep:
+        if not digits.isdigit():
+            return None
+        keep = int(digits)
+        head = rest
+    rest, sep, digits = head.rpartition(b"A")
+    if sep:
+        if not digits.isdigit():
+            return None
+        axis = int(digits)
+        head = rest
+    rest, sep, digits = head.rpartition(b"T")
+    if sep:
+        if not digits.isdigit():
+            return None
+        tool = int(digits)
+        head = rest
+    if not head.isdigit():
+        return None
+    return int(head), (tool, axis, keep)
@@ -0,0 +1,490 @@
+# patch.py
+
+"""Применение набора изменений (diff) к файлам ALL.PRM станков — раскатка
+проверенной правки на парк.
+
+Набор изменений берётся из comparator.iter_diff() (эталон «до» и «после»)
+или из отчёта diff.py / compare_prm_files (.xlsx, .csv, .jsonl, .sqlite).
+Целевой файл правится потоково, строка за строкой, без разбора в PrmFile:
+каждая строка параметра проверяется тем же разбором, что и в парсере, но
+переписываются только строки с номерами из набора изменений, остальные
+(включая заголовок, переводы строк и посторонние строки) копируются как есть.
+
+- Modified — значение заменяется в существующей строке;
+- Removed — строки ключа удаляются;
+- Added — строка вставляется по порядку ключей (number, axis, tool, keep).
+
+Результат разбирается так же, как исходный файл с применёнными изменениями.
+Расхождение цели с ожидаемым «до» (значение отличается, ключа нет или он
+уже есть) считается конфликтом; изменения при этом всё равно применяются,
+а в режиме strict файл с конфликтами не записывается.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from comparator import ADDED, MODIFIED, REMOVED, DiffRecord, _tuple_key
+from models import Parameter
+from parser import _parse_line_fast
+from writer import format_line
+
+
+_REPORT_FIELDS = ("parameter", "axis", "tool", "keep", "old_value", "new_value", "change")
+
+# Набор изменений воркера: задаётся один раз в _init_worker
+_worker_changes: Optional["ChangeSet"] = None
+
+
+@dataclass
+class Conflict:
+    """Цель не совпала с ожидаемым состоянием «до» (None — ключа нет)."""
+
+    key: str
+    change: str
+    expected: Optional[str]
+    found: Optional[str]
+
+
+@dataclass
+class PatchResult:
+    source: Path
+    output: Path
+    applied: int  # ключей, у которых состояние действительно изменилось
+    conflicts: List[Conflict] = field(default_factory=list)
+    written: bool = True  # False — strict и есть конфликты: файл не записан
+
+
+class ChangeSet:
+    """Изменения, подготовленные для потокового применения к многим файлам."""
+
+    def __init__(self, records: Iterable[DiffRecord]):
+        self.records: Dict[str, DiffRecord] = {}
+        for record in records:
+            if record.change not in (ADDED, REMOVED, MODIFIED):
+                raise ValueError(f"Неизвестный тип изменения: {record.change}")
+            self.records[record.param.key()] = record
+        self.numbers = frozenset(record.param.number for record in self.records.values())
+        # Строки, которые должны оказаться в файле: по порядку ключей
+        self.inserts: List[Tuple[tuple, str, bytes]] = sorted(
+            (_tuple_key(record.new), key, format_line(record.new).encode("utf-8"))
+            for key, record in self.records.items()
+            if record.new is not None
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def from_report(cls, path) -> "ChangeSet":
+        """
+        Набор изменений из отчёта о различиях (diff.py, compare_prm_files).
+        :raises ValueError: если отчёт не читается или построен с --axis-names
+        """
+        from exporters import resolve_format
+
+        path = Path(path)
+        rows = _REPORT_READERS[resolve_format(path)]
+        try:
+            return cls(_record_from_row(row) for row in rows(path))
+        except (OSError, KeyError, IndexError) as e:
+            raise ValueError(f"Не удалось прочитать отчёт {path}: {e}")
+
+    def conflicts(self, found: Dict[str, str]) -> List[Conflict]:
+        """Расхождения цели с ожидаемым «до»; found — значения ключей в цели."""
+        result = []
+        for key, record in self.records.items():
+            expected = record.old.value if record.old is not None else None
+            actual = found.get(key)
+            if actual != expected:
+                result.append(Conflict(key, record.change, expected, actual))
+        return result
+
+    def applied(self, found: Dict[str, str]) -> int:
+        count = 0
+        for key, record in self.records.items():
+            after = record.new.value if record.new is not None else None
+            if found.get(key) != after:
+                count += 1
+        return count
+
+
+def _record_from_row(row) -> DiffRecord:
+    number, axis, tool, keep, old_value, new_value, change = row[:7]
+    try:
+        qualifiers = [None if q in (None, "") else int(q) for q in (axis, tool, keep)]
+    except ValueError:
+        raise ValueError(
+            f"Квалификатор параметра {number} — не число ({axis!r}): "
+            f"отчёт построен с --axis-names? Для раскатки нужен отчёт с номерами осей"
+        ) from None
+    axis, tool, keep = qualifiers
+
+    def param(value):
+        return Parameter(int(number), "" if value is None else str(value), axis, tool, keep)
+
+    # В отчёте у Removed значение удалённого параметра стоит в колонке нового значения
+    if change == MODIFIED:
+        return DiffRecord(MODIFIED, param(old_value), param(new_value))
+    if change == ADDED:
+        return DiffRecord(ADDED, None, param(new_value))
+    if change == REMOVED:
+        return DiffRecord(REMOVED, param(new_value), None)
+    raise ValueError(f"Неизвестный тип изменения в отчёте: {change}")
+
+
+def _csv_rows(path: Path) -> Iterator[list]:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+
+def _jsonl_rows(path: Path) -> Iterator[list]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield [record[name] for name in _REPORT_FIELDS]
+
+
+def _sqlite_rows(path: Path) -> Iterator[tuple]:
+    import sqlite3
+
+    conn = sqlite3.connect(str(path))
+    try:
+        columns = ", ".join(f'"{name}"' for name in _REPORT_FIELDS)
+        yield from conn.execute(f"SELECT {columns} FROM diff ORDER BY rowid")
+    except sqlite3.Error as e:
+        raise OSError(e) from None
+    finally:
+        conn.close()
+
+
+def _xlsx_rows(path: Path) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        yield from wb["Diff"].iter_rows(min_row=2, values_only=True)
+    finally:
+        wb.close()
+
+
+_REPORT_READERS = {"csv": _csv_rows, "jsonl": _jsonl_rows, "sqlite": _sqlite_rows, "xlsx": _xlsx_rows}
+
+
+def _iter_raw_lines(file: BinaryIO, block_size: int = 1 << 20) -> Iterator[bytes]:
+    """
+    Строки вместе с переводом строки. bytes.splitlines режет по '\n', '\r\n'
+    и одиночному '\r' — так же, как parser._iter_lines_fast, поэтому строки
+    совпадают с теми, что видит парсер. Файл читается блоками: последняя
+    (возможно, неполная) строка блока переносится в следующий.
+    """
+    rest = b""
+    for block in iter(lambda: file.read(block_size), b""):
+        lines = (rest + block).splitlines(keepends=True)
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def patch_lines(
+    lines: Iterator[bytes], changes: ChangeSet, found: Dict[str, str]
+) -> Iterator[bytes]:
+    """
+    Потоково применяет изменения к строкам файла (с переводами строк).
+
+    :param found: заполняется значениями ключей из набора, встреченными
+                  в исходном файле (последний дубль побеждает, как в парсере)
+    :raises ValueError: при нарушении формата — тексты те же, что у парсера
+    """
+    first = next(lines, None)
+    if first is None or first.rstrip(b"\r\n") != b"%":
+        raise ValueError("Файл должен начинаться с '%'")
+    yield first
+    line = next(lines, None)
+    if line is None:
+        raise ValueError("Файл должен содержать как минимум две строки: тело и пустую строку в конце")
+    while line is not None and line.startswith(b";"):
+        yield line
+        line = next(lines, None)
+    if line is None or line.rstrip(b"\r\n") != b"PARA101()":
+        raise ValueError("Ожидалась строка 'PARA101()' после заголовка")
+    yield line
+    # Вставленные строки получают тот же перевод строки, что и файл
+    newline = line[len(line.rstrip(b"\r\n")):] or b"\r\n"
+
+    inserts = changes.inserts
+    numbers = changes.numbers
+    position = 0
+    written = set()
+
+    def insert_before(limit) -> List[bytes]:
+        nonlocal position, next_number
+        result = []
+        while position < len(inserts) and inserts[position][0] < limit:
+            _, key, text = inserts[position]
+            position += 1
+            if key not in written:
+                written.add(key)
+                result.append(text + newline)
+        next_number = inserts[position][0][0] if position < len(inserts) else float("inf")
+        return result
+
+    # Номер следующей вставки: строки до него идут без лишних сравнений
+    next_number = inserts[0][0][0] if inserts else float("inf")
+
+    # Две последние строки ('' и '%') парсер не разбирает — они придерживаются
+    older, newer = next(lines, None), next(lines, None)
+    for raw in lines:
+        line, older, newer = older, newer, raw
+        if line[:1] != b"N":
+            yield line
+            continue
+
+        # Разбор и для копируемых строк: испорченная строка — та же ошибка, что у парсера
+        stripped = line.rstrip(b"\r\n")
+        key, param = _parse_line_fast(stripped)
+        number = param.number
+        if number > next_number:
+            yield from insert_before((number,))
+        if number not in numbers:
+            yield line
+            continue
+
+        yield from insert_before(_tuple_key(param))
+        record = changes.records.get(key)
+        if record is None:
+            yield line
+            continue
+        found[key] = param.value
+        if record.change == REMOVED or key in written:
+            # Удалённый ключ или повтор уже записанного — строка выбрасывается
+            continue
+        written.add(key)
+        head = stripped.partition(b"P")[0]
+        yield head + b"P" + record.new.value.encode("utf-8") + line[len(stripped):]
+
+    tail = [raw for raw in (older, newer) if raw is not None]
+    if not tail or tail[-1].rstrip(b"\r\n") != b"%":
+        raise ValueError("Файл должен заканчиваться '%'")
+    appended = insert_before((float("inf"),))
+    if appended and len(tail) < 2:
+        # Перед '%' нет пустой строки: иначе последняя вставка сама стала бы
+        # одной из двух последних строк, которые парсер не читает
+        appended.append(newline)
+    yield from appended
+    yield from tail
+
+
+def apply_patch(source, changes: ChangeSet, output=None, strict: bool = False) -> PatchResult:
+    """
+    Применяет изменения к файлу source и пишет результат в output
+    (по умолчанию — на место source). Запись идёт во временный файл рядом
+    с output и подменяет его только после успешной проверки конца файла.
+
+    :param strict: не записывать файл, если есть конфликты
+    :raises ValueError: при нарушении формата исходного файла
+    """
+    source = Path(source)
+    output = Path(output) if output is not None else source
+    temporary = output.with_name(output.name + ".tmp")
+    found: Dict[str, str] = {}
+    try:
+        with open(source, "rb") as src, open(temporary, "wb") as dst:
+            dst.writelines(patch_lines(_iter_raw_lines(src), changes, found))
+        conflicts = changes.conflicts(found)
+        result = PatchResult(source, output, changes.applied(found), conflicts)
+        if strict and conflicts:
+            temporary.unlink()
+            result.written = False
+            return result
+        os.replace(temporary, output)
+        return result
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def _init_worker(changes: ChangeSet):
+    global _worker_changes
+    _worker_changes = changes
+
+
+def _patch_file(source: Path, output: Path, strict: bool) -> PatchResult:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    return apply_patch(source, _worker_changes, output, strict=strict)
+
+
+def output_paths(files: List[Path], output_dir: Optional[Path]) -> List[Path]:
+    """
+    Пути результатов: структура папок относительно общей родительской папки
+    (machine01/ALL.PRM → output_dir/machine01/ALL.PRM); без output_dir — сами файлы.
+    """
+    if output_dir is None or not files:
+        return list(files)
+    root = Path(os.path.commonpath([str(p.resolve().parent) for p in files]))
+    return [output_dir / p.resolve().relative_to(root) for p in files]
+
+
+def run_patch(
+    files: List[Path],
+    changes: ChangeSet,
+    output_dir: Optional[Path] = None,
+    workers: int = None,
+    strict: bool = False,
+) -> List[Tuple[Path, str, str]]:
+    """
+    Применяет изменения к файлам на пуле процессов; output_dir=None — правка на месте.
+
+    :return: список (файл, статус 'ok'/'conflict'/'error', путь результата или текст)
+             в порядке входного списка
+    """
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(changes,)
+    ) as pool:
+        futures = {
+            pool.submit(_patch_file, source, output, strict): source
+            for source, output in zip(files, output_paths(files, output_dir))
+        }
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                results[source] = (source, "error", str(e))
+                continue
+            if result.conflicts:
+                status = "conflict"
+                conflicts = result.conflicts
+                message = f"конфликтов: {len(conflicts)} ({_format_conflicts(conflicts)})"
+                if not result.written:
+                    message += "; файл не записан"
+            else:
+                status, message = "ok", str(result.output)
+            results[source] = (source, status, message)
+
+    return [results[p] for p in files]
+
+
+def _format_conflicts(conflicts: List[Conflict], limit: int = 3) -> str:
+    parts = [
+        f"{c.key}: ожидалось {'<нет>' if c.expected is None else repr(c.expected)}, "
+        f"в файле {'<нет>' if c.found is None else repr(c.found)}"
+        for c in conflicts[:limit]
+    ]
+    if len(conflicts) > limit:
+        parts.append("…")
+    return "; ".join(parts)
+
+
+def main():
+    from batch import find_prm_files
+
+    parser = argparse.ArgumentParser(
+        description="Применение изменений (diff) к файлам ALL.PRM станков: раскатка правки на парк"
+    )
+    parser.add_argument("source", help="Папка с бэкапами станков или glob-шаблон")
+    changes_source = parser.add_mutually_exclusive_group(required=True)
+    changes_source.add_argument(
+        "--changes",
+        type=Path,
+        help="Отчёт diff.py с изменениями (.xlsx, .csv, .jsonl, .sqlite; без --axis-names)",
+    )
+    changes_source.add_argument(
+        "--diff",
+        nargs=2,
+        type=Path,
+        metavar=("OLD", "NEW"),
+        help="Эталон до и после правки: изменения считаются по ним",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "-o",
+        "--output-dir",
+        type=Path,
+        default=Path("patched"),
+        help="Папка для исправленных файлов (по умолчанию: patched)",
+    )
+    target.add_argument(
+        "--in-place", action="store_true", help="Править файлы на месте (атомарной заменой)"
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Не записывать файлы, которые не совпали с ожидаемым состоянием «до»",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="Число процессов (по умолчанию: число ядер)"
+    )
+    parser.add_argument("--report", type=Path, help="CSV-файл для итогового отчёта по файлам")
+    args = parser.parse_args()
+
+    try:
+        if args.diff:
+            from comparator import iter_diff
+            from parser import load_prm_file
+
+            old, new = (load_prm_file(path, engine="fast") for path in args.diff)
+            changes = ChangeSet(iter_diff(old, new))
+        else:
+            changes = ChangeSet.from_report(args.changes)
+    except Exception as e:
+        # Кроме ошибок формата — и ошибки чтения книги Excel (openpyxl, zipfile)
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    if not changes:
+        print("ℹ️  Изменений нет — файлы не тронуты")
+        return
+
+    files = find_prm_files(args.source)
+    if args.diff:
+        # Сами эталоны могут лежать рядом со станками — их не трогаем
+        references = {path.resolve() for path in args.diff}
+        files = [p for p in files if p.resolve() not in references]
+    if not files:
+        print(f"❌ Файлы ALL.PRM не найдены: {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"🔄 Применение {len(changes)} изменений к {len(files)} файлам...")
+    results = run_patch(
+        files,
+        changes,
+        output_dir=None if args.in_place else args.output_dir,
+        workers=args.workers,
+        strict=args.strict,
+    )
+
+    problems = [r for r in results if r[1] != "ok"]
+    for source, status, message in problems:
+        print(f"❌ {source}: {message}", file=sys.stderr)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["File", "Status", "Result"])
+            for source, status, message in results:
+                writer.writerow([str(source), status, message])
+        print(f"📝 Итоговый отчёт сохранён: {args.report}")
+
+    conflicts = sum(1 for r in results if r[1] == "conflict")
+    errors = sum(1 for r in results if r[1] == "error")
+    print(
+        f"\n✅ Без конфликтов: {len(results) - len(problems)}, "
+        f"❌ с конфликтами: {conflicts}, с ошибками: {errors}"
+    )
+    if errors or (args.strict and conflicts):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
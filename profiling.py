@@ -0,0 +1,252 @@
+# profiling.py
+
+"""Инструментирование этапов: время (span), счётчики и пиковая память.
+
+Пока профилирование выключено (нет активного Profile и подписчиков), span()
+возвращает общий пустой контекстный менеджер, а count() сразу выходит.
+Вызовы стоят на уровне этапов (парсинг, diff, сохранение книги), а не строк,
+поэтому в выключенном состоянии накладные расходы — единицы вызовов функций.
+
+Пример для библиотечного кода:
+    with Profile() as profile:
+        prm = load_prm_file("ALL.PRM")
+    print(profile.format_table())
+
+    subscribe(lambda event: print(event))  # события по мере появления
+"""
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class Event:
+    """Событие для подписчиков: завершённый этап или приращение счётчика."""
+
+    kind: str  # "span" или "counter"
+    name: str
+    value: float  # секунды для span, приращение для counter
+
+
+_profile: Optional["Profile"] = None
+_subscribers: List[Callable[[Event], None]] = []
+_enabled = False
+
+
+def enabled() -> bool:
+    """Включено ли профилирование (есть активный Profile или подписчики)."""
+    return _enabled
+
+
+def _update_enabled() -> None:
+    global _enabled
+    _enabled = _profile is not None or bool(_subscribers)
+
+
+def subscribe(callback: Callable[[Event], None]) -> Callable[[Event], None]:
+    """Подписывает callback на события всех этапов и счётчиков."""
+    _subscribers.append(callback)
+    _update_enabled()
+    return callback
+
+
+def unsubscribe(callback: Callable[[Event], None]) -> None:
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+    _update_enabled()
+
+
+def _emit(event: Event) -> None:
+    if _profile is not None:
+        _profile._record(event)
+    for callback in _subscribers:
+        callback(event)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _emit(Event("span", self.name, time.perf_counter() - self.started))
+        return False
+
+
+def span(name: str):
+    """Контекстный менеджер, замеряющий время этапа name."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Увеличивает счётчик name на value."""
+    if _enabled:
+        _emit(Event("counter", name, value))
+
+
+class CountingIterator:
+    """Итератор-обёртка, считающий выданные элементы (используется, только когда enabled())."""
+
+    __slots__ = ("_iterator", "count")
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
+
+
+class Profile:
+    """
+    Сборщик замеров: суммарное время и число вызовов по этапам, счётчики
+    и (с trace_memory=True) пиковая память по tracemalloc.
+    tracemalloc заметно замедляет работу, поэтому память — по запросу.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.spans: Dict[str, List[float]] = {}  # этап → [вызовов, секунд]
+        self.counters: Dict[str, int] = {}
+        self.peak_bytes: Optional[int] = None
+        self.total_seconds = 0.0
+        self._started = 0.0
+        self._own_tracing = False
+
+    def start(self) -> "Profile":
+        global _profile
+        if _profile is not None:
+            raise RuntimeError("Профилирование уже запущено")
+        if self.trace_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracing = True
+        _profile = self
+        _update_enabled()
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self) -> "Profile":
+        global _profile
+        if _profile is not self:
+            return self
+        self.total_seconds = time.perf_counter() - self._started
+        if self.trace_memory:
+            import tracemalloc
+
+            if tracemalloc.is_tracing():
+                self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            if self._own_tracing:
+                tracemalloc.stop()
+                self._own_tracing = False
+        _profile = None
+        _update_enabled()
+        return self
+
+    def __enter__(self) -> "Profile":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _record(self, event: Event) -> None:
+        if event.kind == "span":
+            entry = self.spans.setdefault(event.name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += event.value
+        else:
+            self.counters[event.name] = self.counters.get(event.name, 0) + event.value
+
+    def to_dict(self) -> dict:
+        return {
+            "total_seconds": self.total_seconds,
+            "spans": {
+                name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.spans.items()
+            },
+            "counters": dict(self.counters),
+            "peak_bytes": self.peak_bytes,
+        }
+
+    def format_table(self) -> str:
+        lines = [f"{'Этап':<28} {'Вызовов':>8} {'Время, мс':>12}"]
+        for name, (calls, seconds) in self.spans.items():
+            lines.append(f"{name:<28} {calls:>8} {seconds * 1000:>12.1f}")
+        lines.append(f"{'Всего':<28} {'':>8} {self.total_seconds * 1000:>12.1f}")
+        if self.counters:
+            lines.append("")
+            lines.append(f"{'Счётчик':<28} {'Значение':>21}")
+            for name, value in self.counters.items():
+                lines.append(f"{name:<28} {value:>21}")
+        if self.peak_bytes is not None:
+            lines.append("")
+            lines.append(f"Пиковая память (tracemalloc): {self.peak_bytes / (1024 * 1024):.1f} МБ")
+        return "\n".join(lines)
+
+
+def add_profile_arguments(parser) -> None:
+    """Добавляет в argparse-парсер CLI флаги --profile и --profile-memory."""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="JSON",
+        help="Замеры этапов и счётчики: таблица в консоль или JSON-файл, если указан путь",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Вместе с --profile: пиковая память через tracemalloc (замедляет работу)",
+    )
+
+
+def start_from_args(args) -> Optional[Profile]:
+    """Запускает Profile по флагам add_profile_arguments (None — профилирование выключено)."""
+    if args.profile is None:
+        return None
+    return Profile(trace_memory=args.profile_memory).start()
+
+
+def finish_from_args(profile: Optional[Profile], args) -> None:
+    """Останавливает Profile и выводит таблицу или пишет JSON."""
+    if profile is None:
+        return
+    profile.stop()
+    if args.profile == "-":
+        print("\n--- Профиль ---")
+        print(profile.format_table())
+        return
+    import json
+
+    Path(args.profile).write_text(
+        json.dumps(profile.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    print(f"📝 Профиль сохранён: {args.profile}")
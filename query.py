@@ -0,0 +1,365 @@
+# query.py
+
+"""Запросы к параметрам одного файла ALL.PRM с учётом справочника.
+
+ParameterIndex строится один раз на файл: параметры упорядочиваются по
+упакованному ключу (models.pack_key), поэтому диапазон номеров — это отрезок,
+который находится двумя bisect. Файл с квалификаторами больше 254 хранится
+в dict (см. parser.parse_prm_file) — его параметры упорядочиваются по
+кортежу comparator._tuple_key с теми же отрезками. Для оси/инструмента/keep, group/subgroup/
+shortname из справочника и для значений строятся обратные индексы
+«значение → отсортированные позиции». Запрос пересекает самый короткий
+из подходящих списков с остальными условиями.
+"""
+
+import argparse
+import shlex
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from comparator import _tuple_key
+from models import ColumnarParameters, Parameter, PrmFile
+from parser import ENGINES, load_prm_file
+from cache import add_cache_arguments, cache_from_args, snapshot_dir_from_args
+from exporters.rows import get_axis_names
+
+
+# Поля запроса в текстовом виде: 'number=2000-2100 axis=Z group="..."'
+QUERY_FIELDS = ("number", "axis", "tool", "keep", "group", "subgroup", "shortname", "value")
+
+_EMPTY: List[int] = []
+
+
+class ParameterIndex:
+    """
+    Индексы по параметрам файла и справочнику описаний.
+
+    Пример:
+        index = ParameterIndex(prm, descriptions)
+        index.query(number=(2000, 2100), axis="Z", group="Оси")
+    """
+
+    def __init__(self, prm: PrmFile, descriptions: dict = None):
+        self.prm = prm
+        self.descriptions = descriptions or {}
+        self.axis_names = get_axis_names(prm)
+
+        parameters = prm.parameters
+        if isinstance(parameters, ColumnarParameters):
+            # Parameter создаётся только для строк из результата запроса
+            pairs = list(parameters.iter_sorted())
+            rows = [row for _, row in pairs]
+            self._packed = True
+            self._keys = [packed for packed, _ in pairs]
+            self._values = parameters.values_at(rows)
+            self._param = lambda i: parameters.parameter(rows[i])
+        else:
+            # Кортежи, а не pack_key: в dict бывают ключи вне упакованных пределов
+            params = sorted(parameters.values(), key=_tuple_key)
+            self._packed = False
+            self._keys = [_tuple_key(p) for p in params]
+            self._values = [p.value for p in params]
+            self._param = params.__getitem__
+
+        self._axes: Dict[int, List[int]] = {}
+        self._tools: Dict[int, List[int]] = {}
+        self._keeps: Dict[int, List[int]] = {}
+        self._by_value: Dict[str, List[int]] = {}
+        self._groups: Dict[str, List[int]] = {}
+        self._subgroups: Dict[str, List[int]] = {}
+        self._shortnames: Dict[str, List[int]] = {}
+        self._sets: Dict[int, frozenset] = {}
+        self._build()
+
+    def _build(self) -> None:
+        # Позиции идут по возрастанию, поэтому все списки получаются отсортированными
+        if self._packed:
+            qualifier_indexes = ((self._axes, 16), (self._tools, 8), (self._keeps, 0))
+            for position, (packed, value) in enumerate(zip(self._keys, self._values)):
+                for index, shift in qualifier_indexes:
+                    code = (packed >> shift) & 0xFF
+                    if code:
+                        index.setdefault(code - 1, []).append(position)
+                self._by_value.setdefault(value, []).append(position)
+        else:
+            qualifier_indexes = (self._axes, self._tools, self._keeps)
+            for position, (key, value) in enumerate(zip(self._keys, self._values)):
+                for index, qualifier in zip(qualifier_indexes, key[1:]):
+                    if qualifier >= 0:
+                        index.setdefault(qualifier, []).append(position)
+                self._by_value.setdefault(value, []).append(position)
+
+        # Справочник задан по номерам; позиции одного номера идут подряд
+        empty = {}
+        keys = self._keys
+        position = 0
+        while position < len(keys):
+            number = keys[position] >> 24 if self._packed else keys[position][0]
+            end = bisect_left(keys, self._number_bound(number + 1), position)
+            desc = self.descriptions.get(number, empty)
+            for index, field in (
+                (self._groups, "group"),
+                (self._subgroups, "subgroup"),
+                (self._shortnames, "shortname"),
+            ):
+                name = desc.get(field)
+                if name:
+                    index.setdefault(name, []).extend(range(position, end))
+            position = end
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def axis_number(self, axis: Union[int, str]) -> int:
+        """Номер оси по номеру ('4', 'A4') или имени из параметра 1013 ('Z')."""
+        if isinstance(axis, int):
+            return axis
+        text = axis.strip()
+        for number, name in self.axis_names.items():
+            if name == text:
+                return number
+        digits = text[1:] if text[:1] in ("A", "a") else text
+        if digits.isdigit():
+            return int(digits)
+        raise ValueError(f"Неизвестная ось: {axis}")
+
+    def query(
+        self,
+        number: Union[int, Tuple[int, int], None] = None,
+        axis: Union[int, str, None] = None,
+        tool: Optional[int] = None,
+        keep: Optional[int] = None,
+        group: Optional[str] = None,
+        subgroup: Optional[str] = None,
+        shortname: Optional[str] = None,
+        value: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Parameter]:
+        """
+        Параметры, удовлетворяющие всем заданным условиям, в числовом порядке.
+
+        :param number: номер или диапазон (включительно) — (2000, 2100)
+        :param axis: номер оси или её имя из параметра 1013 ('Z')
+        """
+        positions = self.positions(
+            number, axis, tool, keep, group, subgroup, shortname, value
+        )
+        if limit is not None:
+            positions = positions[:limit]
+        return self.parameters_at(positions)
+
+    def parameters_at(self, positions: List[int]) -> List[Parameter]:
+        """Параметры по позициям из positions() — без повторного поиска."""
+        return [self._param(i) for i in positions]
+
+    def positions(
+        self,
+        number=None,
+        axis=None,
+        tool=None,
+        keep=None,
+        group=None,
+        subgroup=None,
+        shortname=None,
+        value=None,
+    ) -> List[int]:
+        """Позиции (в числовом порядке ключей) для условий query()."""
+        start, stop = 0, len(self._keys)
+        if number is not None:
+            low, high = (number, number) if isinstance(number, int) else number
+            start = bisect_left(self._keys, self._number_bound(low))
+            stop = bisect_left(self._keys, self._number_bound(high + 1), start)
+
+        candidates = []
+        for index, wanted in (
+            (self._axes, None if axis is None else self.axis_number(axis)),
+            (self._tools, tool),
+            (self._keeps, keep),
+            (self._groups, group),
+            (self._subgroups, subgroup),
+            (self._shortnames, shortname),
+            (self._by_value, value),
+        ):
+            if wanted is not None:
+                candidates.append(index.get(wanted, _EMPTY))
+
+        if not candidates:
+            return list(range(start, stop))
+
+        # Обходим самый короткий список в пределах диапазона номеров,
+        # остальные условия проверяются по множествам
+        clipped = []
+        for positions in candidates:
+            low = bisect_left(positions, start)
+            high = bisect_left(positions, stop, low)
+            clipped.append((high - low, low, high, positions))
+        clipped.sort(key=lambda item: item[0])
+        size, low, high, smallest = clipped[0]
+        if size == 0:
+            return []
+        others = [self._as_set(positions) for _, _, _, positions in clipped[1:]]
+        return [p for p in smallest[low:high] if all(p in s for s in others)]
+
+    def _number_bound(self, number: int):
+        # Наименьший ключ с этим номером: кортеж (number,) меньше любого (number, ...)
+        return number << 24 if self._packed else (number,)
+
+    def describe(self, param: Parameter) -> dict:
+        return self.descriptions.get(param.number, {})
+
+    def _as_set(self, positions: List[int]) -> frozenset:
+        # Кэшируется на время жизни индекса: повторные запросы не строят множества заново
+        cached = self._sets.get(id(positions))
+        if cached is None:
+            cached = self._sets[id(positions)] = frozenset(positions)
+        return cached
+
+
+def parse_query(text: str) -> dict:
+    """
+    Разбирает запрос вида 'number=2000-2100 axis=Z group="Оси"' в аргументы
+    ParameterIndex.query().
+    :raises ValueError: при неизвестном поле или некорректном значении
+    """
+    conditions = {}
+    try:
+        tokens = shlex.split(text)
+    except ValueError as e:
+        raise ValueError(f"Некорректный запрос: {e}")
+    for token in tokens:
+        field, sep, raw = token.partition("=")
+        field = field.strip().lower()
+        if not sep or field not in QUERY_FIELDS:
+            raise ValueError(
+                f"Некорректное условие '{token}'. Ожидается поле=значение, поля: {', '.join(QUERY_FIELDS)}"
+            )
+        try:
+            if field == "number":
+                low, dash, high = _strip_letter(raw, "N").partition("-")
+                conditions[field] = (int(low), int(high)) if dash else int(low)
+            elif field in ("tool", "keep"):
+                # Буква допускается только своя: tool=T1, keep=K1 (не tool=K1)
+                conditions[field] = int(_strip_letter(raw, field[0].upper()))
+            else:
+                conditions[field] = raw
+        except ValueError:
+            raise ValueError(f"Некорректное значение поля {field}: '{raw}'")
+    return conditions
+
+
+def _strip_letter(raw: str, letter: str) -> str:
+    """Убирает одну букву поля перед числом ('T1' → '1'), как в строках ALL.PRM."""
+    return raw[1:] if raw[:1] == letter else raw
+
+
+def _format_param(index: ParameterIndex, param: Parameter) -> str:
+    parts = [f"N{param.number}"]
+    if param.axis is not None:
+        parts.append(f"A{param.axis}")
+    if param.tool is not None:
+        parts.append(f"T{param.tool}")
+    if param.keep is not None:
+        parts.append(f"K{param.keep}")
+    desc = index.describe(param).get("description", "")
+    return f"{''.join(parts)} = {repr(param.value)}{f' → {desc}' if desc else ''}"
+
+
+def _run_query(index: ParameterIndex, text: str, limit: int) -> None:
+    try:
+        conditions = parse_query(text)
+        started = time.perf_counter()
+        positions = index.positions(**conditions)
+        elapsed = (time.perf_counter() - started) * 1000
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    for param in index.parameters_at(positions[:limit]):
+        print(_format_param(index, param))
+    if len(positions) > limit:
+        print(f"... и ещё {len(positions) - limit} параметров")
+    print(f"ℹ️  Найдено: {len(positions)} за {elapsed:.3f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Запросы к параметрам ALL.PRM: number=2000-2100 axis=Z group=..."
+    )
+    parser.add_argument("input_file", nargs="?", default="ALL.PRM", help="Путь к файлу ALL.PRM")
+    parser.add_argument(
+        "-e",
+        "--query",
+        action="append",
+        help="Запрос (можно несколько); без -e запросы читаются построчно из stdin",
+    )
+    parser.add_argument(
+        "--descriptions", type=Path, help="YAML-файл со справочником описаний параметров"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=50, help="Сколько параметров выводить на запрос (по умолчанию: 50)"
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="regex", help="Движок парсера: regex или fast"
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    input_path = Path(args.input_file)
+    if not input_path.exists():
+        print(f"❌ Файл не найден: {input_path}", file=sys.stderr)
+        sys.exit(1)
+
+    descriptions = {}
+    descriptions_path = args.descriptions or Path("descriptions.yaml")
+    if descriptions_path.exists():
+        from utils import load_descriptions
+
+        try:
+            descriptions = load_descriptions(descriptions_path, cache_dir=snapshot_dir_from_args(args))
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.descriptions is not None:
+        print(f"ℹ️  Файл справочника не найден: {descriptions_path}. Запросы без описаний.")
+
+    try:
+        prm_cache = cache_from_args(args)
+        load = prm_cache.load if prm_cache is not None else load_prm_file
+        prm = load(input_path, engine=args.engine, store="columnar")
+    except ValueError as e:
+        print(f"❌ Ошибка парсинга: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    index = ParameterIndex(prm, descriptions)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"✅ Индекс построен: {len(index)} параметров за {elapsed:.1f} мс")
+
+    if args.query:
+        for text in args.query:
+            print(f"\n> {text}")
+            _run_query(index, text, args.limit)
+        return
+
+    # Интерактивный режим (или пакет запросов из stdin); пустая строка или EOF — выход
+    interactive = sys.stdin.isatty()
+    if interactive:
+        print(f"Поля: {', '.join(QUERY_FIELDS)}. Пустая строка — выход.")
+    while True:
+        try:
+            text = input("> " if interactive else "")
+        except EOFError:
+            break
+        if not text.strip():
+            if interactive:
+                break
+            continue
+        if not interactive:
+            print(f"\n> {text}")
+        _run_query(index, text, args.limit)
+
+
+if __name__ == "__main__":
+    main()
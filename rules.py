@@ -0,0 +1,253 @@
+# rules.py
+
+"""Правила проверки значений параметров из справочника descriptions.yaml.
+
+Кроме описаний, у параметра в справочнике могут быть поля правил
+(все необязательные, формат проверяется в utils.load_descriptions):
+
+    2002:
+      shortname: "clamp"
+      min: 0                # значение — число не меньше min
+      max: 1000000          # ... и не больше max
+      allowed: [0, 1]       # значение — одно из перечисленных (строки или числа)
+      per_axis: true        # значение задано для каждой оси, названной в 1013
+      max_param: 2001       # не больше параметра 2001 с теми же квалификаторами
+      min_param: 2003       # не меньше параметра 2003 с теми же квалификаторами
+
+compile_rules() один раз превращает справочник в RuleSet: проверки значения
+собираются в замыкание на каждый номер параметра. RuleSet.check() проверяет
+файл за один проход: параметры с номерами без правил пропускаются, результат
+проверки значения запоминается (по парку одни и те же значения повторяются),
+а проверки по осям из 1013 и по другим параметрам выполняются по данным,
+собранным за этот же проход.
+"""
+
+from array import array
+from dataclasses import dataclass
+from itertools import compress
+from operator import gt, lt
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from analytics import to_number
+from models import ColumnarParameters, Parameter, PrmFile
+
+
+# Имена осей (N1013A1PX): по ним проверяется правило per_axis
+AXIS_NAME_PARAMETER = 1013
+
+# Проверка значения: (правило, сообщение) для каждого нарушения
+ValueCheck = Callable[[str], Tuple[Tuple[str, str], ...]]
+
+# Строка для проверки: (number, axis, tool, keep, value)
+_Row = Tuple[int, Optional[int], Optional[int], Optional[int], str]
+
+
+@dataclass
+class Violation:
+    """Нарушение правила; value=None — значения нет (правило per_axis)."""
+
+    number: int
+    axis: Optional[int]
+    tool: Optional[int]
+    keep: Optional[int]
+    value: Optional[str]
+    rule: str  # number, min, max, allowed, per_axis, min_param, max_param
+    message: str
+
+    def key(self) -> str:
+        return _key(self.number, self.axis, self.tool, self.keep)
+
+
+class RuleSet:
+    """Скомпилированные правила справочника; один объект проверяет любое число файлов."""
+
+    def __init__(
+        self,
+        value_checks: Dict[int, ValueCheck],
+        per_axis: FrozenSet[int],
+        relations: Dict[int, List[Tuple[str, int, Callable[[float, float], bool]]]],
+    ):
+        self.value_checks = value_checks
+        self.per_axis = per_axis
+        # номер → [(правило, номер другого параметра, условие нарушения)]
+        self.relations = relations
+        self._referenced = frozenset(other for rules in relations.values() for _, other, _ in rules)
+        self._watched = frozenset(
+            set(value_checks) | per_axis | set(relations) | self._referenced
+        ) | {AXIS_NAME_PARAMETER}
+        # (номер, значение) → нарушения: общий для всех проверенных файлов
+        self._results: Dict[Tuple[int, str], tuple] = {}
+
+    def __len__(self) -> int:
+        """Число параметров, у которых есть правила."""
+        return len(set(self.value_checks) | self.per_axis | set(self.relations))
+
+    def check(self, prm: PrmFile) -> List[Violation]:
+        """Все нарушения в файле, по порядку ключей (number, axis, tool, keep)."""
+        violations = []
+        value_checks = self.value_checks
+        results = self._results
+        seen_axes = {number: set() for number in self.per_axis}
+        axis_names = {}
+        referenced = self._referenced
+        related = {}
+        pending = []
+
+        for row in _iter_rows(prm.parameters, self._watched):
+            number, axis, tool, keep, value = row
+            check = value_checks.get(number)
+            if check is not None:
+                found = results.get((number, value))
+                if found is None:
+                    found = results[number, value] = check(value)
+                for rule, message in found:
+                    violations.append(Violation(*row, rule, message))
+            if axis is not None:
+                if number in seen_axes:
+                    seen_axes[number].add(axis)
+                if number == AXIS_NAME_PARAMETER:
+                    axis_names[axis] = value.strip()
+            if number in referenced:
+                related[number, axis, tool, keep] = value
+            if number in self.relations:
+                pending.append(row)
+
+        violations.extend(_check_axes(seen_axes, axis_names))
+        violations.extend(self._check_relations(pending, related))
+        violations.sort(key=_sort_key)
+        return violations
+
+    def _check_relations(self, pending: List[_Row], related: dict) -> Iterator[Violation]:
+        for row in pending:
+            number, axis, tool, keep, value = row
+            for rule, other, violated in self.relations[number]:
+                # Сначала параметр с теми же квалификаторами, затем общий (без них)
+                other_key = (other, axis, tool, keep)
+                other_value = related.get(other_key)
+                if other_value is None:
+                    other_key = (other, None, None, None)
+                    other_value = related.get(other_key)
+                if other_value is None:
+                    continue
+                a, b = to_number(value), to_number(other_value)
+                if a is None or b is None or not violated(a, b):
+                    continue
+                word = "больше" if rule == "max_param" else "меньше"
+                yield Violation(
+                    *row, rule, f"{word} {_key(*other_key)} = {other_value.strip()}"
+                )
+
+
+def compile_rules(descriptions: Dict[int, dict]) -> RuleSet:
+    """Компилирует правила справочника (см. utils.load_descriptions)."""
+    value_checks = {}
+    per_axis = set()
+    relations = {}
+    for number, spec in descriptions.items():
+        checks = []
+        if spec.get("min") is not None or spec.get("max") is not None:
+            checks.append(_range_check(spec.get("min"), spec.get("max")))
+        if spec.get("allowed") is not None:
+            checks.append(_allowed_check(spec["allowed"]))
+        if checks:
+            value_checks[number] = checks[0] if len(checks) == 1 else _combine(checks)
+        if spec.get("per_axis"):
+            per_axis.add(number)
+        for rule, violated in (("max_param", gt), ("min_param", lt)):
+            if spec.get(rule) is not None:
+                relations.setdefault(number, []).append((rule, spec[rule], violated))
+    return RuleSet(value_checks, frozenset(per_axis), relations)
+
+
+def _range_check(low, high) -> ValueCheck:
+    def check(value: str):
+        number = to_number(value)
+        if number is None:
+            return (("number", "значение не число"),)
+        if low is not None and number < low:
+            return (("min", f"меньше минимума {low}"),)
+        if high is not None and number > high:
+            return (("max", f"больше максимума {high}"),)
+        return ()
+
+    return check
+
+
+def _allowed_check(allowed: list) -> ValueCheck:
+    # '1', 1 и '1.0' — одно и то же значение; строки вроде 'ABC' сравниваются как есть
+    strings = frozenset(str(item).strip() for item in allowed)
+    numbers = frozenset(
+        n for n in (to_number(str(item)) for item in allowed) if n is not None
+    )
+    message = "значение не из допустимых: " + ", ".join(str(item) for item in allowed)
+
+    def check(value: str):
+        if value.strip() in strings:
+            return ()
+        number = to_number(value)
+        if number is not None and number in numbers:
+            return ()
+        return (("allowed", message),)
+
+    return check
+
+
+def _combine(checks: List[ValueCheck]) -> ValueCheck:
+    def check(value: str):
+        return tuple(found for c in checks for found in c(value))
+
+    return check
+
+
+def _check_axes(seen_axes: Dict[int, set], axis_names: Dict[int, str]) -> Iterator[Violation]:
+    # Оси без имени в 1013 не используются; без 1013 в файле проверять не с чем
+    named = {axis: name for axis, name in axis_names.items() if name}
+    for number, axes in seen_axes.items():
+        for axis in sorted(named.keys() - axes):
+            yield Violation(
+                number,
+                axis,
+                None,
+                None,
+                None,
+                "per_axis",
+                f"нет значения для оси {named[axis]} ({AXIS_NAME_PARAMETER}_A{axis})",
+            )
+
+
+def _iter_rows(parameters, watched: FrozenSet[int]) -> Iterator[_Row]:
+    """Параметры с номерами из watched; остальные даже не превращаются в кортежи."""
+    if not isinstance(parameters, ColumnarParameters):
+        for p in parameters.values():
+            if p.number in watched:
+                yield p.number, p.axis, p.tool, p.keep, p.value
+        return
+
+    numbers, axes, tools, keeps, values, *_, strings = parameters.to_columns()
+    number_column = array("I")
+    number_column.frombytes(numbers)
+    value_column = array("I")
+    value_column.frombytes(values)
+    rows = compress(range(len(number_column)), map(watched.__contains__, number_column))
+    for row in rows:
+        axis, tool, keep = axes[row], tools[row], keeps[row]
+        yield (
+            number_column[row],
+            axis - 1 if axis else None,
+            tool - 1 if tool else None,
+            keep - 1 if keep else None,
+            strings[value_column[row]],
+        )
+
+
+def _key(number: int, axis, tool, keep) -> str:
+    return Parameter(number, "", axis, tool, keep).key()
+
+
+def _sort_key(v: Violation):
+    return (
+        v.number,
+        -1 if v.axis is None else v.axis,
+        -1 if v.tool is None else v.tool,
+        -1 if v.keep is None else v.keep,
+    )
@@ -0,0 +1,472 @@
+# snapshots.py
+
+"""Версионное хранилище снимков ALL.PRM в SQLite.
+
+Для каждого станка хранится цепочка снимков; в снимок записываются только
+параметры, изменившиеся относительно предыдущего снимка того же станка
+(значение NULL — параметр удалён). Первый снимок станка — базовый, в нём
+все параметры. Отдельная таблица current держит последнее состояние каждого
+станка, так что приём нового бэкапа не требует восстанавливать цепочку.
+
+Ключ параметра — упакованное целое models.pack_key, поэтому изменения по
+номеру параметра и квалификаторам ищутся по первичному ключу таблицы
+changes; ни один запрос не перечитывает и не перепарсивает файлы PRM.
+Файл с ключом вне пределов pack_key (квалификатор больше 254) в хранилище
+не принимается: ingest поднимает KeyRangeError, другие файлы это не затрагивает.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from models import ColumnarParameters, Header, KeyRangeError, PrmFile, pack_key, unpack_key
+from parser import ENGINES, parse_parameter_name
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS machines (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    machine_id INTEGER NOT NULL REFERENCES machines(id),
+    taken_at TEXT NOT NULL,
+    header_datetime TEXT,
+    cnc_model TEXT,
+    header_lines TEXT NOT NULL,
+    source_path TEXT,
+    parameter_count INTEGER NOT NULL,
+    changed_count INTEGER NOT NULL,
+    is_baseline INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_machine_time ON snapshots(machine_id, taken_at);
+CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots(taken_at);
+CREATE TABLE IF NOT EXISTS changes (
+    machine_id INTEGER NOT NULL,
+    key INTEGER NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    value TEXT,
+    PRIMARY KEY (machine_id, key, snapshot_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS current (
+    machine_id INTEGER NOT NULL,
+    key INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (machine_id, key)
+) WITHOUT ROWID;
+"""
+
+# Форматы даты в заголовке ALL.PRM и в аргументах CLI (кроме ISO 8601)
+_TIMESTAMP_FORMATS = ("%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y")
+
+
+@dataclass
+class Snapshot:
+    """Метаданные одного снимка."""
+
+    id: int
+    machine: str
+    taken_at: str  # ISO 8601, 'YYYY-MM-DDTHH:MM:SS'
+    header_datetime: Optional[str]
+    cnc_model: Optional[str]
+    source_path: Optional[str]
+    parameter_count: int
+    changed_count: int
+    is_baseline: bool
+
+
+@dataclass
+class HistoryEntry:
+    """Изменение параметра в одном снимке."""
+
+    snapshot: Snapshot
+    value: Optional[str]  # None — параметр удалён
+
+
+def parse_timestamp(text: str) -> str:
+    """
+    Переводит дату ('2024/01/02 03:04:05', '2024-01-02', '02.01.2024 03:04')
+    в ISO 8601 'YYYY-MM-DDTHH:MM:SS' — в таком виде даты сравниваются как строки.
+    :raises ValueError: если формат не распознан
+    """
+    text = text.strip()
+    try:
+        moment = datetime.fromisoformat(text.replace("/", "-"))
+    except ValueError:
+        for fmt in _TIMESTAMP_FORMATS:
+            try:
+                moment = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"Некорректная дата: '{text}'")
+    return moment.replace(tzinfo=None, microsecond=0).isoformat()
+
+
+class SnapshotStore:
+    """
+    Хранилище снимков в файле SQLite.
+
+    Пример:
+        with SnapshotStore("history.sqlite") as store:
+            store.ingest("machine17", load_prm_file("ALL.PRM"))
+            for entry in store.history("machine17", "N2025A4"):
+                print(entry.snapshot.taken_at, entry.value)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Приём снимков ---
+
+    def ingest(self, machine: str, prm: PrmFile, taken_at: Optional[str] = None) -> Snapshot:
+        """
+        Добавляет снимок станка и сохраняет только отличия от предыдущего.
+
+        :param taken_at: время снимка; по умолчанию — дата из заголовка файла
+        :raises ValueError: если дата не определена или снимок старше последнего
+                            снимка этого станка (цепочка изменений только растёт)
+        :raises KeyRangeError: если ключ файла не помещается в упакованный
+                               (см. models.pack_key); хранилище не меняется
+        """
+        header_datetime = prm.header.datetime
+        if taken_at is None:
+            if not header_datetime:
+                raise ValueError("В заголовке нет даты — укажите время снимка явно")
+            taken_at = header_datetime
+        taken_at = parse_timestamp(taken_at)
+
+        new_state = _packed_values(prm.parameters)
+
+        with self._conn:
+            machine_id = self._machine_id(machine, create=True)
+            last = self._conn.execute(
+                "SELECT MAX(taken_at) FROM snapshots WHERE machine_id = ?", (machine_id,)
+            ).fetchone()[0]
+            if last is not None and taken_at < last:
+                raise ValueError(
+                    f"Снимок {machine} от {taken_at} старше последнего сохранённого ({last})"
+                )
+
+            old_state = dict(
+                self._conn.execute(
+                    "SELECT key, value FROM current WHERE machine_id = ?", (machine_id,)
+                )
+            )
+            changed: List[Tuple[int, Optional[str]]] = [
+                (key, value) for key, value in new_state.items() if old_state.get(key) != value
+            ]
+            removed = [key for key in old_state if key not in new_state]
+            changed.extend((key, None) for key in removed)
+
+            cursor = self._conn.execute(
+                "INSERT INTO snapshots (machine_id, taken_at, header_datetime, cnc_model, "
+                "header_lines, source_path, parameter_count, changed_count, is_baseline) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    machine_id,
+                    taken_at,
+                    header_datetime,
+                    prm.header.cnc_model,
+                    json.dumps(list(prm.header.raw_lines), ensure_ascii=False),
+                    prm.source_path,
+                    len(new_state),
+                    len(changed),
+                    int(last is None),
+                ),
+            )
+            snapshot_id = cursor.lastrowid
+
+            self._conn.executemany(
+                "INSERT INTO changes (machine_id, key, snapshot_id, value) VALUES (?, ?, ?, ?)",
+                ((machine_id, key, snapshot_id, value) for key, value in changed),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO current (machine_id, key, value) VALUES (?, ?, ?)",
+                ((machine_id, key, value) for key, value in changed if value is not None),
+            )
+            self._conn.executemany(
+                "DELETE FROM current WHERE machine_id = ? AND key = ?",
+                ((machine_id, key) for key in removed),
+            )
+
+        return self._snapshot(snapshot_id)
+
+    # --- Запросы ---
+
+    def machines(self) -> List[str]:
+        """Имена станков в хранилище."""
+        return [name for (name,) in self._conn.execute("SELECT name FROM machines ORDER BY name")]
+
+    def snapshots(self, machine: str) -> List[Snapshot]:
+        """Снимки станка по возрастанию времени."""
+        machine_id = self._machine_id(machine)
+        rows = self._conn.execute(
+            _SNAPSHOT_SELECT + "WHERE s.machine_id = ? ORDER BY s.taken_at, s.id", (machine_id,)
+        )
+        return [_snapshot_from_row(row) for row in rows]
+
+    def history(self, machine: str, name) -> List[HistoryEntry]:
+        """
+        История одного параметра: снимки, в которых его значение менялось
+        (первая запись — значение в базовом снимке или момент появления).
+
+        :param name: имя ('N2025A4', '2025A4'), ключ ('2025_A4') или
+                     кортеж (number, axis, tool, keep)
+        """
+        machine_id = self._machine_id(machine)
+        try:
+            key = _name_to_packed(name)
+        except KeyRangeError:
+            return []  # такой ключ ingest не принимает — истории у него нет
+        rows = self._conn.execute(
+            _SNAPSHOT_SELECT.replace("SELECT ", "SELECT c.value, ", 1)
+            + "JOIN changes c ON c.snapshot_id = s.id "
+            "WHERE c.machine_id = ? AND c.key = ? ORDER BY c.snapshot_id",
+            (machine_id, key),
+        )
+        return [HistoryEntry(snapshot=_snapshot_from_row(row[1:]), value=row[0]) for row in rows]
+
+    def state_at(self, machine: str, when: Optional[str] = None) -> PrmFile:
+        """
+        Состояние станка на момент when (последний снимок не позже when);
+        when=None — текущее состояние.
+        :raises ValueError: если на этот момент снимков ещё не было
+        """
+        machine_id = self._machine_id(machine)
+        if when is None:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM snapshots WHERE machine_id = ?", (machine_id,)
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT id FROM snapshots WHERE machine_id = ? AND taken_at <= ? "
+                "ORDER BY taken_at DESC, id DESC LIMIT 1",
+                (machine_id, parse_timestamp(when)),
+            ).fetchone()
+        if row is None or row[0] is None:
+            raise ValueError(f"Нет снимков станка {machine} на {when}")
+        snapshot_id = row[0]
+
+        latest = self._conn.execute(
+            "SELECT MAX(id) FROM snapshots WHERE machine_id = ?", (machine_id,)
+        ).fetchone()[0]
+        if snapshot_id == latest:
+            pairs = self._conn.execute(
+                "SELECT key, value FROM current WHERE machine_id = ? ORDER BY key", (machine_id,)
+            )
+        else:
+            # Для каждого ключа — последнее изменение не позже снимка
+            # (голый столбец value берётся из строки с MAX(snapshot_id))
+            pairs = (
+                (key, value)
+                for key, value, _ in self._conn.execute(
+                    "SELECT key, value, MAX(snapshot_id) FROM changes "
+                    "WHERE machine_id = ? AND snapshot_id <= ? GROUP BY key ORDER BY key",
+                    (machine_id, snapshot_id),
+                )
+                if value is not None
+            )
+
+        parameters = ColumnarParameters()
+        for key, value in pairs:
+            number, axis, tool, keep = unpack_key(key)
+            parameters.add(number, value, axis, tool, keep)
+
+        header_lines, source_path = self._conn.execute(
+            "SELECT header_lines, source_path FROM snapshots WHERE id = ?", (snapshot_id,)
+        ).fetchone()
+        return PrmFile(
+            header=Header(raw_lines=json.loads(header_lines)),
+            parameters=parameters.freeze(),
+            source_path=source_path,
+        )
+
+    def changed_since(self, when: str) -> List[Tuple[str, int, int, str]]:
+        """
+        Станки, у которых после when появились снимки с изменениями
+        (базовые снимки не считаются).
+
+        :return: список (станок, число снимков с изменениями, всего изменённых
+                 параметров, время последнего такого снимка)
+        """
+        rows = self._conn.execute(
+            "SELECT m.name, COUNT(*), SUM(s.changed_count), MAX(s.taken_at) "
+            "FROM snapshots s JOIN machines m ON m.id = s.machine_id "
+            "WHERE s.taken_at > ? AND s.changed_count > 0 AND NOT s.is_baseline "
+            "GROUP BY m.name ORDER BY m.name",
+            (parse_timestamp(when),),
+        )
+        return [tuple(row) for row in rows]
+
+    # --- Внутреннее ---
+
+    def _machine_id(self, machine: str, create: bool = False) -> int:
+        row = self._conn.execute("SELECT id FROM machines WHERE name = ?", (machine,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            raise ValueError(f"Станок не найден в хранилище: {machine}")
+        return self._conn.execute("INSERT INTO machines (name) VALUES (?)", (machine,)).lastrowid
+
+    def _snapshot(self, snapshot_id: int) -> Snapshot:
+        row = self._conn.execute(_SNAPSHOT_SELECT + "WHERE s.id = ?", (snapshot_id,)).fetchone()
+        return _snapshot_from_row(row)
+
+
+_SNAPSHOT_SELECT = (
+    "SELECT s.id, m.name, s.taken_at, s.header_datetime, s.cnc_model, s.source_path, "
+    "s.parameter_count, s.changed_count, s.is_baseline "
+    "FROM snapshots s JOIN machines m ON m.id = s.machine_id "
+)
+
+
+def _snapshot_from_row(row) -> Snapshot:
+    return Snapshot(*row[:8], is_baseline=bool(row[8]))
+
+
+def _packed_values(parameters) -> Dict[int, str]:
+    # Колоночное хранилище уже знает упакованные ключи — Parameter не создаются
+    if isinstance(parameters, ColumnarParameters):
+        pairs = list(parameters.iter_sorted())
+        values = parameters.values_at([row for _, row in pairs])
+        return {packed: value for (packed, _), value in zip(pairs, values)}
+    return {pack_key(p.number, p.axis, p.tool, p.keep): p.value for p in parameters.values()}
+
+
+def _name_to_packed(name) -> int:
+    if isinstance(name, tuple):
+        return pack_key(*name)
+    return pack_key(*parse_parameter_name(name))
+
+
+def _print_snapshot(snapshot: Snapshot) -> None:
+    kind = "базовый" if snapshot.is_baseline else f"изменений: {snapshot.changed_count}"
+    print(
+        f"  #{snapshot.id} {snapshot.taken_at}  {snapshot.cnc_model or ''}  "
+        f"параметров: {snapshot.parameter_count}, {kind}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Хранилище снимков ALL.PRM: история параметров по станкам"
+    )
+    parser.add_argument("store", type=Path, help="Файл хранилища SQLite (например, history.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Добавить бэкапы станка (по возрастанию даты)")
+    ingest.add_argument("machine", help="Имя станка")
+    ingest.add_argument("files", nargs="+", type=Path, help="Файлы ALL.PRM")
+    ingest.add_argument("--taken-at", help="Время снимка (по умолчанию — дата из заголовка)")
+    ingest.add_argument(
+        "--engine", choices=ENGINES, default="fast", help="Движок парсера"
+    )
+
+    history = commands.add_parser("history", help="История одного параметра")
+    history.add_argument("machine", help="Имя станка")
+    history.add_argument("parameter", help="Параметр: N2025A4, 2025A4 или 2025_A4")
+
+    state = commands.add_parser("state", help="Состояние станка на дату")
+    state.add_argument("machine", help="Имя станка")
+    state.add_argument("when", nargs="?", help="Дата (по умолчанию — текущее состояние)")
+    state.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Экспорт состояния (.xlsx, .csv, .jsonl, .sqlite) или файл .PRM для восстановления",
+    )
+
+    changed = commands.add_parser("changed", help="Станки с изменениями после даты")
+    changed.add_argument("since", help="Дата, например 2024-01-01")
+
+    commands.add_parser("machines", help="Список станков и их снимков")
+    args = parser.parse_args()
+
+    try:
+        with SnapshotStore(args.store) as store:
+            if args.command == "ingest":
+                from parser import load_prm_file
+
+                if args.taken_at and len(args.files) > 1:
+                    print("❌ --taken-at можно указать только для одного файла", file=sys.stderr)
+                    sys.exit(1)
+                # Файл с ошибкой пропускается, остальные принимаются
+                failed = 0
+                for path in args.files:
+                    try:
+                        prm = load_prm_file(path, engine=args.engine, store="columnar")
+                        snapshot = store.ingest(args.machine, prm, taken_at=args.taken_at)
+                    except ValueError as e:
+                        print(f"❌ {path}: {e}", file=sys.stderr)
+                        failed += 1
+                        continue
+                    print(f"✅ {path}:")
+                    _print_snapshot(snapshot)
+                if failed:
+                    sys.exit(1)
+
+            elif args.command == "history":
+                entries = store.history(args.machine, args.parameter)
+                if not entries:
+                    print(f"ℹ️  Параметр {args.parameter} не встречается в снимках {args.machine}")
+                for entry in entries:
+                    value = "<удалён>" if entry.value is None else repr(entry.value)
+                    print(f"{entry.snapshot.taken_at}  {value}")
+
+            elif args.command == "state":
+                prm = store.state_at(args.machine, args.when)
+                print(f"✅ {args.machine} на {args.when or 'текущий момент'}: "
+                      f"{len(prm.parameters)} параметров (снимок от {prm.header.datetime})")
+                if args.output and args.output.suffix.lower() == ".prm":
+                    # Восстановление конфигурации станка: снова файл ALL.PRM
+                    from writer import write_prm_file
+
+                    write_prm_file(prm, args.output)
+                    print(f"✅ Файл ALL.PRM сохранён: {args.output}")
+                elif args.output:
+                    from exporters import export_parameters
+
+                    export_parameters(prm, args.output)
+                    print(f"✅ Экспорт завершён: {args.output}")
+
+            elif args.command == "changed":
+                rows = store.changed_since(args.since)
+                if not rows:
+                    print(f"ℹ️  Изменений после {args.since} нет")
+                for machine, snapshots, params, last in rows:
+                    print(f"{machine}: снимков с изменениями {snapshots}, "
+                          f"изменённых параметров {params}, последний {last}")
+
+            elif args.command == "machines":
+                for machine in store.machines():
+                    print(machine)
+                    for snapshot in store.snapshots(machine):
+                        _print_snapshot(snapshot)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# tests/test_analytics.py
+
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analytics import build_matrix, key_stats  # noqa: E402
+from parser import parse_prm_file  # noqa: E402
+
+
+def _prm(body: str, store: str = "columnar"):
+    text = f"%\r\n;HEADER\r\nPARA101()\r\n{body}\r\n%\r\n"
+    return parse_prm_file(io.StringIO(text, newline=""), store=store)
+
+
+def test_key_stats():
+    machines = {
+        "m1": _prm("N1P3\r\nN2PABC\r\n"),
+        "m2": _prm("N1P1\r\n"),
+        "m3": _prm("N1P2\r\nN2P5\r\n", store="dict"),
+    }
+
+    matrix = build_matrix(machines)
+    stats = key_stats(matrix)
+
+    assert matrix.machines == ["m1", "m2", "m3"]
+    assert stats.count.tolist() == [3, 1]
+    assert stats.min.tolist() == [1.0, 5.0]
+    assert stats.max.tolist() == [3.0, 5.0]
+    assert stats.median.tolist() == [2.0, 5.0]
+
+
+def test_wide_qualifier_machine_is_skipped():
+    machines = {
+        "m1": _prm("N2025A4P1\r\n"),
+        "wide": _prm("N2025A4P2\r\nN2025A300P5\r\n"),
+        "m2": _prm("N2025A4P3\r\n", store="dict"),
+    }
+
+    matrix = build_matrix(machines)
+
+    assert matrix.machines == ["m1", "m2"]
+    assert list(matrix.skipped) == ["wide"]
+    assert "300" in matrix.skipped["wide"]
+    assert matrix.values[matrix.row("N2025A4")].tolist() == [1.0, 3.0]
+
+
+def test_empty_fleet():
+    matrix = build_matrix({"wide": _prm("N2025A300P5\r\n", store="dict")})
+    stats = key_stats(matrix)
+
+    assert matrix.machines == []
+    assert len(matrix.keys) == 0
+    assert stats.min.tolist() == []
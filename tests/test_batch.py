@@ -0,0 +1,35 @@
+# tests/test_batch.py
+
+from batch import machine_names, output_names
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+    return path
+
+
+def test_machine_names_use_relative_path(tmp_path):
+    files = [_touch(tmp_path / f"machine{i}" / "ALL.PRM") for i in (1, 2)]
+    assert machine_names(files) == ["machine1_ALL", "machine2_ALL"]
+
+
+def test_output_names_are_unique(tmp_path):
+    files = [
+        _touch(tmp_path / "a_b" / "ALL.PRM"),
+        _touch(tmp_path / "a" / "b_ALL.PRM"),
+        _touch(tmp_path / "a" / "b_ALL.prm"),
+        _touch(tmp_path / "a" / "b_ALL_2.PRM"),
+        _touch(tmp_path / "A_B" / "all.PRM"),
+    ]
+
+    names = output_names(files)
+
+    assert names == [
+        "a_b_ALL.xlsx",
+        "a_b_ALL_2.xlsx",
+        "a_b_ALL_3.xlsx",
+        "a_b_ALL_2_2.xlsx",
+        "A_B_all_4.xlsx",
+    ]
+    assert len({n.lower() for n in names}) == len(names)
@@ -0,0 +1,225 @@
+# tests/test_collect.py
+
+"""Сборщик против локального тестового FTP-сервера на asyncio."""
+
+import asyncio
+
+import pytest
+
+from benchmarks.generate import generate_prm
+from collect import Target, collect, fetch_ftp
+
+
+PRM_DATA = generate_prm(50).encode("utf-8")
+
+
+class StandInFtpServer:
+    """
+    Минимальный FTP-сервер: USER/PASS, TYPE, PASV, RETR, QUIT — ровно то,
+    что делает collect.fetch_ftp.
+
+    :param drop_first: столько первых соединений закрыть сразу, без приветствия
+    :param greeting_delay: пауза перед приветствием (для тайм-аутов)
+    :param retr_delay: пауза перед отправкой файла (для проверки параллельности)
+    :param greeting: первая строка ответа (испорченная — для «не FTP»)
+    """
+
+    def __init__(
+        self,
+        data: bytes = PRM_DATA,
+        drop_first: int = 0,
+        greeting_delay: float = 0.0,
+        retr_delay: float = 0.0,
+        greeting: bytes = b"220 stand-in ready\r\n",
+    ):
+        self.data = data
+        self.drop_first = drop_first
+        self.greeting_delay = greeting_delay
+        self.retr_delay = retr_delay
+        self.greeting = greeting
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.port = None
+        self._server = None
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+
+    def target(self, name: str) -> Target:
+        return Target(name=name, host="127.0.0.1", port=self.port)
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        if self.connections <= self.drop_first:
+            writer.close()
+            return
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        data_server = None
+        try:
+            await asyncio.sleep(self.greeting_delay)
+            writer.write(self.greeting)
+            data_writer = asyncio.get_running_loop().create_future()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("latin-1").split()[0].upper()
+                if command == "USER":
+                    writer.write(b"331 password please\r\n")
+                elif command == "PASS":
+                    writer.write(b"230 logged in\r\n")
+                elif command == "TYPE":
+                    writer.write(b"200 binary\r\n")
+                elif command == "PASV":
+
+                    async def on_data(_, data_conn_writer):
+                        data_writer.set_result(data_conn_writer)
+
+                    data_server = await asyncio.start_server(on_data, "127.0.0.1", 0)
+                    port = data_server.sockets[0].getsockname()[1]
+                    writer.write(
+                        f"227 Entering Passive Mode (127,0,0,1,{port // 256},{port % 256})\r\n".encode()
+                    )
+                elif command == "RETR":
+                    writer.write(b"150 sending\r\n")
+                    await writer.drain()
+                    await asyncio.sleep(self.retr_delay)
+                    conn = await data_writer
+                    conn.write(self.data)
+                    await conn.drain()
+                    conn.close()
+                    writer.write(b"226 done\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 bye\r\n")
+                    break
+                else:
+                    writer.write(b"502 not implemented\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.active -= 1
+            if data_server is not None:
+                data_server.close()
+            writer.close()
+
+
+def _collect(targets, **kwargs):
+    kwargs.setdefault("retry_delay", 0.01)
+    kwargs.setdefault("workers", 1)
+    return collect(targets, **kwargs)
+
+
+def test_collects_and_parses_backup():
+    async def scenario():
+        async with StandInFtpServer() as server:
+            return await _collect([server.target("m1")])
+
+    (result,) = asyncio.run(scenario())
+    assert result.status == "ok"
+    assert result.attempts == 1
+    assert result.data == PRM_DATA
+    assert len(result.prm.parameters) == 50
+
+
+def test_retries_after_dropped_connections():
+    async def scenario():
+        async with StandInFtpServer(drop_first=2) as server:
+            results = await _collect([server.target("m1")], retries=2)
+            return results, server.connections
+
+    (result,), connections = asyncio.run(scenario())
+    assert result.status == "ok"
+    assert result.attempts == 3
+    assert connections == 3
+
+
+def test_gives_up_after_retries():
+    async def scenario():
+        async with StandInFtpServer(drop_first=10) as server:
+            return await _collect([server.target("m1")], retries=1)
+
+    (result,) = asyncio.run(scenario())
+    assert result.status == "error"
+    assert result.attempts == 2
+    assert "закрыл соединение" in result.message
+
+
+def test_timeout_per_attempt():
+    async def scenario():
+        async with StandInFtpServer(greeting_delay=1.0) as server:
+            return await _collect([server.target("m1")], timeout=0.1, retries=1)
+
+    (result,) = asyncio.run(scenario())
+    assert result.status == "error"
+    assert result.attempts == 2
+    assert result.message == "тайм-аут 0.1 с"
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_concurrency_limit(concurrency):
+    async def scenario():
+        async with StandInFtpServer(retr_delay=0.05) as server:
+            targets = [server.target(f"m{i}") for i in range(8)]
+            results = await _collect(targets, concurrency=concurrency)
+            return results, server.max_active
+
+    results, max_active = asyncio.run(scenario())
+    assert [r.status for r in results] == ["ok"] * 8
+    assert [r.target.name for r in results] == [f"m{i}" for i in range(8)]
+    assert max_active == concurrency
+
+
+def test_garbled_reply_fails_only_that_host():
+    async def scenario():
+        async with StandInFtpServer(greeting=b"HTTP/1.1 400 Bad Request\r\n") as bad:
+            async with StandInFtpServer() as good:
+                return await _collect([bad.target("bad"), good.target("good")], retries=1)
+
+    bad_result, good_result = asyncio.run(scenario())
+    assert bad_result.status == "error"
+    assert bad_result.attempts == 2
+    assert "Некорректный ответ FTP-сервера" in bad_result.message
+    assert good_result.status == "ok"
+
+
+def test_parse_error_is_not_retried():
+    async def scenario():
+        async with StandInFtpServer(data=b"not a backup\r\n") as server:
+            results = await _collect([server.target("m1")], retries=2)
+            return results, server.connections
+
+    (result,), connections = asyncio.run(scenario())
+    assert result.status == "error"
+    assert result.attempts == 1
+    assert connections == 1
+    assert result.message == "Файл должен начинаться с '%'"
+
+
+def test_sockets_are_closed_when_fetch_returns(monkeypatch):
+    writers = []
+    open_connection = asyncio.open_connection
+
+    async def recording_open_connection(*args, **kwargs):
+        reader, writer = await open_connection(*args, **kwargs)
+        writers.append(writer)
+        return reader, writer
+
+    monkeypatch.setattr(asyncio, "open_connection", recording_open_connection)
+
+    async def scenario():
+        async with StandInFtpServer() as server:
+            data = await fetch_ftp(server.target("m1"))
+            # Сразу после возврата, без лишних итераций цикла: оба сокета уже закрыты
+            return data, [w.get_extra_info("socket").fileno() for w in writers]
+
+    data, filenos = asyncio.run(scenario())
+    assert data == PRM_DATA
+    assert filenos == [-1, -1]
@@ -0,0 +1,29 @@
+# tests/test_descriptions.py
+
+import pytest
+
+import utils
+from utils import load_descriptions
+
+
+@pytest.fixture
+def yaml_path(tmp_path):
+    path = tmp_path / "descriptions.yaml"
+    path.write_text('1001:\n  shortname: "SYS_ON"\n  allowed: [0, 1]\n', encoding="utf-8")
+    return path
+
+
+def test_no_snapshot_by_default(yaml_path, monkeypatch):
+    def forbidden(*args):
+        raise AssertionError("снимок справочника без явного cache_dir")
+
+    monkeypatch.setattr(utils, "_read_snapshot", forbidden)
+    monkeypatch.setattr(utils, "_write_snapshot", forbidden)
+    assert load_descriptions(yaml_path) == {1001: {"shortname": "SYS_ON", "allowed": [0, 1]}}
+
+
+def test_snapshot_in_explicit_cache_dir(yaml_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    first = load_descriptions(yaml_path, cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("descriptions-*.pickle"))) == 1
+    assert load_descriptions(yaml_path, cache_dir=cache_dir) == first
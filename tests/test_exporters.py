@@ -0,0 +1,85 @@
+# tests/test_exporters.py
+
+import sqlite3
+
+import openpyxl
+import pytest
+
+from benchmarks.generate import generate_prm
+from exporters.to_excel import export_to_excel
+from exporters.to_sqlite import write_diff
+from parser import load_prm_file
+
+COLUMNS = [("parameter", "Parameter"), ("value", "Value")]
+
+
+def _failing_rows():
+    yield [1, "a"]
+    yield [2, "b"]
+    raise OSError("диск заполнен")
+
+
+def _rows(path, table):
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute(f'SELECT * FROM "{table}"').fetchall()
+    finally:
+        conn.close()
+
+
+def test_sqlite_failed_export_keeps_previous_contents(tmp_path):
+    path = tmp_path / "diff.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE notes (text)")
+    conn.execute("INSERT INTO notes VALUES ('keep me')")
+    conn.commit()
+    conn.close()
+    write_diff(COLUMNS, [[7, "old"]], path)
+
+    with pytest.raises(OSError, match="диск заполнен"):
+        write_diff(COLUMNS, _failing_rows(), path)
+
+    assert _rows(path, "diff") == [(7, "old")]
+    assert _rows(path, "notes") == [("keep me",)]
+    assert not (tmp_path / "diff.sqlite-journal").exists()
+
+
+def test_sqlite_failed_export_leaves_no_new_file(tmp_path):
+    path = tmp_path / "diff.sqlite"
+
+    with pytest.raises(OSError):
+        write_diff(COLUMNS, _failing_rows(), path)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_excel_modes_write_the_same_workbook(tmp_path):
+    source = tmp_path / "ALL.PRM"
+    source.write_bytes(generate_prm(500, seed=2).encode("utf-8"))
+    prm = load_prm_file(source)
+    descriptions = {p.number: {"group": "G", "description": "d"} for p in prm.parameters.values()}
+
+    def dump(path):
+        wb = openpyxl.load_workbook(path)
+        return [
+            (ws.title, ws.freeze_panes, [[c.value for c in row] for row in ws.iter_rows()])
+            for ws in wb.worksheets
+        ]
+
+    sheets = []
+    for write_only in (False, True):
+        output = tmp_path / f"out_{write_only}.xlsx"
+        export_to_excel(prm, output, descriptions, use_axis_names=True, write_only=write_only)
+        sheets.append(dump(output))
+
+    assert sheets[0] == sheets[1]
+    titles = [title for title, _, _ in sheets[0]]
+    assert titles == [
+        "Header",
+        "Parameters.All",
+        "Parameters.General",
+        "Parameters.Axis",
+        "Parameters.Tool",
+        "Parameters.Keep",
+    ]
+    assert len(sheets[0][1][2]) == len(prm.parameters) + 1
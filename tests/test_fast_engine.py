@@ -0,0 +1,133 @@
+# tests/test_fast_engine.py
+
+"""Быстрый движок разбора должен давать тот же результат, что и regex-движок."""
+
+from itertools import product
+
+import pytest
+
+from benchmarks.generate import generate_prm
+from parser import STORES, load_prm_file
+
+
+def _write(tmp_path, text: str, newline: str = "\r\n"):
+    path = tmp_path / "ALL.PRM"
+    path.write_bytes(text.replace("\n", newline).encode("utf-8"))
+    return path
+
+
+def _prm_text(body_lines) -> str:
+    return "%\n;2024/01/02 03:04:05\n;M800VW\nPARA101()\n" + "".join(
+        line + "\n" for line in body_lines
+    ) + "\n%\n"
+
+
+def _assert_same(path, store):
+    regex = load_prm_file(path, engine="regex", store=store)
+    fast = load_prm_file(path, engine="fast", store=store)
+    assert fast.header == regex.header
+    assert list(fast.parameters.items()) == list(regex.parameters.items())
+    return fast
+
+
+def _assert_same_error(path, store):
+    with pytest.raises(ValueError) as regex_error:
+        load_prm_file(path, engine="regex", store=store)
+    with pytest.raises(ValueError) as fast_error:
+        load_prm_file(path, engine="fast", store=store)
+    assert str(fast_error.value) == str(regex_error.value)
+    return str(fast_error.value)
+
+
+@pytest.mark.parametrize("store", STORES)
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("newline", ["\r\n", "\n", "\r"])
+def test_generated_files(tmp_path, store, seed, newline):
+    path = tmp_path / "ALL.PRM"
+    path.write_bytes(generate_prm(3000, seed=seed, newline=newline).encode("utf-8"))
+    prm = _assert_same(path, store)
+    assert len(prm.parameters) == 3000
+
+
+@pytest.mark.parametrize("store", STORES)
+@pytest.mark.parametrize("newline", ["\r\n", "\n", "\r"])
+def test_all_qualifier_combinations(tmp_path, store, newline):
+    lines = []
+    for tool, axis, keep in product([None, 1, 12], repeat=3):
+        head = "N2025"
+        head += f"T{tool}" if tool is not None else ""
+        head += f"A{axis}" if axis is not None else ""
+        head += f"K{keep}" if keep is not None else ""
+        lines.append(f"{head}P{tool}{axis}{keep}")
+    path = _write(tmp_path, _prm_text(lines), newline)
+    prm = _assert_same(path, store)
+    assert len(prm.parameters) == 27
+    assert prm.parameters["2025_A12_T1_K12"].value == "11212"
+
+
+@pytest.mark.parametrize("store", STORES)
+def test_empty_whitespace_and_odd_values(tmp_path, store):
+    lines = [
+        "N1P",
+        "N2P ",
+        "N3P  12 ",
+        "N4P\t",
+        "N5PP1P2",
+        "N6PЗначение",
+        "N7A1P G28 X0",
+        "N8P-0.001",
+        "N008P1",  # ведущие нули в номере
+        "N1P5",  # дубль: место первого, значение последнего
+        "N１２A３P9",  # не-ASCII цифры regex-движок принимает — быстрый тоже
+    ]
+    path = _write(tmp_path, _prm_text(lines))
+    prm = _assert_same(path, store)
+    assert prm.parameters["2"].value == " "
+    assert prm.parameters["5"].value == "P1P2"
+    assert prm.parameters["8"].value == "1"
+    assert list(prm.parameters)[0] == "1" and prm.parameters["1"].value == "5"
+    assert prm.parameters["12_A3"].value == "9"
+
+
+@pytest.mark.parametrize("store", STORES)
+def test_skipped_lines_and_mixed_newlines(tmp_path, store):
+    text = "%\r\n;H\r\nPARA101()\r\n; comment\nN1P1\r\rX\rN2A1P2\n\r\nN3P3\r\n\r\n%\r\n"
+    path = tmp_path / "ALL.PRM"
+    path.write_bytes(text.encode("utf-8"))
+    prm = _assert_same(path, store)
+    assert list(prm.parameters) == ["1", "2_A1", "3"]
+
+
+@pytest.mark.parametrize("store", STORES)
+@pytest.mark.parametrize(
+    "line",
+    ["N12XP1", "NP1", "N1A", "N1AP1", "N1A1T1P1", "N1K1A1P1", "N1T1T2P1", "N1A-1P1"],
+)
+def test_malformed_parameter_line(tmp_path, store, line):
+    path = _write(tmp_path, _prm_text(["N1P1", line, "N2P2"]))
+    message = _assert_same_error(path, store)
+    assert message == f"Невозможно распарсить строку параметра: {line}"
+
+
+@pytest.mark.parametrize("store", STORES)
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("N1P1\n%\n", "Файл должен начинаться с '%'"),
+        ("%\n", "Файл должен содержать как минимум две строки: тело и пустую строку в конце"),
+        ("%\n;H\nN1P1\n\n%\n", "Ожидалась строка 'PARA101()' после заголовка"),
+        ("%\n;H\nPARA101()\nN1P1\n\n", "Файл должен заканчиваться '%'"),
+        ("%\n;H\nPARA101()\nN1P1\n%\nX\n", "Файл должен заканчиваться '%'"),
+    ],
+)
+def test_format_errors(tmp_path, store, text, message):
+    path = _write(tmp_path, text)
+    assert _assert_same_error(path, store) == message
+
+
+@pytest.mark.parametrize("store", STORES)
+def test_last_two_lines_are_not_parameters(tmp_path, store):
+    # Предпоследняя строка не разбирается, даже если похожа на параметр
+    path = _write(tmp_path, "%\n;H\nPARA101()\nN1P1\nN2P2\n%\n")
+    prm = _assert_same(path, store)
+    assert list(prm.parameters) == ["1"]
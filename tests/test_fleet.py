@@ -0,0 +1,31 @@
+# tests/test_fleet.py
+
+import io
+
+import pytest
+
+from fleet import compare_fleet
+from parser import parse_prm_file
+
+
+def _prm(body: str, store: str):
+    text = f"%\r\n;HEADER\r\nPARA101()\r\n{body}\r\n%\r\n"
+    return parse_prm_file(io.StringIO(text, newline=""), store=store)
+
+
+@pytest.mark.parametrize("store", ["dict", "columnar"])
+def test_fleet_with_wide_qualifier(store):
+    baseline = _prm("N2025A1P1\r\nN2026P1\r\n", store)
+    machines = {
+        "wide": _prm("N2025A1P1\r\nN2025A300P5\r\nN2026P2\r\n", "columnar"),
+        "plain": _prm("N2025A1P2\r\nN2026P1\r\n", store),
+    }
+
+    report = compare_fleet(baseline, machines)
+
+    assert [(row.param.key(), row.values) for row in report.rows] == [
+        ("2025_A1", ["1", "2"]),
+        ("2025_A300", ["5", None]),
+        ("2026", ["2", "1"]),
+    ]
+    assert report.deviations_by_machine() == {"wide": 2, "plain": 1}
@@ -0,0 +1,76 @@
+# tests/test_models.py
+
+import pytest
+
+from models import ColumnarParameters, KeyRangeError, Parameter, pack_key, parse_key
+from parser import load_prm_file
+from rules import compile_rules
+from validate import validate_file
+
+
+A300_PRM = "%\r\n;HEADER\r\nPARA101()\r\nN2025A4P7\r\nN2025A300P5\r\nN1013A1PX\r\n\r\n%\r\n"
+
+
+@pytest.fixture
+def a300_prm(tmp_path):
+    path = tmp_path / "ALL.PRM"
+    path.write_bytes(A300_PRM.encode("utf-8"))
+    return path
+
+
+@pytest.mark.parametrize("key", ["2025_T1_A4", "2025_A04", "2025_A4_A5", "2025_X1", "2025_A", "02025"])
+def test_parse_key_rejects_non_canonical(key):
+    with pytest.raises(KeyError):
+        parse_key(key)
+
+
+def test_parse_key_round_trips_canonical():
+    param = Parameter(2025, "", axis=4, tool=1, keep=2)
+    assert parse_key(param.key()) == pack_key(2025, 4, 1, 2)
+
+
+def test_columnar_contains_matches_dict():
+    params = {p.key(): p for p in (Parameter(2025, "1", axis=4, tool=1), Parameter(1, "2"))}
+    columnar = ColumnarParameters.from_parameters(params.values())
+    for key in ["2025_A4_T1", "2025_T1_A4", "2025_A04_T1", "1", "01", "2025_A300"]:
+        assert (key in columnar) == (key in params), key
+
+
+def test_pack_key_limits():
+    pack_key(2**32 - 1, 254, 254, 254)
+    with pytest.raises(KeyRangeError, match="300"):
+        pack_key(2025, 300, None, None)
+    with pytest.raises(KeyRangeError):
+        pack_key(2**32, None, None, None)
+
+
+@pytest.mark.parametrize("engine", ["regex", "fast"])
+def test_columnar_falls_back_to_dict_for_wide_qualifiers(a300_prm, engine):
+    expected = load_prm_file(a300_prm, engine=engine, store="dict")
+
+    prm = load_prm_file(a300_prm, engine=engine, store="columnar", digests=True)
+
+    assert isinstance(prm.parameters, dict)
+    assert prm.parameters == expected.parameters
+    assert prm.parameters["2025_A300"].value == "5"
+    assert prm.content_digests is None
+
+
+def test_validate_file_with_wide_qualifiers(a300_prm):
+    rules = compile_rules({2025: {"max": 6}})
+
+    result = validate_file(a300_prm, rules)
+
+    assert [(v.key(), v.rule) for v in result.violations] == [("2025_A4", "max")]
+
+
+def test_cache_skips_files_with_wide_qualifiers(a300_prm, tmp_path):
+    from cache import ParseCache
+
+    cache = ParseCache(tmp_path / "cache")
+    first = cache.load(a300_prm, store="columnar")
+    second = cache.load(a300_prm, store="columnar")
+
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert first.parameters == second.parameters
+    assert second.parameters["2025_A300"].value == "5"
@@ -0,0 +1,52 @@
+# tests/test_parallel_parser.py
+
+import pytest
+
+import parallel_parser
+from benchmarks.generate import generate_prm
+from interning import InternPool
+from parser import load_prm_file
+
+
+@pytest.fixture
+def big_prm(tmp_path, monkeypatch):
+    # Порог параллельного разбора снижен, чтобы хватило небольшого файла
+    monkeypatch.setattr(parallel_parser, "MIN_PARALLEL_BYTES", 0)
+    path = tmp_path / "ALL.PRM"
+    path.write_bytes(generate_prm(20000, seed=3).encode("utf-8"))
+    return path
+
+
+@pytest.mark.parametrize("store", ["dict", "columnar"])
+@pytest.mark.parametrize("with_pool", [False, True])
+def test_parallel_matches_sequential(big_prm, store, with_pool):
+    pool = InternPool() if with_pool else None
+    expected = load_prm_file(big_prm, engine="fast", store=store)
+
+    prm = parallel_parser.load_prm_file_parallel(
+        big_prm, workers=2, store=store, chunk_bytes=64 * 1024, pool=pool
+    )
+
+    assert prm.header == expected.header
+    assert list(prm.parameters.items()) == list(expected.parameters.items())
+    if with_pool:
+        assert pool.lookups > 0
+
+
+@pytest.mark.parametrize("store", ["dict", "columnar"])
+def test_parallel_key_range_fallback_uses_pool(tmp_path, monkeypatch, store):
+    # Квалификатор вне упакованного ключа: файл разбирается последовательно в dict
+    monkeypatch.setattr(parallel_parser, "MIN_PARALLEL_BYTES", 0)
+    path = tmp_path / "ALL.PRM"
+    body = "".join(f"N{n}A1P{n}\r\n" for n in range(1, 5000)) + "N9999A300P1\r\n"
+    path.write_bytes(f"%\r\n;HEADER\r\nPARA101()\r\n{body}\r\n%\r\n".encode("utf-8"))
+    pool = InternPool()
+
+    prm = parallel_parser.load_prm_file_parallel(
+        path, workers=2, store=store, chunk_bytes=16 * 1024, pool=pool
+    )
+
+    assert isinstance(prm.parameters, dict)
+    assert prm.content_digests is None
+    assert prm.parameters["9999_A300"].value == "1"
+    assert pool.lookups > 0
@@ -0,0 +1,87 @@
+# tests/test_patch.py
+
+from dataclasses import replace
+
+import pytest
+
+from benchmarks.generate import generate_prm
+from comparator import ADDED, MODIFIED, REMOVED, DiffRecord, iter_diff
+from models import Parameter
+from parser import ENGINES, load_prm_file
+from patch import ChangeSet, apply_patch
+
+
+def _changes():
+    return ChangeSet(
+        [
+            DiffRecord(ADDED, None, Parameter(5, "9")),
+            DiffRecord(ADDED, None, Parameter(9999999, "1", axis=2)),
+        ]
+    )
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "body", [b"", b"N1P1\r\n", b"N1P1\r\n\r\n", b"N1P1\r\nN7P7\r\n"], ids=repr
+)
+def test_inserted_lines_are_parsed(tmp_path, engine, body):
+    source = tmp_path / "ALL.PRM"
+    source.write_bytes(b"%\r\nPARA101()\r\n" + body + b"%\r\n")
+    output = tmp_path / "out.PRM"
+    before = load_prm_file(source, engine=engine)
+
+    apply_patch(source, _changes(), output)
+
+    after = load_prm_file(output, engine=engine)
+    assert after.parameters["5"].value == "9"
+    assert after.parameters["9999999_A2"].value == "1"
+    assert {k: p.value for k, p in after.parameters.items() if k not in ("5", "9999999_A2")} == {
+        k: p.value for k, p in before.parameters.items()
+    }
+
+
+def test_blank_line_is_not_doubled(tmp_path):
+    source = tmp_path / "ALL.PRM"
+    source.write_bytes(b"%\r\nPARA101()\r\nN1P1\r\n\r\n%\r\n")
+    output = tmp_path / "out.PRM"
+
+    apply_patch(source, _changes(), output)
+
+    assert output.read_bytes() == b"%\r\nPARA101()\r\nN1P1\r\nN5P9\r\nN9999999A2P1\r\n\r\n%\r\n"
+
+
+def test_patched_file_matches_changed_parse(tmp_path):
+    source = tmp_path / "ALL.PRM"
+    source.write_bytes(generate_prm(2000, seed=7).encode("utf-8"))
+    prm = load_prm_file(source)
+    params = list(prm.parameters.values())
+    changes = ChangeSet(
+        [
+            DiffRecord(MODIFIED, params[10], replace(params[10], value="42")),
+            DiffRecord(REMOVED, params[20], None),
+            DiffRecord(ADDED, None, Parameter(params[30].number, "7", axis=250)),
+        ]
+    )
+    output = tmp_path / "out.PRM"
+
+    result = apply_patch(source, changes, output)
+
+    assert result.conflicts == []
+    diff = list(iter_diff(prm, load_prm_file(output)))
+    assert sorted(r.change for r in diff) == sorted([MODIFIED, REMOVED, ADDED])
+
+
+@pytest.mark.parametrize("line", [b"N12ZZZ", b"N12A", b"N12P\xff"])
+def test_malformed_line_outside_changes_fails_like_parser(tmp_path, line):
+    source = tmp_path / "ALL.PRM"
+    source.write_bytes(b"%\r\nPARA101()\r\nN1P1\r\n" + line + b"\r\n\r\n%\r\n")
+    output = tmp_path / "out.PRM"
+
+    with pytest.raises(ValueError) as parser_error:
+        load_prm_file(source, engine="fast")
+    with pytest.raises(ValueError) as patch_error:
+        apply_patch(source, _changes(), output)
+
+    assert str(patch_error.value) == str(parser_error.value)
+    assert not output.exists()
+    assert list(tmp_path.iterdir()) == [source]
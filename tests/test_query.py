@@ -0,0 +1,93 @@
+# tests/test_query.py
+
+import sys
+
+import pytest
+
+import query
+from benchmarks.generate import generate_prm
+from models import Header, Parameter, PrmFile
+from parser import load_prm_file
+from query import ParameterIndex, parse_query
+
+
+def _index():
+    params = [
+        Parameter(1013, "X", axis=1),
+        Parameter(2025, "5", axis=1, tool=1),
+        Parameter(2025, "6", axis=1, keep=1),
+        Parameter(2026, "7", tool=2),
+    ]
+    return ParameterIndex(PrmFile(Header([]), {p.key(): p for p in params}))
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("tool=T1", {"tool": 1}),
+        ("tool=1", {"tool": 1}),
+        ("keep=K1", {"keep": 1}),
+        ("number=N2025", {"number": 2025}),
+        ("number=2000-2100", {"number": (2000, 2100)}),
+    ],
+)
+def test_parse_query(text, expected):
+    assert parse_query(text) == expected
+
+
+@pytest.mark.parametrize("text", ["tool=K1", "keep=T1", "tool=TT1", "number=NN2025"])
+def test_parse_query_rejects_foreign_letters(text):
+    with pytest.raises(ValueError, match="Некорректное значение поля"):
+        parse_query(text)
+
+
+def test_run_query_evaluates_positions_once(monkeypatch, capsys):
+    index = _index()
+    calls = []
+    positions = index.positions
+    monkeypatch.setattr(index, "positions", lambda **kw: calls.append(kw) or positions(**kw))
+
+    query._run_query(index, "number=2025 axis=X", limit=1)
+
+    assert calls == [{"number": 2025, "axis": "X"}]
+    out = capsys.readouterr().out
+    assert "N2025A1K1 = '6'" in out
+    assert "... и ещё 1 параметров" in out
+    assert "Найдено: 2" in out
+
+
+@pytest.mark.parametrize(
+    "conditions",
+    [
+        {"number": (1000, 1999)},
+        {"number": 2025},
+        {"axis": 1},
+        {"tool": 1, "number": (2000, 3000)},
+        {"keep": 2},
+        {"value": "1"},
+    ],
+)
+def test_dict_and_columnar_indexes_agree(tmp_path, conditions):
+    path = tmp_path / "ALL.PRM"
+    path.write_bytes(generate_prm(5000, seed=5).encode("utf-8"))
+    columnar = ParameterIndex(load_prm_file(path, store="columnar"))
+    by_dict = ParameterIndex(load_prm_file(path, store="dict"))
+
+    expected = columnar.query(**conditions)
+
+    assert [p.key() for p in by_dict.query(**conditions)] == [p.key() for p in expected]
+
+
+def test_query_cli_with_wide_qualifier(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "ALL.PRM"
+    path.write_bytes(b"%\r\n;HEADER\r\nPARA101()\r\nN2025A4P7\r\nN2025A300P5\r\nN2026P1\r\n\r\n%\r\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys, "argv", ["query.py", str(path), "-e", "number=2025", "-e", "axis=300"]
+    )
+
+    query.main()
+
+    out = capsys.readouterr().out
+    assert "N2025A4 = '7'\nN2025A300 = '5'\nℹ️  Найдено: 2" in out
+    assert "> axis=300\nN2025A300 = '5'\nℹ️  Найдено: 1" in out
@@ -0,0 +1,53 @@
+# tests/test_snapshots.py
+
+import sys
+
+import pytest
+
+import snapshots
+from models import KeyRangeError
+from parser import load_prm_file
+from snapshots import SnapshotStore
+
+
+def _write(path, body: str, date: str):
+    path.write_bytes(f"%\r\n;{date}\r\nPARA101()\r\n{body}\r\n%\r\n".encode("utf-8"))
+    return path
+
+
+@pytest.fixture
+def files(tmp_path):
+    return {
+        "first": _write(tmp_path / "first.PRM", "N2025A4P1\r\nN2026P1\r\n", "2024-01-01 10:00:00"),
+        "wide": _write(tmp_path / "wide.PRM", "N2025A4P2\r\nN2025A300P5\r\n", "2024-01-02 10:00:00"),
+        "second": _write(tmp_path / "second.PRM", "N2025A4P3\r\nN2026P1\r\n", "2024-01-03 10:00:00"),
+    }
+
+
+def test_wide_qualifier_file_is_rejected_without_changes(tmp_path, files):
+    with SnapshotStore(tmp_path / "history.sqlite") as store:
+        store.ingest("m1", load_prm_file(files["first"], store="columnar"), taken_at="2024-01-01")
+        with pytest.raises(KeyRangeError, match="300"):
+            store.ingest("m1", load_prm_file(files["wide"], store="columnar"), taken_at="2024-01-02")
+
+        assert len(store.snapshots("m1")) == 1
+        assert store.history("m1", "N2025A300") == []
+        assert [e.value for e in store.history("m1", "N2025A4")] == ["1"]
+
+
+def test_ingest_cli_skips_failed_file(tmp_path, files, monkeypatch, capsys):
+    db = tmp_path / "history.sqlite"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["snapshots.py", str(db), "ingest", "m1", *map(str, files.values())],
+    )
+
+    with pytest.raises(SystemExit) as exit_info:
+        snapshots.main()
+
+    assert exit_info.value.code == 1
+    assert "❌" in capsys.readouterr().err
+    with SnapshotStore(db) as store:
+        history = store.history("m1", "N2025A4")
+    assert [e.value for e in history] == ["1", "3"]
@@ -0,0 +1,71 @@
+# tests/test_watch.py
+
+import json
+
+from benchmarks.generate import generate_prm
+from parser import load_prm_file
+from watch import Watcher
+
+
+def test_export_error_is_reported_and_polling_continues(tmp_path):
+    baseline_path = tmp_path / "BASELINE.PRM"
+    baseline_path.write_bytes(generate_prm(100, seed=1).encode("utf-8"))
+    source = tmp_path / "backups"
+    source.mkdir()
+    (source / "m1.PRM").write_bytes(generate_prm(100, seed=2).encode("utf-8"))
+    # На месте папки отчётов — файл: любая запись отчёта падает с OSError
+    output_dir = tmp_path / "reports"
+    output_dir.write_text("")
+    report = tmp_path / "watch.jsonl"
+    watcher = Watcher(
+        load_prm_file(baseline_path),
+        source,
+        report_path=report,
+        output_dir=output_dir,
+        fmt="csv",
+        settle_seconds=0,
+    )
+
+    (result,) = watcher.poll()
+    assert result.status == "error"
+    assert "Ошибка записи отчёта" in result.message
+
+    # Ошибка временная: m1 повторяется на следующем опросе, хотя сам файл не менялся
+    (result,) = watcher.poll()
+    assert result.status == "error"
+    (source / "m2.PRM").write_bytes(generate_prm(100, seed=3).encode("utf-8"))
+    output_dir.unlink()
+    results = watcher.poll()
+    assert [(r.machine, r.status) for r in results] == [("m1", "ok"), ("m2", "ok")]
+    assert (output_dir / "m1_diff.csv").exists()
+    assert (output_dir / "m2_diff.csv").exists()
+    assert watcher.poll() == []
+
+    records = [json.loads(line) for line in report.read_text(encoding="utf-8").splitlines()]
+    files = [r for r in records if r["type"] == "file"]
+    assert [(r["machine"], r["status"]) for r in files] == [
+        ("m1", "error"),
+        ("m1", "error"),
+        ("m1", "ok"),
+        ("m2", "ok"),
+    ]
+    assert "Ошибка записи отчёта" in files[0]["error"]
+
+
+def test_failed_file_is_retried_after_restart(tmp_path):
+    baseline_path = tmp_path / "BASELINE.PRM"
+    baseline_path.write_bytes(generate_prm(100, seed=1).encode("utf-8"))
+    source = tmp_path / "backups"
+    source.mkdir()
+    broken = source / "m1.PRM"
+    broken.write_bytes(b"not a backup\r\n")
+    state = tmp_path / "state.json"
+    baseline = load_prm_file(baseline_path)
+
+    (result,) = Watcher(baseline, source, state_path=state, settle_seconds=0).poll()
+    assert result.status == "error"
+
+    # Состояние ошибочного файла не сохраняется — после перезапуска он снова разбирается
+    restarted = Watcher(baseline, source, state_path=state, settle_seconds=0)
+    (result,) = restarted.poll()
+    assert result.message == "Файл должен начинаться с '%'"
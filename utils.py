@@ -1,21 +1,83 @@
 # utils.py
 
-import yaml
+import os
 from pathlib import Path
 from typing import Dict, Optional
 
+import profiling
 
-def load_descriptions(path: Optional[Path]) -> Dict[int, dict]:
+
+# Общая папка для кэшей (разбор ALL.PRM, скомпилированный справочник)
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("PRM_CACHE_DIR", Path.home() / ".cache" / "mitsubishi_cnc_prm_parser")
+)
+
+# Увеличивается при изменении формата снимка или правил проверки справочника
+_DESCRIPTIONS_SNAPSHOT_VERSION = 2
+
+
+def load_descriptions(path: Optional[Path], cache_dir: Optional[Path] = None) -> Dict[int, dict]:
     """
     Загружает справочник описаний параметров из YAML-файла.
     Возвращает словарь: {параметр: {описание}}
+
+    Если задан cache_dir, проверенный справочник сохраняется туда как снимок
+    (pickle), привязанный к mtime/размеру и SHA-256 YAML-файла: при следующих
+    запусках YAML не разбирается, пока файл не изменится. По умолчанию
+    (cache_dir=None) снимок не пишется и не читается; CLI передают папку
+    кэша из --cache-dir (cache.snapshot_dir_from_args).
     """
     if path is None or not path.exists():
         return {}
 
+    with profiling.span("descriptions"):
+        return _load_descriptions(path, cache_dir)
+
+
+def _load_descriptions(path: Path, cache_dir: Optional[Path]) -> Dict[int, dict]:
+    if cache_dir is None:
+        return _parse_descriptions(path, _read_bytes(path))
+
+    stat = path.stat()
+    snapshot_path = _descriptions_snapshot_path(path, cache_dir)
+    snapshot = _read_snapshot(snapshot_path)
+
+    # 1. Файл не трогали — даже не читаем YAML
+    if snapshot and snapshot["mtime_ns"] == stat.st_mtime_ns and snapshot["size"] == stat.st_size:
+        return snapshot["data"]
+
+    # 2. mtime изменился, но содержимое то же (например, копирование) — обновляем метку
+    import hashlib
+
+    raw = _read_bytes(path)
+    digest = hashlib.sha256(raw).hexdigest()
+    if snapshot and snapshot["sha256"] == digest:
+        data = snapshot["data"]
+    else:
+        data = _parse_descriptions(path, raw)
+
+    _write_snapshot(
+        snapshot_path,
+        {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest, "data": data},
+    )
+    return data
+
+
+def _read_bytes(path: Path) -> bytes:
+    try:
+        return path.read_bytes()
+    except OSError as e:
+        raise ValueError(f"Не удалось прочитать файл {path}: {e}")
+
+
+def _parse_descriptions(path: Path, raw: bytes) -> Dict[int, dict]:
+    import yaml
+
+    # C-загрузчик (libyaml) в разы быстрее чистого Python, если он доступен
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        data = yaml.load(raw.decode("utf-8"), Loader=loader)
     except yaml.YAMLError as e:
         raise ValueError(f"Ошибка парсинга YAML в файле {path}: {e}")
     except Exception as e:
@@ -45,7 +107,74 @@ def load_descriptions(path: Optional[Path]) -> Dict[int, dict]:
                 raise ValueError(
                     f"Поле '{field}' у параметра {param_num} должно быть строкой или null."
                 )
+        _check_rule_fields(param_num, value)
 
         normalized[param_num] = value
 
     return normalized
+
+
+def _check_rule_fields(param_num: int, value: dict) -> None:
+    """Поля правил проверки значений (min/max, allowed, per_axis, min_param/max_param — см. rules.py)."""
+
+    def is_number(x) -> bool:
+        return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+    for field in ("min", "max"):
+        if value.get(field) is not None and not is_number(value[field]):
+            raise ValueError(f"Поле '{field}' у параметра {param_num} должно быть числом или null.")
+    if is_number(value.get("min")) and is_number(value.get("max")) and value["min"] > value["max"]:
+        raise ValueError(f"У параметра {param_num} min больше max.")
+
+    allowed = value.get("allowed")
+    if allowed is not None and (
+        not isinstance(allowed, list)
+        or not all(isinstance(x, str) or is_number(x) for x in allowed)
+    ):
+        raise ValueError(
+            f"Поле 'allowed' у параметра {param_num} должно быть списком строк и чисел или null."
+        )
+
+    if value.get("per_axis") is not None and not isinstance(value["per_axis"], bool):
+        raise ValueError(f"Поле 'per_axis' у параметра {param_num} должно быть true/false.")
+
+    for field in ("min_param", "max_param"):
+        other = value.get(field)
+        if other is not None and (not isinstance(other, int) or isinstance(other, bool)):
+            raise ValueError(
+                f"Поле '{field}' у параметра {param_num} должно быть номером параметра или null."
+            )
+
+
+def _descriptions_snapshot_path(path: Path, cache_dir: Path) -> Path:
+    import hashlib
+
+    # Один снимок на каждый YAML-файл (по абсолютному пути)
+    name = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()
+    return Path(cache_dir) / f"descriptions-{name}-v{_DESCRIPTIONS_SNAPSHOT_VERSION}.pickle"
+
+
+def _read_snapshot(snapshot_path: Path) -> Optional[dict]:
+    import pickle
+
+    try:
+        with open(snapshot_path, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception:
+        # Нет снимка или он повреждён — разберём YAML заново
+        return None
+    return snapshot if isinstance(snapshot, dict) else None
+
+
+def _write_snapshot(snapshot_path: Path, snapshot: dict) -> None:
+    import pickle
+
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snapshot_path)
+    except OSError:
+        # Снимок — оптимизация: ошибка записи не должна мешать работе
+        pass
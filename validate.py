@@ -0,0 +1,186 @@
+# validate.py
+
+"""Проверка бэкапов ALL.PRM по правилам справочника (min/max, allowed,
+per_axis, min_param/max_param — см. rules.py) на пуле процессов.
+
+Справочник передаётся воркерам при запуске, и каждый компилирует правила
+один раз; файл проверяется за один проход по параметрам. Нарушения всех
+станков выгружаются в один отчёт (.xlsx, .csv, .jsonl, .sqlite), ошибки
+по отдельным файлам не прерывают проверку остальных.
+
+Пример:
+    python validate.py backups/ --descriptions descriptions.yaml -o violations.xlsx
+"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from parser import ENGINES, load_prm_file
+from rules import RuleSet, Violation, compile_rules
+
+
+# Правила воркера: компилируются один раз в _init_worker
+_worker_rules: Optional[RuleSet] = None
+
+
+@dataclass
+class ValidationResult:
+    source: Path
+    violations: List[Violation] = field(default_factory=list)
+    axis_names: dict = field(default_factory=dict)  # для отчёта с --axis-names
+    error: Optional[str] = None
+
+
+def validate_file(
+    path, rules: RuleSet, engine: str = "regex", use_axis_names: bool = False
+) -> ValidationResult:
+    """
+    Проверяет один файл.
+    :raises ValueError: при нарушении формата файла
+    """
+    from exporters.rows import get_axis_names
+
+    prm = load_prm_file(path, engine=engine, store="columnar")
+    return ValidationResult(
+        Path(path),
+        rules.check(prm),
+        get_axis_names(prm) if use_axis_names else {},
+    )
+
+
+def _init_worker(descriptions: dict):
+    global _worker_rules
+    _worker_rules = compile_rules(descriptions)
+
+
+def _validate_file(path: Path, engine: str, use_axis_names: bool) -> ValidationResult:
+    return validate_file(path, _worker_rules, engine=engine, use_axis_names=use_axis_names)
+
+
+def run_validation(
+    files: List[Path],
+    descriptions: dict,
+    workers: int = None,
+    engine: str = "regex",
+    use_axis_names: bool = False,
+) -> List[ValidationResult]:
+    """Проверяет файлы на пуле процессов; результаты — в порядке входного списка."""
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(descriptions,)
+    ) as pool:
+        futures = {
+            pool.submit(_validate_file, path, engine, use_axis_names): path for path in files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                results[path] = ValidationResult(path, error=str(e))
+
+    return [results[p] for p in files]
+
+
+def main():
+    from batch import find_prm_files, machine_names
+    from exporters import EXPORTERS as EXPORT_FORMATS, export_violations
+    from utils import load_descriptions
+
+    parser = argparse.ArgumentParser(
+        description="Проверка бэкапов ALL.PRM по правилам справочника (диапазоны, списки значений, оси)"
+    )
+    parser.add_argument("source", help="Папка с бэкапами станков или glob-шаблон")
+    parser.add_argument(
+        "--descriptions",
+        type=Path,
+        default=Path("descriptions.yaml"),
+        help="YAML-файл справочника с правилами (по умолчанию: descriptions.yaml)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Отчёт о нарушениях: .xlsx, .csv, .jsonl или .sqlite (без него — только вывод в консоль)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        help="Формат отчёта (по умолчанию — по расширению файла, иначе xlsx)",
+    )
+    parser.add_argument(
+        "--axis-names", action="store_true", help="Использовать имена осей (X/Y/Z) вместо A1/A2/..."
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="Число процессов (по умолчанию: число ядер)"
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="regex", help="Движок парсера: regex или fast"
+    )
+    args = parser.parse_args()
+
+    if not args.descriptions.exists():
+        print(f"❌ Файл справочника не найден: {args.descriptions}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        descriptions = load_descriptions(args.descriptions)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    rules = compile_rules(descriptions)
+    if not rules:
+        print(f"ℹ️  В справочнике {args.descriptions} нет правил — проверять нечего")
+        return
+
+    files = find_prm_files(args.source)
+    if not files:
+        print(f"❌ Файлы ALL.PRM не найдены: {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"🔄 Проверка {len(files)} файлов по правилам {len(rules)} параметров...")
+    results = run_validation(
+        files,
+        descriptions,
+        workers=args.workers,
+        engine=args.engine,
+        use_axis_names=args.axis_names,
+    )
+    checked = [(name, r) for name, r in zip(machine_names(files), results) if r.error is None]
+
+    if args.output:
+        try:
+            export_violations(checked, args.output, fmt=args.format, descriptions=descriptions)
+        except (OSError, ValueError) as e:
+            print(f"❌ Ошибка записи отчёта: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"📝 Отчёт о нарушениях сохранён: {args.output}")
+    else:
+        shown = 0
+        for name, result in checked:
+            for v in result.violations[: max(20 - shown, 0)]:
+                value = "<нет>" if v.value is None else repr(v.value)
+                print(f"  {name} {v.key()} = {value}: {v.message}")
+            shown += len(result.violations)
+        if shown > 20:
+            print(f"... и ещё {shown - 20} нарушений (полный список: -o violations.xlsx)")
+
+    failed = [r for r in results if r.error is not None]
+    for r in failed:
+        print(f"❌ {r.source}: {r.error}", file=sys.stderr)
+
+    total = sum(len(r.violations) for _, r in checked)
+    with_violations = sum(1 for _, r in checked if r.violations)
+    print(
+        f"\n📊 Нарушений: {total} в {with_violations} из {len(checked)} файлов"
+        + (f", ❌ с ошибками: {len(failed)}" if failed else "")
+    )
+    if total or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
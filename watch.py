@@ -0,0 +1,396 @@
+# watch.py
+
+"""Наблюдение за папкой бэкапов: новые и изменённые ALL.PRM сразу сравниваются
+с эталоном.
+
+Эталон и справочник загружаются один раз и остаются в памяти. Папка
+опрашивается с интервалом; для каждого файла запоминаются mtime и размер
+(а после разбора — SHA-256 содержимого), поэтому разбирается только то,
+что появилось или изменилось, а простое касание файла без изменения
+содержимого повторной обработки не вызывает. Кэш можно сохранять в файл
+состояния (--state), чтобы после перезапуска не обрабатывать всё заново.
+Файл запоминается только после успешной обработки: если разбор или запись
+отчёта не удались, он обрабатывается снова на следующем опросе.
+
+Результаты дописываются в JSONL-журнал: запись "file" с итогами по файлу
+и записи "diff" по каждому различию. С --output-dir для каждого файла
+дополнительно сохраняется полный отчёт в любом формате экспорта.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from batch import find_prm_files
+from comparator import ADDED, MODIFIED, REMOVED, DiffRecord, iter_diff
+from models import PrmFile
+from parser import ENGINES, load_prm_file, parse_prm_file
+
+
+# Файл моложе этого возраста, скорее всего, ещё копируется — берём на следующем опросе
+DEFAULT_SETTLE_SECONDS = 1.0
+DEFAULT_INTERVAL = 2.0
+
+
+@dataclass
+class WatchResult:
+    """Итог обработки одного файла."""
+
+    path: Path
+    machine: str
+    status: str  # "ok" или "error"
+    counts: Dict[str, int]
+    message: str = ""
+    seconds: float = 0.0
+    header_datetime: Optional[str] = None
+    cnc_model: Optional[str] = None
+    records: List[DiffRecord] = field(default_factory=list)
+
+
+class Watcher:
+    """
+    Сравнивает новые и изменённые файлы папки source с эталоном.
+
+    Пример:
+        watcher = Watcher(baseline, Path("backups"), report_path=Path("watch.jsonl"))
+        watcher.run(interval=2.0)
+    """
+
+    def __init__(
+        self,
+        baseline: PrmFile,
+        source: Path,
+        report_path: Optional[Path] = None,
+        descriptions: dict = None,
+        axis_names_map: dict = None,
+        engine: str = "fast",
+        baseline_name: str = "BASELINE",
+        state_path: Optional[Path] = None,
+        output_dir: Optional[Path] = None,
+        fmt: Optional[str] = None,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+    ):
+        self.baseline = baseline
+        self.source = Path(source)
+        self.report_path = report_path
+        self.descriptions = descriptions or {}
+        self.axis_names_map = axis_names_map or {}
+        self.engine = engine
+        self.baseline_name = baseline_name
+        self.state_path = state_path
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.settle_seconds = settle_seconds
+        self._exclude = {Path(baseline.source_path).resolve()} if baseline.source_path else set()
+        # путь → (mtime_ns, размер, sha256 содержимого)
+        self._seen: Dict[str, Tuple[int, int, str]] = self._load_state()
+
+    # --- Опрос ---
+
+    def poll(self) -> List[WatchResult]:
+        """Один проход по папке: обрабатывает новые и изменённые файлы."""
+        now = time.time()
+        results = []
+        changed_state = False
+        for path in find_prm_files(str(self.source)):
+            if path.resolve() in self._exclude:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # файл удалили между листингом и stat
+            key = str(path)
+            seen = self._seen.get(key)
+            if seen is not None and seen[0] == stat.st_mtime_ns and seen[1] == stat.st_size:
+                continue
+            if now - stat.st_mtime < self.settle_seconds:
+                continue
+
+            try:
+                raw = path.read_bytes()
+            except OSError:
+                continue
+            digest = hashlib.sha256(raw).hexdigest()
+            if seen is None or seen[2] != digest:
+                result = self._process(path, raw)
+                results.append(result)
+                if result.status != "ok":
+                    # Не запоминаем: ошибка может быть временной (отчёт открыт
+                    # в Excel, файл дописывается) — повторим на следующем опросе
+                    continue
+            # Иначе файл переписали тем же содержимым — сравнивать нечего
+            self._seen[key] = (stat.st_mtime_ns, stat.st_size, digest)
+            changed_state = True
+
+        if results:
+            self._append_report(results)
+        if changed_state:
+            self._save_state()
+        return results
+
+    def run(self, interval: float = DEFAULT_INTERVAL, on_result=None) -> None:
+        """Опрашивает папку каждые interval секунд до KeyboardInterrupt."""
+        while True:
+            started = time.monotonic()
+            for result in self.poll():
+                if on_result:
+                    on_result(result)
+            time.sleep(max(interval - (time.monotonic() - started), 0))
+
+    # --- Обработка файла ---
+
+    def machine_name(self, path: Path) -> str:
+        """Имя станка — путь относительно папки наблюдения (machine17/ALL.PRM → machine17_ALL)."""
+        try:
+            relative = path.resolve().relative_to(self.source.resolve())
+        except ValueError:
+            relative = Path(path.name)
+        return "_".join(relative.with_suffix("").parts)
+
+    def _process(self, path: Path, raw: bytes) -> WatchResult:
+        started = time.perf_counter()
+        machine = self.machine_name(path)
+        try:
+            prm = self._parse(path, raw)
+        except ValueError as e:
+            return WatchResult(path, machine, "error", {}, str(e), time.perf_counter() - started)
+
+        records = list(iter_diff(self.baseline, prm))
+        counts = {MODIFIED: 0, ADDED: 0, REMOVED: 0}
+        for record in records:
+            counts[record.change] += 1
+
+        if self.output_dir is not None:
+            from exporters import EXTENSIONS, export_diff, resolve_format
+
+            fmt = resolve_format("", self.fmt)
+            extension = next(ext for ext, name in EXTENSIONS.items() if name == fmt)
+            output = self.output_dir / f"{machine}_diff{extension}"
+            try:
+                self.output_dir.mkdir(parents=True, exist_ok=True)
+                export_diff(
+                    records,
+                    output,
+                    fmt=fmt,
+                    descriptions=self.descriptions,
+                    axis_names_map=self.axis_names_map,
+                    file1_name=self.baseline_name,
+                    file2_name=machine,
+                )
+            except OSError as e:
+                # Отчёт открыт в Excel, диск заполнен и т.п. — ошибка этого файла,
+                # наблюдение продолжается
+                return WatchResult(
+                    path,
+                    machine,
+                    "error",
+                    counts,
+                    f"Ошибка записи отчёта {output}: {e}",
+                    time.perf_counter() - started,
+                )
+        return WatchResult(
+            path,
+            machine,
+            "ok",
+            counts,
+            seconds=time.perf_counter() - started,
+            header_datetime=prm.header.datetime,
+            cnc_model=prm.header.cnc_model,
+            records=records,
+        )
+
+    def _parse(self, path: Path, raw: bytes) -> PrmFile:
+        # Содержимое уже прочитано для SHA-256 — разбираем из памяти
+        if self.engine == "fast":
+            stream = io.BytesIO(raw)
+        else:
+            stream = io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8")
+        return parse_prm_file(stream, source_path=str(path), engine=self.engine, store="columnar")
+
+    # --- Журнал ---
+
+    def _append_report(self, results: List[WatchResult]) -> None:
+        if self.report_path is None:
+            return
+        from exporters.rows import diff_columns, iter_diff_rows
+
+        processed_at = datetime.now().isoformat(timespec="seconds")
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        with open(self.report_path, "a", encoding="utf-8") as f:
+            for result in results:
+                file_record = {
+                    "type": "file",
+                    "processed_at": processed_at,
+                    "path": str(result.path),
+                    "machine": result.machine,
+                    "status": result.status,
+                }
+                if result.status != "ok":
+                    file_record["error"] = result.message
+                    f.write(dumps(file_record) + "\n")
+                    continue
+
+                file_record.update(
+                    {
+                        "header_datetime": result.header_datetime,
+                        "cnc_model": result.cnc_model,
+                        "modified": result.counts[MODIFIED],
+                        "added": result.counts[ADDED],
+                        "removed": result.counts[REMOVED],
+                    }
+                )
+                f.write(dumps(file_record) + "\n")
+
+                fields = [field for field, _ in diff_columns()]
+                for row in iter_diff_rows(result.records, self.descriptions, self.axis_names_map):
+                    record = {"type": "diff", "machine": result.machine}
+                    record.update(zip(fields, row))
+                    f.write(dumps(record) + "\n")
+
+    # --- Состояние ---
+
+    def _load_state(self) -> Dict[str, Tuple[int, int, str]]:
+        if self.state_path is None:
+            return {}
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            return {path: tuple(entry) for path, entry in data["files"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            # Нет файла состояния или он повреждён — начинаем с чистого листа
+            return {}
+
+    def _save_state(self) -> None:
+        if self.state_path is None:
+            return
+        tmp = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"files": self._seen}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+
+def _print_result(result: WatchResult) -> None:
+    if result.status != "ok":
+        print(f"❌ {result.machine}: {result.message}", file=sys.stderr, flush=True)
+        return
+    total = sum(result.counts.values())
+    if total == 0:
+        print(f"✅ {result.machine}: совпадает с эталоном ({result.seconds:.2f} с)", flush=True)
+        return
+    print(
+        f"🔄 {result.machine}: изменено {result.counts[MODIFIED]}, добавлено {result.counts[ADDED]}, "
+        f"удалено {result.counts[REMOVED]} ({result.seconds:.2f} с)",
+        flush=True,
+    )
+
+
+def main():
+    from exporters import EXPORTERS
+
+    parser = argparse.ArgumentParser(
+        description="Наблюдение за папкой бэкапов ALL.PRM и сравнение новых файлов с эталоном"
+    )
+    parser.add_argument("baseline", help="Путь к эталонному файлу ALL.PRM")
+    parser.add_argument("source", type=Path, help="Папка, куда ЧПУ складывают бэкапы")
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=Path("watch.jsonl"),
+        help="JSONL-журнал, в который дописываются результаты (по умолчанию: watch.jsonl)",
+    )
+    parser.add_argument(
+        "--output-dir", type=Path, help="Папка для полного отчёта о различиях по каждому файлу"
+    )
+    parser.add_argument(
+        "--format", choices=EXPORTERS, help="Формат отчётов в --output-dir (по умолчанию: xlsx)"
+    )
+    parser.add_argument(
+        "--state",
+        type=Path,
+        help="Файл состояния: уже обработанные файлы не обрабатываются повторно после перезапуска",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help=f"Интервал опроса в секундах (по умолчанию: {DEFAULT_INTERVAL})",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE_SECONDS,
+        help="Не трогать файлы моложе стольких секунд — они ещё копируются "
+        f"(по умолчанию: {DEFAULT_SETTLE_SECONDS})",
+    )
+    parser.add_argument("--once", action="store_true", help="Один проход и выход (для cron)")
+    parser.add_argument(
+        "--descriptions", type=Path, help="YAML-файл со справочником описаний параметров"
+    )
+    parser.add_argument(
+        "--axis-names", action="store_true", help="Использовать имена осей эталона (X/Y/Z)"
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="fast", help="Движок парсера (по умолчанию: fast)"
+    )
+    args = parser.parse_args()
+
+    if not args.source.is_dir():
+        print(f"❌ Папка не найдена: {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        descriptions = {}
+        if args.descriptions:
+            if not args.descriptions.exists():
+                print(f"ℹ️  Файл справочника не найден: {args.descriptions}", file=sys.stderr)
+            else:
+                from utils import load_descriptions
+
+                descriptions = load_descriptions(args.descriptions)
+
+        baseline_path = Path(args.baseline)
+        baseline = load_prm_file(baseline_path, engine=args.engine, store="columnar")
+    except (OSError, ValueError) as e:
+        print(f"❌ Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    axis_names_map = {}
+    if args.axis_names:
+        from exporters.rows import get_axis_names
+
+        axis_names_map = get_axis_names(baseline)
+
+    watcher = Watcher(
+        baseline,
+        args.source,
+        report_path=args.report,
+        descriptions=descriptions,
+        axis_names_map=axis_names_map,
+        engine=args.engine,
+        baseline_name=baseline_path.stem,
+        state_path=args.state,
+        output_dir=args.output_dir,
+        fmt=args.format,
+        settle_seconds=0 if args.once else args.settle,
+    )
+
+    if args.once:
+        for result in watcher.poll():
+            _print_result(result)
+        return
+
+    print(f"👀 Наблюдение за {args.source} (интервал {args.interval} с). Ctrl+C — выход.", flush=True)
+    try:
+        watcher.run(interval=args.interval, on_result=_print_result)
+    except KeyboardInterrupt:
+        print("\n✅ Наблюдение остановлено.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# writer.py
+
+"""Запись PrmFile обратно в формат ALL.PRM.
+
+Раскладка как у бэкапа ЧПУ: '%', строки заголовка ';', PARA101(), строки
+параметров N…P… в порядке хранилища, пустая строка и '%'. Квалификаторы
+пишутся в порядке T, A, K — как их ожидает PARAM_REGEX. Для бэкапа в обычной
+раскладке (без дублей ключей и посторонних строк в теле) разбор и запись
+дают исходный файл байт в байт.
+"""
+
+from array import array
+from pathlib import Path
+from typing import Iterator
+
+from models import ColumnarParameters, Parameter, PrmFile
+
+
+# Перевод строки как у ЧПУ
+NEWLINE = "\r\n"
+
+
+def format_line(param: Parameter) -> str:
+    """Строка параметра: 'N2025A4P9000', 'N1001T1A2K0P1'."""
+    return f"N{param.number}{_suffix(param.axis, param.tool, param.keep)}P{param.value}"
+
+
+def _suffix(axis, tool, keep) -> str:
+    parts = []
+    if tool is not None:
+        parts.append(f"T{tool}")
+    if axis is not None:
+        parts.append(f"A{axis}")
+    if keep is not None:
+        parts.append(f"K{keep}")
+    return "".join(parts)
+
+
+def iter_prm_lines(prm: PrmFile) -> Iterator[str]:
+    """Строки файла без перевода строки."""
+    yield "%"
+    yield from prm.header.raw_lines
+    yield "PARA101()"
+    yield from _parameter_lines(prm.parameters)
+    # Перед завершающим '%' у бэкапов всегда есть пустая строка
+    yield ""
+    yield "%"
+
+
+def _parameter_lines(parameters) -> Iterator[str]:
+    if not isinstance(parameters, ColumnarParameters):
+        return map(format_line, parameters.values())
+
+    # Колонки читаются напрямую: объекты Parameter не создаются, а суффикс
+    # считается один раз на сочетание квалификаторов
+    numbers, axes, tools, keeps, values, *_, strings = parameters.to_columns()
+    number_column = array("I")
+    number_column.frombytes(numbers)
+    value_column = array("I")
+    value_column.frombytes(values)
+    suffixes = {}
+
+    def lines():
+        for number, axis, tool, keep, value in zip(number_column, axes, tools, keeps, value_column):
+            codes = (axis, tool, keep)
+            suffix = suffixes.get(codes)
+            if suffix is None:
+                suffix = suffixes[codes] = _suffix(
+                    *(code - 1 if code else None for code in codes)
+                )
+            yield f"N{number}{suffix}P{strings[value]}"
+
+    return lines()
+
+
+def format_prm(prm: PrmFile, newline: str = NEWLINE) -> str:
+    """Текст файла целиком; после завершающего '%' тоже стоит перевод строки."""
+    return newline.join(iter_prm_lines(prm)) + newline
+
+
+def write_prm_file(prm: PrmFile, path, newline: str = NEWLINE) -> None:
+    """Записывает файл в UTF-8 с переводом строки newline (по умолчанию CRLF)."""
+    with open(Path(path), "w", encoding="utf-8", newline="") as f:
+        f.write(format_prm(prm, newline))